@@ -0,0 +1,9 @@
+from apps.core.jobs import job
+
+from .models import Profile
+
+
+@job
+def save_checkout_profile(user_id, phone, address):
+    # Teléfono y dirección del último pedido quedan como datos del perfil
+    Profile.objects.filter(user_id=user_id).update(phone=phone, address=address)
@@ -0,0 +1,112 @@
+"""
+Limpieza de carritos y sesiones viejas (`manage.py purge_carts` o un cron
+que llame a purge_stale_carts()).
+
+- Carritos anónimos (sin usuario) sin cambios hace más de
+  settings.CART_ANONYMOUS_MAX_AGE_DAYS: su sesión ya venció, nadie los puede
+  volver a leer.
+- Carritos inactivos sin cambios hace más de settings.CART_INACTIVE_MAX_AGE_DAYS.
+- Filas vencidas de django_session (si las sesiones viven en la base).
+
+Se borra por lotes de settings.CART_PURGE_BATCH_SIZE, cada uno en su propia
+transacción: se eligen los ids más viejos por el índice (is_active,
+updated_at) y se borran ítems y carritos por id, sin cargar instancias ni
+disparar señales (ver apps.cart.signals). Un carrito que otro request tiene
+bloqueado se saltea y queda para la próxima pasada.
+"""
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.sessions.models import Session
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Cart, CartItem
+
+DB_SESSION_ENGINES = (
+    "django.contrib.sessions.backends.db",
+    "django.contrib.sessions.backends.cached_db",
+)
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def _purge_carts(queryset, batch_size):
+    carts = items = 0
+    while True:
+        with transaction.atomic():
+            ids = list(
+                queryset
+                .select_for_update(skip_locked=True)
+                .order_by("updated_at")
+                .values_list("pk", flat=True)[:batch_size]
+            )
+            if not ids:
+                break
+            items += CartItem.objects.filter(cart_id__in=ids)._raw_delete(CartItem.objects.db)
+            carts += Cart.objects.filter(pk__in=ids)._raw_delete(Cart.objects.db)
+        if len(ids) < batch_size:
+            break
+    return carts, items
+
+
+def _purge_sessions(now, batch_size):
+    removed = 0
+    while True:
+        with transaction.atomic():
+            keys = list(
+                Session.objects
+                .filter(expire_date__lt=now)
+                .order_by("expire_date")
+                .values_list("session_key", flat=True)[:batch_size]
+            )
+            if not keys:
+                break
+            removed += Session.objects.filter(session_key__in=keys)._raw_delete(Session.objects.db)
+        if len(keys) < batch_size:
+            break
+    return removed
+
+
+def purge_stale_carts(anonymous_days=None, inactive_days=None, batch_size=None, sessions=True):
+    """
+    Borra carritos anónimos e inactivos viejos (con sus ítems) y las sesiones
+    vencidas. Retorna un dict con filas borradas por tabla y segundos tardados.
+    """
+    if anonymous_days is None:
+        anonymous_days = _setting("CART_ANONYMOUS_MAX_AGE_DAYS", 14)
+    if inactive_days is None:
+        inactive_days = _setting("CART_INACTIVE_MAX_AGE_DAYS", 30)
+    batch_size = max(1, batch_size or _setting("CART_PURGE_BATCH_SIZE", 500))
+
+    started = time.monotonic()
+    now = timezone.now()
+
+    anonymous = Cart.objects.filter(
+        is_active=True, user__isnull=True,
+        updated_at__lt=now - timedelta(days=anonymous_days),
+    )
+    inactive = Cart.objects.filter(
+        is_active=False,
+        updated_at__lt=now - timedelta(days=inactive_days),
+    )
+
+    carts = items = 0
+    for queryset in (anonymous, inactive):
+        removed_carts, removed_items = _purge_carts(queryset, batch_size)
+        carts += removed_carts
+        items += removed_items
+
+    removed_sessions = 0
+    if sessions and settings.SESSION_ENGINE in DB_SESSION_ENGINES:
+        removed_sessions = _purge_sessions(now, batch_size)
+
+    return {
+        "carts": carts,
+        "items": items,
+        "sessions": removed_sessions,
+        "seconds": time.monotonic() - started,
+    }
@@ -1,9 +1,8 @@
-from .services import get_or_create_cart
+from django.utils.functional import SimpleLazyObject
+
+from .services import cart_count
+
 
 def cart_context(request):
-    try:
-        cart = get_or_create_cart(request)
-        count = sum(i.quantity for i in cart.items.all())
-    except Exception:
-        count = 0
-    return {"CART_COUNT": count}
+    # Perezoso: solo se calcula si la plantilla usa CART_COUNT
+    return {"CART_COUNT": SimpleLazyObject(lambda: cart_count(request))}
@@ -0,0 +1,117 @@
+"""
+Carrito anónimo en una cookie firmada (settings.CART_STORAGE = "cookie").
+
+El visitante sin login no genera sesión, Cart ni CartItem: sus ítems viajan
+como pares (variant_id, cantidad) firmados y comprimidos con django.core.signing.
+apps.cart.services despacha a esta clase cuando recibe un CookieCart; en sus
+líneas el "id de ítem" es el id de la variante. La escribe
+CookieCartMiddleware solo si cambió. Al iniciar sesión se vuelca al carrito
+en base de datos del usuario (apps.cart.signals); el checkout la cobra
+directamente y el stock se valida al descontarlo.
+"""
+import hashlib
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.core import signing
+from django.utils import timezone
+
+COOKIE_SALT = "apps.cart.cookie"
+# Una cookie no pasa de ~4 KB: tope de productos distintos
+MAX_ITEMS = 50
+
+
+def cookie_carts_enabled():
+    return getattr(settings, "CART_STORAGE", "db") == "cookie"
+
+
+def cookie_name():
+    return getattr(settings, "CART_COOKIE_NAME", "cart")
+
+
+def cookie_age():
+    return getattr(settings, "CART_COOKIE_AGE", 60 * 60 * 24 * 30)
+
+
+class CookieCart:
+    # Mismos atributos que lee el resto del código de un Cart
+    pk = None
+    user_id = None
+
+    def __init__(self, quantities=(), updated_at=None, last_seq=0):
+        self.quantities = dict(quantities)
+        self.updated_at = updated_at or timezone.now()
+        # Secuencia del último lote aplicado (ver services.apply_cart_operations)
+        self.last_seq = last_seq
+        self.modified = False
+
+    @property
+    def count(self):
+        return sum(self.quantities.values())
+
+    @property
+    def digest(self):
+        raw = repr(sorted(self.quantities.items())).encode()
+        return hashlib.md5(raw, usedforsecurity=False).hexdigest()
+
+    def set(self, variant_id, qty):
+        if qty <= 0:
+            self.quantities.pop(variant_id, None)
+        else:
+            if variant_id not in self.quantities and len(self.quantities) >= MAX_ITEMS:
+                raise ValueError(f"El carrito admite hasta {MAX_ITEMS} productos distintos.")
+            self.quantities[variant_id] = qty
+        self.updated_at = timezone.now()
+        self.modified = True
+
+    def clear(self):
+        self.quantities.clear()
+        self.updated_at = timezone.now()
+        self.modified = True
+
+    def dumps(self):
+        payload = {
+            "i": [[variant_id, qty] for variant_id, qty in self.quantities.items()],
+            "t": int(self.updated_at.timestamp()),
+        }
+        if self.last_seq:
+            payload["s"] = self.last_seq
+        return signing.dumps(payload, salt=COOKIE_SALT, compress=True)
+
+    @classmethod
+    def loads(cls, value):
+        try:
+            payload = signing.loads(value, salt=COOKIE_SALT, max_age=cookie_age())
+            quantities = [(int(v), int(q)) for v, q in payload.get("i", ()) if int(q) > 0]
+            updated_at = datetime.fromtimestamp(int(payload.get("t", 0)), tz=dt_timezone.utc)
+            last_seq = int(payload.get("s", 0))
+        except (signing.BadSignature, TypeError, ValueError, AttributeError):
+            # Firma inválida, vencida o formato viejo: carrito vacío
+            return cls()
+        return cls(quantities[:MAX_ITEMS], updated_at, last_seq)
+
+
+def get_cookie_cart(request):
+    """
+    CookieCart del request (se lee una sola vez y se comparte en el request).
+    """
+    cart = getattr(request, "_cookie_cart", None)
+    if cart is None:
+        value = request.COOKIES.get(cookie_name())
+        cart = CookieCart.loads(value) if value else CookieCart()
+        request._cookie_cart = cart
+    return cart
+
+
+def save_cookie_cart(cart, response):
+    if cart.quantities:
+        response.set_cookie(
+            cookie_name(),
+            cart.dumps(),
+            max_age=cookie_age(),
+            secure=settings.SESSION_COOKIE_SECURE,
+            httponly=True,
+            samesite="Lax",
+        )
+    else:
+        response.delete_cookie(cookie_name(), samesite="Lax")
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+
+from apps.cart.models import Cart
+from apps.cart.repair import duplicate_cart_groups, merge_duplicate_carts
+
+
+class Command(BaseCommand):
+    help = (
+        "Fusiona los carritos activos duplicados de un mismo usuario o sesión "
+        "(suma cantidades con tope en el stock y borra los sobrantes)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run", action="store_true",
+            help="Solo lista los grupos de duplicados, sin modificar nada.",
+        )
+
+    def handle(self, *args, **options):
+        if options["dry_run"]:
+            groups = duplicate_cart_groups(Cart)
+            for ids in groups:
+                keeper, *extra = ids
+                self.stdout.write(f"  Carrito #{keeper} ← {', '.join(f'#{pk}' for pk in extra)}")
+            self.stdout.write(self.style.SUCCESS(f"Grupos de duplicados: {len(groups)}"))
+            return
+
+        groups, removed = merge_duplicate_carts()
+        self.stdout.write(self.style.SUCCESS(
+            f"Grupos de duplicados: {groups} · carritos fusionados: {removed}"
+        ))
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand
+
+from apps.cart.cleanup import purge_stale_carts
+
+
+class Command(BaseCommand):
+    help = (
+        "Borra por lotes los carritos anónimos e inactivos viejos (con sus ítems) "
+        "y las sesiones vencidas. Pensado para correr en un cron diario."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--anonymous-days", type=int, default=None,
+            help="Antigüedad de carritos anónimos a borrar (por defecto settings.CART_ANONYMOUS_MAX_AGE_DAYS).",
+        )
+        parser.add_argument(
+            "--inactive-days", type=int, default=None,
+            help="Antigüedad de carritos inactivos a borrar (por defecto settings.CART_INACTIVE_MAX_AGE_DAYS).",
+        )
+        parser.add_argument(
+            "--batch-size", type=int, default=None,
+            help="Filas por lote (por defecto settings.CART_PURGE_BATCH_SIZE).",
+        )
+        parser.add_argument(
+            "--skip-sessions", action="store_true",
+            help="No borra las sesiones vencidas de django_session.",
+        )
+
+    def handle(self, *args, **options):
+        stats = purge_stale_carts(
+            anonymous_days=options["anonymous_days"],
+            inactive_days=options["inactive_days"],
+            batch_size=options["batch_size"],
+            sessions=not options["skip_sessions"],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Carritos borrados: {stats['carts']} · ítems: {stats['items']} · "
+            f"sesiones: {stats['sessions']} · {stats['seconds']:.2f} s"
+        ))
@@ -0,0 +1,23 @@
+from django.utils.cache import patch_vary_headers
+
+from .cookie import save_cookie_cart
+
+
+class CookieCartMiddleware:
+    """
+    Escribe la cookie del carrito anónimo si el request la modificó
+    (ver apps.cart.cookie). Sin cambios no toca la respuesta.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        cart = getattr(request, "_cookie_cart", None)
+        if cart is not None:
+            # El HTML (badge, mini-carrito) depende de la cookie
+            patch_vary_headers(response, ("Cookie",))
+            if cart.modified:
+                save_cookie_cart(cart, response)
+        return response
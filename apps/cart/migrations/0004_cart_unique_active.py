@@ -0,0 +1,98 @@
+# Generated by Django 6.0 on 2026-10-17 01:31
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+from django.utils import timezone
+
+
+def merge_duplicates(apps, schema_editor):
+    # Las restricciones fallarían con duplicados ya existentes. Copia fija de
+    # apps.cart.repair al momento de esta migración (no importa código vivo).
+    Cart = apps.get_model("cart", "Cart")
+    CartItem = apps.get_model("cart", "CartItem")
+    db = schema_editor.connection.alias
+
+    active = Cart.objects.using(db).filter(is_active=True)
+    groups = []
+    for field, queryset in (
+        ("user", active.filter(user__isnull=False)),
+        ("session_key", active.exclude(session_key="")),
+    ):
+        repeated = (
+            queryset.values(field)
+            .annotate(n=Count("pk"))
+            .filter(n__gt=1)
+            .values_list(field, flat=True)
+        )
+        for value in repeated:
+            groups.append(list(
+                queryset.filter(**{field: value})
+                .order_by("-updated_at", "-pk")
+                .values_list("pk", flat=True)
+            ))
+
+    for ids in groups:
+        # Un carrito ya borrado por un grupo anterior (usuario y sesión) se omite
+        ids = list(
+            Cart.objects.using(db).filter(pk__in=ids)
+            .order_by("-updated_at", "-pk")
+            .values_list("pk", flat=True)
+        )
+        if len(ids) < 2:
+            continue
+        keeper_id, *extra_ids = ids
+        items = list(CartItem.objects.using(db).filter(cart_id__in=ids).order_by("pk"))
+        stocks = dict(
+            CartItem.objects.using(db).filter(cart_id__in=ids)
+            .values_list("variant_id", "variant__stock")
+        )
+        kept = {item.variant_id: item for item in items if item.cart_id == keeper_id}
+        to_create = {}
+        changed = set()
+        for item in items:
+            if item.cart_id == keeper_id:
+                continue
+            stock = stocks.get(item.variant_id, 0)
+            target = kept.get(item.variant_id)
+            if target is not None:
+                target.quantity = min(target.quantity + item.quantity, max(stock, target.quantity))
+                changed.add(item.variant_id)
+                continue
+            pending = to_create.get(item.variant_id)
+            if pending is not None:
+                pending.quantity = min(pending.quantity + item.quantity, stock)
+            elif stock > 0:
+                to_create[item.variant_id] = CartItem(
+                    cart_id=keeper_id, variant_id=item.variant_id, quantity=min(item.quantity, stock),
+                )
+
+        CartItem.objects.using(db).bulk_update([kept[v] for v in changed], ["quantity"])
+        Cart.objects.using(db).filter(pk__in=extra_ids).delete()
+        CartItem.objects.using(db).bulk_create(to_create.values())
+        Cart.objects.using(db).filter(pk=keeper_id).update(updated_at=timezone.now())
+
+    # PostgreSQL: las FK diferidas dejan eventos de trigger pendientes y el
+    # CREATE UNIQUE INDEX siguiente fallaría ("pending trigger events")
+    if groups and schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute("SET CONSTRAINTS ALL IMMEDIATE")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cart', '0003_cart_purge_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicates, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='cart',
+            constraint=models.UniqueConstraint(condition=models.Q(('is_active', True)), fields=('user',), name='unique_active_cart_per_user'),
+        ),
+        migrations.AddConstraint(
+            model_name='cart',
+            constraint=models.UniqueConstraint(condition=models.Q(('is_active', True), models.Q(('session_key', ''), _negated=True)), fields=('session_key',), name='unique_active_cart_per_session'),
+        ),
+    ]
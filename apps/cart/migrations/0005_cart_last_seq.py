@@ -0,0 +1,18 @@
+# Generated by Django 6.0 on 2026-10-17 02:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cart', '0004_cart_unique_active'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cart',
+            name='last_seq',
+            field=models.PositiveBigIntegerField(default=0, editable=False, verbose_name='Última secuencia'),
+        ),
+    ]
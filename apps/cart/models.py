@@ -18,12 +18,32 @@ class Cart(models.Model):
     )
 
     is_active = models.BooleanField("Activo", default=True)
+    # Secuencia del último lote de cambios aplicado (descarta lotes viejos)
+    last_seq = models.PositiveBigIntegerField("Última secuencia", default=0, editable=False)
     created_at = models.DateTimeField("Creado", auto_now_add=True)
     updated_at = models.DateTimeField("Actualizado", auto_now=True)
 
     class Meta:
         verbose_name = "Carrito"
         verbose_name_plural = "Carritos"
+        indexes = [
+            # Purga por antigüedad (apps.cart.cleanup) y carrito activo del usuario
+            models.Index(fields=["is_active", "updated_at"], name="cart_active_updated_idx"),
+            models.Index(fields=["user", "is_active"], name="cart_user_active_idx"),
+        ]
+        constraints = [
+            # Un solo carrito activo por usuario y por sesión (ver services._upsert_cart)
+            models.UniqueConstraint(
+                fields=["user"],
+                condition=models.Q(is_active=True),
+                name="unique_active_cart_per_user",
+            ),
+            models.UniqueConstraint(
+                fields=["session_key"],
+                condition=models.Q(is_active=True) & ~models.Q(session_key=""),
+                name="unique_active_cart_per_session",
+            ),
+        ]
 
     def __str__(self) -> str:
         owner = self.user.username if self.user else (self.session_key or "sin-sesion")
@@ -0,0 +1,105 @@
+"""
+Fusión de carritos activos duplicados (mismo usuario o misma sesión).
+
+Antes de las restricciones únicas de Cart, dos requests simultáneos podían
+crear dos carritos activos para el mismo visitante y repartir sus ítems. Se
+conserva el modificado más recientemente, se le suman las cantidades de los
+demás (con tope en el stock) y se borran los sobrantes.
+
+Lo usa `manage.py merge_duplicate_carts`. La migración que agrega las
+restricciones lleva su propia copia fija de esta lógica.
+"""
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+
+
+def duplicate_cart_groups(Cart):
+    """
+    Listas de ids de carritos activos que comparten usuario o sesión,
+    el más reciente primero.
+    """
+    active = Cart.objects.filter(is_active=True)
+    owners = [
+        ("user", active.filter(user__isnull=False)),
+        ("session_key", active.exclude(session_key="")),
+    ]
+    groups = []
+    for field, queryset in owners:
+        repeated = (
+            queryset.values(field)
+            .annotate(n=Count("pk"))
+            .filter(n__gt=1)
+            .values_list(field, flat=True)
+        )
+        for value in repeated:
+            ids = list(
+                queryset.filter(**{field: value})
+                .order_by("-updated_at", "-pk")
+                .values_list("pk", flat=True)
+            )
+            groups.append(ids)
+    return groups
+
+
+@transaction.atomic
+def merge_carts(Cart, CartItem, cart_ids):
+    """
+    Vuelca los ítems de cart_ids[1:] en cart_ids[0] y borra esos carritos.
+    Retorna la cantidad de carritos borrados.
+    """
+    keeper_id, *extra_ids = cart_ids
+    if not extra_ids:
+        return 0
+    items = list(
+        CartItem.objects.select_for_update()
+        .filter(cart_id__in=cart_ids)
+        .order_by("pk")
+    )
+    stocks = dict(
+        CartItem.objects.filter(cart_id__in=cart_ids)
+        .values_list("variant_id", "variant__stock")
+    )
+
+    kept = {item.variant_id: item for item in items if item.cart_id == keeper_id}
+    to_create = {}
+    changed = set()
+    for item in items:
+        if item.cart_id == keeper_id:
+            continue
+        stock = stocks.get(item.variant_id, 0)
+        target = kept.get(item.variant_id)
+        if target is not None:
+            target.quantity = min(target.quantity + item.quantity, max(stock, target.quantity))
+            changed.add(item.variant_id)
+            continue
+        pending = to_create.get(item.variant_id)
+        if pending is not None:
+            pending.quantity = min(pending.quantity + item.quantity, stock)
+        elif stock > 0:
+            to_create[item.variant_id] = CartItem(
+                cart_id=keeper_id, variant_id=item.variant_id, quantity=min(item.quantity, stock),
+            )
+
+    CartItem.objects.bulk_update([kept[v] for v in changed], ["quantity"])
+    Cart.objects.filter(pk__in=extra_ids).delete()
+    CartItem.objects.bulk_create(to_create.values())
+    Cart.objects.filter(pk=keeper_id).update(updated_at=timezone.now())
+    return len(extra_ids)
+
+
+def merge_duplicate_carts(Cart=None, CartItem=None):
+    """
+    Fusiona todos los grupos de duplicados. Retorna (grupos, carritos borrados).
+    """
+    if Cart is None:
+        from .models import Cart, CartItem
+
+    groups = duplicate_cart_groups(Cart)
+    removed = 0
+    for ids in groups:
+        # Un carrito ya borrado por un grupo anterior (usuario y sesión) se omite
+        ids = list(Cart.objects.filter(pk__in=ids).order_by("-updated_at", "-pk").values_list("pk", flat=True))
+        if len(ids) > 1:
+            removed += merge_carts(Cart, CartItem, ids)
+    return len(groups), removed
@@ -1,37 +1,200 @@
-from django.db import transaction
-from django.db.models import F
+from django.db import connection, transaction
+from django.db.models import F, Sum
+from django.utils import timezone
 
+from apps.catalog.models import Variant
+
+from .cookie import MAX_ITEMS, CookieCart, cookie_carts_enabled, get_cookie_cart
 from .models import Cart, CartItem
 
+# Contador de unidades del carrito guardado en la sesión (badge del navbar)
+CART_COUNT_SESSION_KEY = "cart_count"
+
+
+def _request_user(request):
+    user = getattr(request, "user", None)
+    return user if user is not None and user.is_authenticated else None
+
+
+def _uses_cookie(request):
+    # Con CART_STORAGE = "cookie" solo los anónimos usan la cookie
+    return cookie_carts_enabled() and _request_user(request) is None
+
+
+def _active_carts(request):
+    """
+    Carritos activos del visitante, o None si es anónimo y aún no tiene sesión.
+    """
+    user = _request_user(request)
+    if user:
+        return Cart.objects.filter(is_active=True, user=user, session_key="")
+    session_key = request.session.session_key
+    if not session_key:
+        return None
+    return Cart.objects.filter(is_active=True, user=None, session_key=session_key)
+
+
+def get_cart(request):
+    """
+    Carrito activo del visitante (Cart o CookieCart) o None. No crea sesión ni carrito.
+    """
+    if _uses_cookie(request):
+        cart = get_cookie_cart(request)
+        return cart if cart.quantities else None
+    carts = _active_carts(request)
+    return carts.first() if carts is not None else None
+
+
+# Predicados de las restricciones únicas de Cart (mismo SQL que generan)
+_ACTIVE_CART_CONFLICTS = {
+    "user": ("user_id", '"is_active"'),
+    "session": ("session_key", '("is_active" AND NOT ("session_key" = \'\'))'),
+}
+
+
+def _upsert_cart(user=None, session_key=""):
+    """
+    Carrito activo del usuario (o de la sesión), creándolo si no existe.
+
+    Primero un SELECT: el caso común (ya existe) no escribe ni bloquea la
+    fila, que así no compite con el lock_cart del checkout. Si no hay, un
+    INSERT ... ON CONFLICT DO NOTHING RETURNING: si otro request lo creó
+    entretanto, no se inserta nada y un segundo SELECT devuelve esa fila.
+    Sin soporte (otros motores), get_or_create.
+    """
+    values = {"user": user, "session_key": "" if user else session_key, "is_active": True}
+    # Mismo alcance que la restricción única correspondiente
+    existing = (
+        Cart.objects.filter(is_active=True, user=user) if user
+        else Cart.objects.filter(is_active=True, session_key=session_key)
+    )
+    features = connection.features
+    if not (features.supports_update_conflicts_with_target and features.can_return_columns_from_insert):
+        return Cart.objects.get_or_create(**values)[0]
+
+    cart = existing.first()
+    if cart is not None:
+        return cart
+
+    target, predicate = _ACTIVE_CART_CONFLICTS["user" if user else "session"]
+    qn = connection.ops.quote_name
+    now = connection.ops.adapt_datetimefield_value(timezone.now())
+    sql = (
+        f"INSERT INTO {qn(Cart._meta.db_table)} "
+        f"(session_key, user_id, is_active, last_seq, created_at, updated_at) "
+        f"VALUES (%s, %s, %s, 0, %s, %s) "
+        f"ON CONFLICT ({qn(target)}) WHERE {predicate} DO NOTHING "
+        f"RETURNING id, session_key, user_id, is_active, last_seq, created_at, updated_at"
+    )
+    params = [values["session_key"], user.pk if user else None, True, now, now]
+    cart = next(iter(Cart.objects.raw(sql, params)), None)
+    return cart if cart is not None else existing.get()
+
 
 def get_or_create_cart(request):
+    if _uses_cookie(request):
+        return get_cookie_cart(request)
+
+    user = _request_user(request)
+    if user:
+        return _upsert_cart(user=user)
+
     # Asegura que exista sesión
     if not request.session.session_key:
         request.session.create()
+    return _upsert_cart(session_key=request.session.session_key)
 
-    session_key = request.session.session_key
 
-    user = request.user if getattr(request, "user", None) and request.user.is_authenticated else None
+def lock_cart(cart):
+    """
+    Bloquea la fila del carrito hasta el fin de la transacción. Todo cambio
+    de un carrito en base lo toma primero: así los cambios y el checkout del
+    mismo carrito se serializan sin deadlocks. No hace nada con un CookieCart.
+    """
+    if cart is None or isinstance(cart, CookieCart):
+        return
+    list(Cart.objects.select_for_update().filter(pk=cart.pk).values_list("pk", flat=True))
 
-    cart = Cart.objects.filter(is_active=True).filter(
-        user=user if user else None,
-        session_key=session_key if not user else ""
-    ).first()
 
-    if not cart:
-        cart = Cart.objects.create(
-            session_key=session_key if not user else "",
-            user=user,
-            is_active=True
-        )
+def get_cart_state(request):
+    """
+    (id, updated_at) del carrito activo, o None. No crea sesión ni carrito:
+    sirve para validadores HTTP (ETag / Last-Modified) antes de renderizar.
+    """
+    if _uses_cookie(request):
+        cart = get_cookie_cart(request)
+        return (f"cookie:{cart.digest}", cart.updated_at) if cart.quantities else None
+    carts = _active_carts(request)
+    return carts.values_list("pk", "updated_at").first() if carts is not None else None
 
-    return cart
 
+# -------------------------
+# Contador en sesión
+# -------------------------
+def count_items(cart) -> int:
+    if isinstance(cart, CookieCart):
+        return cart.count
+    return int(cart.items.aggregate(c=Sum("quantity"))["c"] or 0)
 
-@transaction.atomic
-def add_to_cart(cart: Cart, variant, qty: int = 1):
+
+def remember_cart_count(session, cart, count):
+    # La cookie ya es su propio contador: no se toca la sesión
+    if isinstance(cart, CookieCart):
+        return count
+    entry = {
+        "cart": cart.pk if cart else None,
+        "user": cart.user_id if cart else None,
+        "count": count,
+    }
+    # Sin cambios no se marca la sesión como modificada (evita guardarla)
+    if session.get(CART_COUNT_SESSION_KEY) != entry:
+        session[CART_COUNT_SESSION_KEY] = entry
+    return count
+
+
+def _adjust_cart_count(session, cart, delta):
+    if session is None or isinstance(cart, CookieCart):
+        return
+    entry = session.get(CART_COUNT_SESSION_KEY)
+    if entry and entry.get("cart") == cart.pk:
+        remember_cart_count(session, cart, max(0, entry["count"] + delta))
+    else:
+        remember_cart_count(session, cart, count_items(cart))
+
+
+def cart_count(request) -> int:
+    """
+    Unidades en el carrito del visitante, leídas del contador de la sesión.
+    Solo consulta la base si el contador falta o es de otro usuario (p. ej.
+    recién logueado). Nunca crea sesión ni carrito: un visitante anónimo que
+    no agregó nada no cuesta ninguna consulta.
+    """
+    if _uses_cookie(request):
+        return get_cookie_cart(request).count
+
+    session = getattr(request, "session", None)
+    if session is None:
+        return 0
+    user = _request_user(request)
+    if not user and not session.session_key:
+        return 0
+
+    entry = session.get(CART_COUNT_SESSION_KEY)
+    if entry and entry.get("user") == (user.pk if user else None):
+        return entry["count"]
+
+    cart = get_cart(request)
+    if cart is None:
+        if user:
+            session[CART_COUNT_SESSION_KEY] = {"cart": None, "user": user.pk, "count": 0}
+        return 0
+    return remember_cart_count(session, cart, count_items(cart))
+
+
+def add_to_cart(cart, variant, qty: int = 1, session=None):
     """
     Suma qty a un item (o lo crea). Valida stock.
+    Con `session`, mantiene al día el contador del navbar (igual en las demás).
     """
     qty = int(qty or 1)
     if qty < 1:
@@ -41,6 +204,18 @@ def add_to_cart(cart: Cart, variant, qty: int = 1):
     if variant.stock <= 0:
         raise ValueError("Esta variante no tiene stock.")
 
+    if isinstance(cart, CookieCart):
+        new_qty = cart.quantities.get(variant.pk, 0) + qty
+        if new_qty > variant.stock:
+            raise ValueError(f"Stock insuficiente. Disponible: {variant.stock}.")
+        cart.set(variant.pk, new_qty)
+        return new_qty
+    return _add_to_db_cart(cart, variant, qty, session)
+
+
+@transaction.atomic
+def _add_to_db_cart(cart: Cart, variant, qty, session):
+    lock_cart(cart)
     item, created = CartItem.objects.select_for_update().get_or_create(
         cart=cart,
         variant=variant,
@@ -53,36 +228,355 @@ def add_to_cart(cart: Cart, variant, qty: int = 1):
 
     item.quantity = new_qty
     item.save(update_fields=["quantity"])
+    _adjust_cart_count(session, cart, qty)
     return item
 
 
-@transaction.atomic
-def set_qty(cart: Cart, item_id: int, qty: int):
+def set_qty(cart, item_id: int, qty: int, session=None, delta: bool = False):
     """
-    Setea cantidad FINAL. Si qty <= 0 elimina.
+    Setea cantidad FINAL (o la suma a la actual si `delta`). Si queda <= 0 elimina.
     Valida stock de manera fuerte.
-    Retorna CartItem actualizado o None si se eliminó.
+    Retorna el ítem actualizado (la cantidad, en un CookieCart) o None si se eliminó.
+    Si el ítem no está en el carrito lanza CartItem.DoesNotExist.
     """
+    if isinstance(cart, CookieCart):
+        return _set_cookie_qty(cart, item_id, qty, delta)
+    return _set_db_qty(cart, item_id, qty, session, delta)
+
+
+def _set_cookie_qty(cart, variant_id, qty, delta):
+    current = cart.quantities.get(variant_id)
+    if current is None:
+        raise CartItem.DoesNotExist("Ítem no encontrado.")
+    if delta:
+        qty = current + qty
+
+    if qty <= 0:
+        cart.set(variant_id, 0)
+        return None
+
+    stock = Variant.objects.filter(pk=variant_id).values_list("stock", flat=True).first() or 0
+    if qty > stock:
+        raise ValueError(f"Stock insuficiente. Disponible: {stock}.")
+    cart.set(variant_id, qty)
+    return qty
+
+
+@transaction.atomic
+def _set_db_qty(cart: Cart, item_id, qty, session, delta):
+    lock_cart(cart)
     item = CartItem.objects.select_related("variant").select_for_update().get(pk=item_id, cart=cart)
+    if delta:
+        qty = item.quantity + qty
 
     if qty <= 0:
         item.delete()
+        _adjust_cart_count(session, cart, -item.quantity)
         return None
 
     # Validación stock
     if qty > item.variant.stock:
         raise ValueError(f"Stock insuficiente. Disponible: {item.variant.stock}.")
 
+    change = qty - item.quantity
     item.quantity = qty
     item.save(update_fields=["quantity"])
+    _adjust_cart_count(session, cart, change)
     return item
 
 
+def remove_item(cart, item_id: int, session=None):
+    if isinstance(cart, CookieCart):
+        if item_id in cart.quantities:
+            cart.set(item_id, 0)
+        return
+    _remove_db_item(cart, item_id, session)
+
+
 @transaction.atomic
-def remove_item(cart: Cart, item_id: int):
-    CartItem.objects.filter(pk=item_id, cart=cart).delete()
+def _remove_db_item(cart: Cart, item_id, session):
+    lock_cart(cart)
+    item = CartItem.objects.filter(pk=item_id, cart=cart).first()
+    if item is None:
+        return
+    item.delete()
+    _adjust_cart_count(session, cart, -item.quantity)
+
+
+def clear_cart(cart, session=None):
+    if isinstance(cart, CookieCart):
+        cart.clear()
+        return
+    # Un UPDATE y un DELETE, sin señales por ítem (corre dentro del checkout).
+    # El UPDATE va primero: toma el carrito antes que sus ítems, como lock_cart
+    with transaction.atomic():
+        Cart.objects.filter(pk=cart.pk).update(updated_at=timezone.now())
+        CartItem.objects.filter(cart=cart)._raw_delete(CartItem.objects.db)
+    if session is not None:
+        remember_cart_count(session, cart, 0)
+
+
+# -------------------------
+# Lote de cambios (API del carrito)
+# -------------------------
+MAX_BATCH_OPERATIONS = 50
+
+
+class CartOperation:
+    """
+    Un cambio del lote: sobre un ítem del carrito (`item_id`) o una variante
+    (`variant_id`, la agrega si no está), con cantidad final o `delta`.
+    En un CookieCart el id de ítem es el de la variante.
+    """
+    __slots__ = ("item_id", "variant_id", "amount", "delta")
+
+    def __init__(self, item_id=None, variant_id=None, amount=0, delta=False):
+        self.item_id = item_id
+        self.variant_id = variant_id
+        self.amount = amount
+        self.delta = delta
+
+
+def _apply_operations(quantities, operations, resolve, stocks):
+    """
+    Aplica `operations` sobre `quantities` ({variant_id: cantidad}) en memoria.
+    `resolve(op)` da la variante de la operación (o None) y `stocks` el stock
+    de las variantes disponibles. Las operaciones inválidas se saltean y se
+    reportan como [{"index", "error", "stock"?}].
+    """
+    errors = []
+    for index, op in enumerate(operations):
+        variant_id = resolve(op)
+        if variant_id is None:
+            errors.append({"index": index, "error": "Ítem no encontrado."})
+            continue
+        if variant_id not in stocks:
+            errors.append({"index": index, "error": "Variante no disponible."})
+            continue
+
+        current = quantities.get(variant_id, 0)
+        qty = current + op.amount if op.delta else op.amount
+        if qty <= 0:
+            quantities.pop(variant_id, None)
+            continue
+        stock = stocks[variant_id]
+        if qty > stock:
+            errors.append({
+                "index": index,
+                "error": f"Stock insuficiente. Disponible: {stock}.",
+                "stock": stock,
+            })
+            continue
+        quantities[variant_id] = qty
+    return errors
+
+
+def apply_cart_operations(cart, operations, seq=None, session=None):
+    """
+    Aplica un lote de CartOperation en una sola transacción.
+
+    `seq` es la secuencia del cliente (creciente): un lote con secuencia menor
+    o igual a la del último aplicado llegó tarde y se descarta entero.
+    Retorna (aplicado, errores): (False, []) si se descartó; si no, los
+    errores de las operaciones que se saltearon (ver _apply_operations).
+    """
+    if isinstance(cart, CookieCart):
+        return _apply_cookie_operations(cart, operations, seq)
+    return _apply_db_operations(cart, operations, seq, session)
+
+
+def _apply_cookie_operations(cart, operations, seq):
+    # La cookie no se puede bloquear: entre lotes simultáneos gana el último en escribirse
+    if seq is not None and seq <= cart.last_seq:
+        return False, []
+
+    referenced = {op.item_id if op.item_id is not None else op.variant_id for op in operations}
+    stocks = {
+        pk: stock
+        for pk, stock, active, product_active in Variant.objects.filter(pk__in=referenced)
+        .values_list("pk", "stock", "is_active", "product__is_active")
+        if (active and product_active) or pk in cart.quantities
+    }
+
+    def resolve(op):
+        if op.item_id is not None:
+            return op.item_id if op.item_id in cart.quantities else None
+        return op.variant_id
+
+    quantities = dict(cart.quantities)
+    errors = _apply_operations(quantities, operations, resolve, stocks)
+    if len(quantities) > MAX_ITEMS:
+        errors.append({"index": None, "error": f"El carrito admite hasta {MAX_ITEMS} productos distintos."})
+    elif quantities != cart.quantities:
+        cart.clear()
+        for variant_id, qty in quantities.items():
+            cart.set(variant_id, qty)
+    if seq is not None:
+        cart.last_seq = seq
+        cart.modified = True
+    return True, errors
 
 
 @transaction.atomic
-def clear_cart(cart: Cart):
-    cart.items.all().delete()
+def _apply_db_operations(cart, operations, seq, session):
+    # Orden de bloqueo fijo: carrito, sus ítems, variantes por pk. El carrito
+    # serializa los lotes del mismo visitante; las variantes, siempre en el
+    # mismo orden, no se cruzan con otros lotes ni con el checkout.
+    last_seq = (
+        Cart.objects.select_for_update()
+        .filter(pk=cart.pk)
+        .values_list("last_seq", flat=True)
+        .first()
+    )
+    if last_seq is None:
+        raise Cart.DoesNotExist("Carrito no encontrado.")
+    if seq is not None and seq <= last_seq:
+        return False, []
+
+    rows = list(
+        CartItem.objects.select_for_update()
+        .filter(cart=cart)
+        .order_by("pk")
+        .values_list("pk", "variant_id", "quantity")
+    )
+    items = {pk: variant_id for pk, variant_id, _ in rows}
+    original = {variant_id: qty for _, variant_id, qty in rows}
+    referenced = {items.get(op.item_id) if op.item_id is not None else op.variant_id for op in operations}
+    variants = (
+        Variant.objects.filter(pk__in=referenced - {None})
+        .order_by("pk")
+        .select_for_update(of=("self",))
+        .values_list("pk", "stock", "is_active", "product__is_active")
+    )
+    # Solo se agregan variantes a la venta; las que ya están se pueden cambiar o quitar
+    stocks = {
+        pk: stock
+        for pk, stock, active, product_active in variants
+        if (active and product_active) or pk in original
+    }
+
+    def resolve(op):
+        return items.get(op.item_id) if op.item_id is not None else op.variant_id
+
+    quantities = dict(original)
+    errors = _apply_operations(quantities, operations, resolve, stocks)
+
+    removed = [variant_id for variant_id in original if variant_id not in quantities]
+    changed = [
+        CartItem(cart=cart, variant_id=variant_id, quantity=qty)
+        for variant_id, qty in quantities.items()
+        if original.get(variant_id) != qty
+    ]
+    if removed:
+        CartItem.objects.filter(cart=cart, variant_id__in=removed)._raw_delete(CartItem.objects.db)
+    if changed:
+        CartItem.objects.bulk_create(
+            changed,
+            update_conflicts=True,
+            unique_fields=["cart", "variant"],
+            update_fields=["quantity"],
+        )
+
+    # Sin señales por ítem: updated_at y la secuencia en un solo UPDATE
+    values = {"updated_at": timezone.now()} if removed or changed else {}
+    if seq is not None:
+        values["last_seq"] = seq
+    if values:
+        Cart.objects.filter(pk=cart.pk).update(**values)
+        for name, value in values.items():
+            setattr(cart, name, value)
+    if session is not None:
+        remember_cart_count(session, cart, sum(quantities.values()))
+    return True, errors
+
+
+# -------------------------
+# Login: del carrito anónimo al del usuario
+# -------------------------
+def _merge_into_user_cart(user, quantities):
+    """
+    Suma `quantities` ({variant_id: cantidad}) al carrito activo del usuario
+    con un solo upsert de CartItem. Cada total queda topeado en el stock
+    actual (sin bajar lo que el usuario ya tenía). Retorna
+    (carrito, [(producto, pedida, final)]) con las cantidades recortadas.
+    """
+    cart = _upsert_cart(user=user)
+    variants = {
+        pk: (stock, name)
+        for pk, stock, name in Variant.objects.filter(pk__in=quantities)
+        .order_by("pk")
+        .select_for_update(of=("self",))
+        .values_list("pk", "stock", "product__name")
+    }
+    existing = dict(
+        CartItem.objects.filter(cart=cart, variant_id__in=variants)
+        .values_list("variant_id", "quantity")
+    )
+
+    rows, clamped = [], []
+    for variant_id, qty in quantities.items():
+        if variant_id not in variants:
+            continue
+        stock, name = variants[variant_id]
+        current = existing.get(variant_id, 0)
+        wanted = current + qty
+        final = min(wanted, max(stock, current))
+        if final < wanted:
+            clamped.append((name, wanted, final))
+        if final > current:
+            rows.append(CartItem(cart=cart, variant_id=variant_id, quantity=final))
+
+    if rows:
+        CartItem.objects.bulk_create(
+            rows,
+            update_conflicts=True,
+            unique_fields=["cart", "variant"],
+            update_fields=["quantity"],
+        )
+        # bulk_create no dispara señales: updated_at (ETag / caché del snapshot) a mano
+        Cart.objects.filter(pk=cart.pk).update(updated_at=timezone.now())
+    return cart, clamped
+
+
+@transaction.atomic
+def absorb_cookie_cart(request, user):
+    """
+    Vuelca el carrito de la cookie al del usuario que acaba de iniciar sesión
+    y vacía la cookie. Retorna las cantidades recortadas por stock.
+    """
+    if not cookie_carts_enabled():
+        return []
+    cookie = get_cookie_cart(request)
+    if not cookie.quantities:
+        return []
+    _, clamped = _merge_into_user_cart(user, cookie.quantities)
+    cookie.clear()
+    return clamped
+
+
+@transaction.atomic
+def absorb_session_cart(request, user):
+    """
+    Vuelca el carrito anónimo de la sesión al del usuario que acaba de iniciar
+    sesión y lo borra. login() ya rotó la clave de sesión, así que el carrito
+    se encuentra por el contador del navbar, que conserva su id.
+    Retorna las cantidades recortadas por stock.
+    """
+    session = getattr(request, "session", None)
+    entry = (session.get(CART_COUNT_SESSION_KEY) if session is not None else None) or {}
+    if entry.get("user") is not None or not entry.get("cart"):
+        return []
+    anonymous = Cart.objects.filter(pk=entry["cart"], user__isnull=True, is_active=True).first()
+    if anonymous is None:
+        return []
+
+    quantities = dict(anonymous.items.values_list("variant_id", "quantity"))
+    clamped = []
+    if quantities:
+        _, clamped = _merge_into_user_cart(user, quantities)
+    # Ítems y carrito por id, sin señales por ítem (el carrito desaparece)
+    CartItem.objects.filter(cart_id=anonymous.pk)._raw_delete(CartItem.objects.db)
+    Cart.objects.filter(pk=anonymous.pk).delete()
+    # El contador era del carrito anónimo: cart_count() lo recalcula
+    session.pop(CART_COUNT_SESSION_KEY, None)
+    return clamped
@@ -0,0 +1,31 @@
+from django.contrib import messages
+from django.contrib.auth.signals import user_logged_in
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import Cart, CartItem
+from .services import absorb_cookie_cart, absorb_session_cart
+
+
+@receiver([post_save, post_delete], sender=CartItem)
+def cart_item_changed(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    # updated_at del carrito = última modificación de sus ítems (ETag / Last-Modified)
+    Cart.objects.filter(pk=instance.cart_id).update(updated_at=timezone.now())
+
+
+@receiver(user_logged_in)
+def anonymous_cart_to_user(sender, request, user, **kwargs):
+    # El carrito anónimo (cookie o sesión) pasa al carrito en base del usuario
+    if request is None:
+        return
+    clamped = absorb_cookie_cart(request, user) + absorb_session_cart(request, user)
+    if clamped:
+        detail = ", ".join(f"{name} ({final} de {wanted})" for name, wanted, final in clamped)
+        messages.warning(
+            request,
+            f"Algunas cantidades de tu carrito se ajustaron al stock disponible: {detail}.",
+            fail_silently=True,
+        )
@@ -0,0 +1,185 @@
+"""
+Foto de solo lectura de un carrito para las vistas y APIs JSON.
+
+Una sola consulta: los ítems con variante, producto, imagen (la de la
+variante o la primera del producto, vía subquery) y el total de línea
+anotado; los atributos llegan por LEFT JOIN (una fila por atributo) y se
+agrupan en Python. Cantidad total, subtotal, ítems y "se puede pagar" se
+derivan de esas mismas filas.
+
+Se cachea por (carrito, Cart.updated_at, versión del catálogo): las señales
+de CartItem tocan updated_at y los cambios de precio/stock suben la versión.
+Un CookieCart se lee con la misma consulta sobre Variant y se cachea por
+contenido.
+"""
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db.models import DecimalField, ExpressionWrapper, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from apps.catalog.models import ProductImage, Variant
+
+from .cookie import CookieCart
+from .models import CartItem
+
+CART_SNAPSHOT_TTL = 60 * 10
+CENTS = Decimal("0.01")
+
+
+class CartLine:
+    __slots__ = (
+        "id", "variant_id", "product_id", "name", "slug", "sku", "unit_price",
+        "stock", "quantity", "total", "image_name", "attributes",
+    )
+
+    def __init__(self, id, variant_id, product_id, name, slug, sku, unit_price,
+                 stock, quantity, total, image_name):
+        self.id = id
+        self.variant_id = variant_id
+        self.product_id = product_id
+        self.name = name
+        self.slug = slug
+        self.sku = sku
+        self.unit_price = unit_price
+        self.stock = stock
+        self.quantity = quantity
+        # SQLite devuelve el producto como int/float: se normaliza a centavos
+        self.total = Decimal(total).quantize(CENTS)
+        self.image_name = image_name
+        self.attributes = []
+
+    @property
+    def image_url(self):
+        if not self.image_name:
+            return ""
+        return ProductImage._meta.get_field("image").storage.url(self.image_name)
+
+    @property
+    def description(self):
+        return ", ".join(f"{name}: {value}" for name, value in self.attributes)
+
+    @property
+    def exceeds_stock(self):
+        return self.quantity > self.stock
+
+
+class CartSnapshot:
+    __slots__ = ("cart_id", "lines", "count", "subtotal", "items_left", "can_checkout")
+
+    def __init__(self, cart_id, lines):
+        self.cart_id = cart_id
+        self.lines = lines
+        self.count = sum(line.quantity for line in lines)
+        self.subtotal = sum((line.total for line in lines), Decimal("0.00"))
+        self.items_left = len(lines)
+        self.can_checkout = bool(lines) and not any(line.exceeds_stock for line in lines)
+
+    def line(self, item_id):
+        for line in self.lines:
+            if line.id == item_id:
+                return line
+        return None
+
+
+def _image_name(prefix):
+    first_image = (
+        ProductImage.objects
+        .filter(product_id=OuterRef(f"{prefix}product_id"))
+        .order_by("pk")
+        .values("image")[:1]
+    )
+    return Coalesce(F(f"{prefix}variant_image__image"), Subquery(first_image))
+
+
+def _variant_fields(prefix):
+    return [
+        f"{prefix}product_id", f"{prefix}product__name", f"{prefix}product__slug",
+        f"{prefix}sku", f"{prefix}price", f"{prefix}stock",
+    ]
+
+
+def _collect(rows, make_line):
+    lines = {}
+    for *fields, attr_name, attr_value in rows:
+        line = lines.get(fields[0])
+        if line is None:
+            line = lines[fields[0]] = make_line(fields)
+        if attr_name is not None:
+            line.attributes.append((attr_name, attr_value))
+    return lines
+
+
+def build_cart_snapshot(cart):
+    if isinstance(cart, CookieCart):
+        return _build_cookie_snapshot(cart)
+
+    rows = (
+        CartItem.objects
+        .filter(cart_id=cart.pk)
+        .annotate(
+            line_total=ExpressionWrapper(
+                F("quantity") * F("variant__price"),
+                output_field=DecimalField(max_digits=12, decimal_places=2),
+            ),
+            image_name=_image_name("variant__"),
+        )
+        .order_by("pk", "variant__attributes__id")
+        .values_list(
+            "pk", "variant_id", *_variant_fields("variant__"),
+            "quantity", "line_total", "image_name",
+            "variant__attributes__name", "variant__attributes__value",
+        )
+    )
+    lines = _collect(rows, lambda fields: CartLine(*fields))
+    return CartSnapshot(cart.pk, list(lines.values()))
+
+
+def _build_cookie_snapshot(cart):
+    # Misma consulta sobre Variant; cantidad y total salen de la cookie.
+    # El id de cada línea es el de la variante (así lo direccionan las vistas).
+    quantities = cart.quantities
+    rows = (
+        Variant.objects
+        .filter(pk__in=quantities)
+        .annotate(image_name=_image_name(""))
+        .order_by("pk", "attributes__id")
+        .values_list(
+            "pk", "pk", *_variant_fields(""), "image_name",
+            "attributes__name", "attributes__value",
+        )
+    )
+
+    def make_line(fields):
+        *head, price, stock, image_name = fields
+        qty = quantities[head[0]]
+        return CartLine(*head, price, stock, qty, price * qty, image_name)
+
+    lines = _collect(rows, make_line)
+    # Las variantes borradas desaparecen; el orden es el de la cookie
+    return CartSnapshot(None, [lines[v] for v in quantities if v in lines])
+
+
+def cart_snapshot_key(cart, catalog_version):
+    if isinstance(cart, CookieCart):
+        # Por contenido: carritos de cookie iguales comparten la entrada
+        return f"cart:snapshot:cookie:{cart.digest}:{catalog_version}"
+    return f"cart:snapshot:{cart.pk}:{cart.updated_at.timestamp()}:{catalog_version}"
+
+
+def get_cart_snapshot(cart, catalog_version=None):
+    """
+    CartSnapshot de `cart` (o vacío si es None). Con `catalog_version` se
+    cachea: `cart.updated_at` debe estar recién leído (p. ej. de get_cart).
+    """
+    if cart is None:
+        return CartSnapshot(None, [])
+    if catalog_version is None:
+        return build_cart_snapshot(cart)
+
+    key = cart_snapshot_key(cart, catalog_version)
+    snapshot = cache.get(key)
+    if snapshot is None:
+        snapshot = build_cart_snapshot(cart)
+        cache.set(key, snapshot, CART_SNAPSHOT_TTL)
+    return snapshot
@@ -9,5 +9,6 @@ urlpatterns = [
     path("carrito/eliminar/<int:item_id>/", views.cart_remove, name="remove"),
     path("carrito/vaciar/", views.cart_clear, name="clear"),
     path("api/carrito/item/<int:item_id>/", views.cart_item_api, name="item_api"),
+    path("api/carrito/lote/", views.cart_batch_api, name="batch_api"),
     path("api/carrito/summary/", views.summary_api, name="summary_api"),
 ]
@@ -1,5 +1,6 @@
+import json
+
 from django.contrib import messages
-from django.db.models import Sum, F as DJF
 from django.http import JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
 from django.views.decorators.http import require_http_methods, require_POST
@@ -11,26 +12,34 @@ from django.template.loader import render_to_string
 from .services import get_or_create_cart    
 
 from apps.catalog.models import Variant
-from .models import CartItem
+from apps.catalog.views import catalog_state
+from apps.core.conditional import conditional_view
+from .models import Cart, CartItem
 from .services import (
+    MAX_BATCH_OPERATIONS,
+    CartOperation,
+    get_cart,
     get_or_create_cart,
     add_to_cart,
+    apply_cart_operations,
     set_qty,
     remove_item,
     clear_cart,
+    remember_cart_count,
 )
+from .snapshot import build_cart_snapshot, get_cart_snapshot
+
+
+def _catalog_version(request):
+    # Precios y stock del carrito vienen del catálogo: su versión entra en la clave de caché
+    return catalog_state(request)[0][0]
 
 
 @require_http_methods(["GET"])
 def cart_detail(request):
-    cart = get_or_create_cart(request)
-    items = (
-        cart.items
-        .select_related("variant", "variant__product")
-        .prefetch_related("variant__attributes")
-        .order_by("id")
-    )
-    return render(request, "cart/detail.html", {"cart": cart, "items": items})
+    # Ver el carrito vacío no crea sesión ni carrito
+    snapshot = get_cart_snapshot(get_cart(request), _catalog_version(request))
+    return render(request, "cart/detail.html", {"cart": snapshot, "items": snapshot.lines})
 
 
 @require_http_methods(["POST"])
@@ -50,7 +59,7 @@ def cart_add(request, variant_id):
         qty = 1
 
     try:
-        add_to_cart(cart, variant, qty)
+        add_to_cart(cart, variant, qty, session=request.session)
         messages.success(request, "Producto agregado al carrito ✅")
     except ValueError as e:
         messages.error(request, str(e))
@@ -61,16 +70,18 @@ def cart_add(request, variant_id):
 
 @require_http_methods(["POST"])
 def cart_remove(request, item_id):
-    cart = get_or_create_cart(request)
-    remove_item(cart, item_id)
+    cart = get_cart(request)
+    if cart:
+        remove_item(cart, item_id, session=request.session)
     messages.info(request, "Producto eliminado del carrito.")
     return redirect("cart:detail")
 
 
 @require_http_methods(["POST"])
 def cart_clear(request):
-    cart = get_or_create_cart(request)
-    clear_cart(cart)
+    cart = get_cart(request)
+    if cart:
+        clear_cart(cart, session=request.session)
     messages.info(request, "Carrito vaciado.")
     return redirect("cart:detail")
 
@@ -79,18 +90,6 @@ def cart_clear(request):
 # API JSON para actualizar cantidades sin recargar
 # -------------------------
 
-def _cart_count(cart) -> int:
-    agg = cart.items.aggregate(c=Sum("quantity"))
-    return int(agg["c"] or 0)
-
-
-def _can_checkout(cart) -> bool:
-    # True si todo ok (cantidad <= stock)
-    return not cart.items.select_related("variant").filter(
-        quantity__gt=DJF("variant__stock")
-    ).exists()
-
-
 @require_POST
 def cart_item_api(request, item_id):
     """
@@ -100,93 +99,147 @@ def cart_item_api(request, item_id):
     Devuelve:
       ok, deleted, item_qty, item_total, cart_subtotal, cart_count, can_checkout, items_left, stock
     """
-    cart = get_or_create_cart(request)
-
-    try:
-        item = CartItem.objects.select_related("variant", "variant__product").get(pk=item_id, cart=cart)
-    except CartItem.DoesNotExist:
+    cart = get_cart(request)
+    if cart is None:
         return JsonResponse({"ok": False, "error": "Ítem no encontrado."}, status=404)
 
     qty = request.POST.get("qty")
     delta = request.POST.get("delta")
+    is_delta = delta is not None and delta != ""
 
     try:
-        if delta is not None and delta != "":
-            qty_final = item.quantity + int(delta)
-        else:
-            qty_final = int(qty)
+        amount = int(delta if is_delta else qty)
     except (TypeError, ValueError):
         return JsonResponse({"ok": False, "error": "Cantidad inválida."}, status=400)
 
     try:
-        updated_item = set_qty(cart, item_id, qty_final)  # si <=0, debe eliminar y retornar None
+        updated_item = set_qty(cart, item_id, amount, delta=is_delta)  # si <=0, elimina y retorna None
+    except CartItem.DoesNotExist:
+        return JsonResponse({"ok": False, "error": "Ítem no encontrado."}, status=404)
     except ValueError as e:
-        item.variant.refresh_from_db()
-        return JsonResponse({"ok": False, "error": str(e), "stock": item.variant.stock}, status=400)
-
-    cart.refresh_from_db()
-
-    count = _cart_count(cart)
-    can_checkout = _can_checkout(cart)
-    items_left = cart.items.count()
-
-    if updated_item is None:
-        return JsonResponse({
-            "ok": True,
-            "deleted": True,
-            "cart_subtotal": str(cart.subtotal),
-            "cart_count": count,
-            "can_checkout": can_checkout,
-            "items_left": items_left,
+        line = build_cart_snapshot(cart).line(item_id)
+        return JsonResponse({"ok": False, "error": str(e), "stock": line.stock if line else 0}, status=400)
+
+    # Una consulta para todo lo que devuelve la respuesta
+    snapshot = build_cart_snapshot(cart)
+    remember_cart_count(request.session, cart, snapshot.count)
+
+    payload = {
+        "ok": True,
+        "deleted": updated_item is None,
+        "cart_subtotal": str(snapshot.subtotal),
+        "cart_count": snapshot.count,
+        "can_checkout": snapshot.can_checkout,
+        "items_left": snapshot.items_left,
+    }
+    line = snapshot.line(item_id)
+    if line is not None:
+        payload.update({
+            "item_qty": line.quantity,
+            "item_total": str(line.total),
+            "stock": line.stock,
         })
+    return JsonResponse(payload)
+
+
+def _parse_operation(raw):
+    if not isinstance(raw, dict):
+        raise ValueError
+    targets = [key for key in ("item_id", "variant_id") if raw.get(key) is not None]
+    amounts = [key for key in ("qty", "delta") if raw.get(key) is not None]
+    if len(targets) != 1 or len(amounts) != 1:
+        raise ValueError
+    return CartOperation(
+        **{targets[0]: int(raw[targets[0]])},
+        amount=int(raw[amounts[0]]),
+        delta=amounts[0] == "delta",
+    )
 
-    updated_item.refresh_from_db()
-    updated_item.variant.refresh_from_db()
 
+@require_POST
+def cart_batch_api(request):
+    """
+    Aplica varios cambios en una transacción. Recibe JSON:
+      {"seq": 12, "ops": [{"item_id": 5, "delta": 1}, {"variant_id": 9, "qty": 2}, ...]}
+    `seq` (opcional, creciente) descarta lotes que llegan después de uno más nuevo.
+    Devuelve:
+      ok, applied, seq, errors, cart_subtotal, cart_count, can_checkout, items_left,
+      items [{id, variant_id, qty, total, stock}]
+    """
+    try:
+        data = json.loads(request.body)
+        raw_ops = data["ops"]
+        if not isinstance(raw_ops, list) or not 0 < len(raw_ops) <= MAX_BATCH_OPERATIONS:
+            raise ValueError
+        operations = [_parse_operation(raw) for raw in raw_ops]
+        seq = data.get("seq")
+        seq = int(seq) if seq is not None else None
+    except (KeyError, TypeError, ValueError):
+        return JsonResponse({"ok": False, "error": "Operaciones inválidas."}, status=400)
+
+    cart = get_cart(request)
+    if cart is None and any(op.variant_id is not None for op in operations):
+        cart = get_or_create_cart(request)
+    if cart is None:
+        return JsonResponse({"ok": False, "error": "Ítem no encontrado."}, status=404)
+
+    try:
+        applied, errors = apply_cart_operations(cart, operations, seq=seq)
+    except Cart.DoesNotExist as e:
+        return JsonResponse({"ok": False, "error": str(e)}, status=404)
+
+    snapshot = build_cart_snapshot(cart)
+    remember_cart_count(request.session, cart, snapshot.count)
     return JsonResponse({
         "ok": True,
-        "deleted": False,
-        "item_qty": updated_item.quantity,
-        "item_total": str(updated_item.total),
-        "cart_subtotal": str(cart.subtotal),
-        "cart_count": count,
-        "can_checkout": can_checkout,
-        "items_left": items_left,
-        "stock": updated_item.variant.stock,
+        "applied": applied,
+        "seq": seq,
+        "errors": errors,
+        "cart_subtotal": str(snapshot.subtotal),
+        "cart_count": snapshot.count,
+        "can_checkout": snapshot.can_checkout,
+        "items_left": snapshot.items_left,
+        "items": [
+            {
+                "id": line.id,
+                "variant_id": line.variant_id,
+                "qty": line.quantity,
+                "total": str(line.total),
+                "stock": line.stock,
+            }
+            for line in snapshot.lines
+        ],
     })
 
 
 # -------------------------
 # API para navbar / mini-carrito
 # -------------------------
+def _summary_state(request):
+    # El carrito (por usuario) entra en el ETag vía conditional_view;
+    # la versión del catálogo cubre precios, nombres e imágenes del mini-carrito.
+    return catalog_state(request)
+
+
 @require_http_methods(["GET"])
+@conditional_view(_summary_state)
 def summary_api(request):
-    cart = get_or_create_cart(request)
-
-    items = (
-        cart.items
-        .select_related(
-            "variant",
-            "variant__product",
-            "variant__variant_image",      
-        )
-        .prefetch_related(
-            "variant__attributes",
-            "variant__product__images",   
-        )
-        .order_by("id")[:8]
-    )
+    # Sin carrito se responde vacío: abrir el mini-carrito no crea sesión ni carrito
+    cart = get_cart(request)
+    snapshot = get_cart_snapshot(cart, _catalog_version(request))
 
     mini_cart_html = render_to_string(
         "cart/_mini_cart.html",
-        {"cart": cart, "items": items},
+        {"cart": snapshot, "items": snapshot.lines[:8]},
         request=request
     )
 
-    cart_count = sum(i.quantity for i in cart.items.all())
+    # Corrige el contador de la sesión (p. ej. cambios desde otro dispositivo)
+    if cart is not None:
+        remember_cart_count(request.session, cart, snapshot.count)
 
     return JsonResponse({
         "ok": True,
         "mini_cart_html": mini_cart_html,
-        "cart_count": cart_count
+        "cart_count": snapshot.count
     })
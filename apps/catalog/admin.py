@@ -1,6 +1,11 @@
-from django.contrib import admin
+from django.contrib import admin, messages
+from django.shortcuts import redirect, render
+from django.urls import path
 from django.utils.html import mark_safe
-from .models import Category, Color, Product, ProductImage, Variant, VariantAttribute
+from .featured import pin_products, refresh_featured_pool, unpin_products
+from .forms import CatalogImportForm
+from .importer import MAX_REPORTED_ERRORS, CatalogImporter, CatalogImportError, detect_format, open_text, read_rows
+from .models import Category, Color, FeaturedProduct, Product, ProductImage, Variant, VariantAttribute
 
 # ==========================================
 # 1. CATEGORÍAS
@@ -68,11 +73,67 @@ class ProductAdmin(admin.ModelAdmin):
     prepopulated_fields = {'slug': ('name',)}
     inlines = [ProductImageInline, VariantInline] 
     list_per_page = 20
+    actions = ['destacar_en_portada', 'quitar_de_destacados']
+    change_list_template = "admin/catalog/product/change_list.html"
 
     def estado_visual(self, obj):
         return mark_safe('<span style="color: green;">✅ Activo</span>') if obj.is_active else mark_safe('<span style="color: red;">❌ Inactivo</span>')
     estado_visual.short_description = "Estado"
 
+    @admin.action(description="Destacar en portada (fijo)")
+    def destacar_en_portada(self, request, queryset):
+        ids = list(queryset.values_list("pk", flat=True))
+        pin_products(ids)
+        self.message_user(request, f"{len(ids)} productos fijados en destacados.")
+
+    @admin.action(description="Quitar de destacados")
+    def quitar_de_destacados(self, request, queryset):
+        ids = list(queryset.values_list("pk", flat=True))
+        unpin_products(ids)
+        self.message_user(request, f"{len(ids)} productos quitados de destacados.")
+
+    # ----- Importación masiva -----
+    def get_urls(self):
+        custom = [
+            path(
+                'importar/',
+                self.admin_site.admin_view(self.import_view),
+                name='catalog_product_import',
+            ),
+        ]
+        return custom + super().get_urls()
+
+    def import_view(self, request):
+        if not self.has_add_permission(request):
+            return redirect('admin:catalog_product_changelist')
+
+        stats = None
+        form = CatalogImportForm(request.POST or None, request.FILES or None)
+        if request.method == 'POST' and form.is_valid():
+            upload = form.cleaned_data['file']
+            try:
+                stream = open_text(upload.file)
+                importer = CatalogImporter(
+                    batch_size=form.cleaned_data['batch_size'],
+                    dry_run=form.cleaned_data['dry_run'],
+                )
+                stats = importer.run(read_rows(stream, detect_format(upload.name)))
+            except CatalogImportError as e:
+                messages.error(request, str(e))
+            else:
+                level = messages.WARNING if stats.errors else messages.SUCCESS
+                self.message_user(request, stats.summary(), level)
+
+        context = {
+            **self.admin_site.each_context(request),
+            'title': 'Importar catálogo',
+            'opts': self.model._meta,
+            'form': form,
+            'stats': stats,
+            'errors': stats.errors[:MAX_REPORTED_ERRORS] if stats else [],
+        }
+        return render(request, "admin/catalog/product/import.html", context)
+
 
 # ==========================================
 # 5. VARIANTES
@@ -113,4 +174,21 @@ class ProductImageAdmin(admin.ModelAdmin):
 
     def product_name(self, obj):
         return obj.product.name
-    product_name.short_description = "Producto"
\ No newline at end of file
+    product_name.short_description = "Producto"
+
+
+# ==========================================
+# 7. DESTACADOS DE LA PORTADA
+# ==========================================
+@admin.register(FeaturedProduct)
+class FeaturedProductAdmin(admin.ModelAdmin):
+    list_display = ('position', 'product', 'pinned', 'added_at')
+    list_filter = ('pinned',)
+    search_fields = ('product__name',)
+    autocomplete_fields = ['product']
+    actions = ['rotar_pool']
+
+    @admin.action(description="Rotar pool (conserva los fijos)")
+    def rotar_pool(self, request, queryset):
+        pinned, rotating = refresh_featured_pool()
+        self.message_user(request, f"Destacados: {pinned} fijos · {rotating} rotativos.")
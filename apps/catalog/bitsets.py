@@ -0,0 +1,112 @@
+"""
+Motor de filtros por bitsets sobre ordinales de variante.
+
+Cada variante listable recibe un ordinal (bit). Se guarda un entero de Python
+como bitset por (atributo, valor), por color y por estado de stock. Los
+ordinales se asignan en orden de precio, así cualquier rango de precio es un
+tramo contiguo de bits que sale de dos bisect (buckets exactos).
+
+Un filtro es: OR entre valores del mismo atributo/color, AND entre atributos,
+precio, stock y búsqueda. Los conteos del sidebar salen del mismo cálculo:
+para cada faceta se usa la máscara de todos los filtros excepto esa faceta.
+"""
+from bisect import bisect_left, bisect_right
+
+from .facets import COLOR_KEY, normalize
+
+
+def _iter_bits(mask):
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+class FilterEngine:
+    def __init__(self, products):
+        variants = sorted(
+            ((v.price, v.id, v, index) for index, p in enumerate(products) for v in p.variants),
+            key=lambda row: (row[0], row[1]),
+        )
+
+        self.products = tuple(products)
+        self.prices = [price for price, _, _, _ in variants]
+        self.owner = [index for _, _, _, index in variants]
+        self.all = (1 << len(variants)) - 1
+
+        self.product_bits = [0] * len(self.products)
+        self.bits = {}
+        self.in_stock = 0
+        for ordinal, (_, _, v, index) in enumerate(variants):
+            bit = 1 << ordinal
+            self.product_bits[index] |= bit
+            if v.stock > 0:
+                self.in_stock |= bit
+            for key, value_key in v.attr_keys:
+                self.bits[(key, value_key)] = self.bits.get((key, value_key), 0) | bit
+            if v.color_name:
+                color = (COLOR_KEY, normalize(v.color_name))
+                self.bits[color] = self.bits.get(color, 0) | bit
+
+        self.product_index = {p.id: i for i, p in enumerate(self.products)}
+
+    # ----- máscaras básicas -----
+    def price_mask(self, min_price=None, max_price=None):
+        lo = 0 if min_price is None else bisect_left(self.prices, min_price)
+        hi = len(self.prices) if max_price is None else bisect_right(self.prices, max_price)
+        if hi <= lo:
+            return 0
+        return ((1 << hi) - 1) ^ ((1 << lo) - 1)
+
+    def products_mask(self, product_ids):
+        mask = 0
+        for pid in product_ids:
+            index = self.product_index.get(pid)
+            if index is not None:
+                mask |= self.product_bits[index]
+        return mask
+
+    def value_mask(self, key, value_keys):
+        mask = 0
+        for value_key in value_keys:
+            mask |= self.bits.get((key, value_key), 0)
+        return mask
+
+    def product_count(self, mask):
+        return len({self.owner[o] for o in _iter_bits(mask)})
+
+    # ----- consulta -----
+    def query(self, product_ids=None, min_price=None, max_price=None, in_stock=False, selected=None):
+        """
+        `selected` viene de normalize_selection (COLOR_KEY para colores).
+        Devuelve (productos en orden del snapshot, conteos {(clave, valor): n}).
+        """
+        selected = {k: v for k, v in (selected or {}).items() if v}
+
+        base = self.all & self.price_mask(min_price, max_price)
+        if in_stock:
+            base &= self.in_stock
+        if product_ids is not None:
+            base &= self.products_mask(product_ids)
+
+        masks = {key: self.value_mask(key, values) for key, values in selected.items()}
+        result = base
+        for mask in masks.values():
+            result &= mask
+
+        # Facetas: sin selección en esa clave se usa el resultado; si no, todo menos ella
+        except_key = {}
+        for key in masks:
+            mask = base
+            for other, other_mask in masks.items():
+                if other != key:
+                    mask &= other_mask
+            except_key[key] = mask
+
+        counts = {}
+        for (key, value_key), bits in self.bits.items():
+            counts[(key, value_key)] = self.product_count(except_key.get(key, result) & bits)
+
+        owners = {self.owner[o] for o in _iter_bits(result)}
+        products = [p for i, p in enumerate(self.products) if i in owners]
+        return products, counts
@@ -0,0 +1,102 @@
+from django.db import transaction
+from django.db.models import Max, Min, Q
+
+from .models import Category, Product, ProductCard, ProductImage, Variant
+
+
+def _image_url(image):
+    if image is None or not image.image:
+        return ""
+    return image.image.url
+
+
+def _card_fields(product, min_price, max_price, max_stock, image):
+    category = product.category
+    return {
+        "name": product.name,
+        "slug": product.slug,
+        "description": product.description,
+        "category_name": category.name if category else "",
+        "category_slug": category.slug if category else "",
+        "min_price": min_price,
+        "max_price": max_price,
+        "in_stock": bool(max_stock and max_stock > 0),
+        "image_url": _image_url(image),
+        "image_placeholder": image.placeholder if image is not None else "",
+        "created_at": product.created_at,
+    }
+
+
+@transaction.atomic
+def refresh_product_card(product_id):
+    """
+    Recalcula la tarjeta de un producto. Si ya no es listable
+    (inactivo, borrado o sin variantes activas) se elimina.
+    """
+    product = (
+        Product.objects
+        .select_related("category")
+        .filter(pk=product_id, is_active=True)
+        .first()
+    )
+    stats = Variant.objects.filter(product_id=product_id, is_active=True).aggregate(
+        minp=Min("price"), maxp=Max("price"), stock=Max("stock")
+    )
+
+    if product is None or stats["minp"] is None:
+        ProductCard.objects.filter(product_id=product_id).delete()
+        return None
+
+    image = ProductImage.objects.filter(product_id=product_id).order_by("pk").first()
+    card, _ = ProductCard.objects.update_or_create(
+        product_id=product_id,
+        defaults=_card_fields(product, stats["minp"], stats["maxp"], stats["stock"], image),
+    )
+    return card
+
+
+def refresh_category_cards(category_id):
+    """
+    Renombrar/borrar una categoría solo cambia dos columnas: un UPDATE.
+    """
+    category = Category.objects.filter(pk=category_id).first()
+    if category is None:
+        ProductCard.objects.filter(product__category__isnull=True).update(
+            category_name="", category_slug=""
+        )
+        return
+    ProductCard.objects.filter(product__category_id=category_id).update(
+        category_name=category.name, category_slug=category.slug
+    )
+
+
+@transaction.atomic
+def rebuild_all_cards(batch_size=500):
+    active = Q(variants__is_active=True)
+    products = (
+        Product.objects
+        .filter(is_active=True)
+        .select_related("category")
+        .annotate(
+            card_min=Min("variants__price", filter=active),
+            card_max=Max("variants__price", filter=active),
+            card_stock=Max("variants__stock", filter=active),
+        )
+        .filter(card_min__isnull=False)
+    )
+
+    first_images = {}
+    for image in ProductImage.objects.order_by("product_id", "pk"):
+        first_images.setdefault(image.product_id, image)
+
+    ProductCard.objects.all().delete()
+    ProductCard.objects.bulk_create(
+        [
+            ProductCard(
+                product_id=p.pk,
+                **_card_fields(p, p.card_min, p.card_max, p.card_stock, first_images.get(p.pk)),
+            )
+            for p in products
+        ],
+        batch_size=batch_size,
+    )
@@ -0,0 +1,132 @@
+"""
+Hashes para detectar imágenes de producto repetidas.
+
+- content_hash: SHA-256 de los bytes subidos. Igualdad exacta: una subida
+  idéntica reutiliza el archivo ya guardado (ProductImage.save).
+- phash: dHash de 64 bits (diferencias de brillo en una grilla 9×8), en hex.
+  Resiste re-codificación y cambios de tamaño; dos fotos "iguales" quedan a
+  pocos bits de distancia (Hamming). El comando dedupe_product_images agrupa
+  las cercanas con un BK-tree.
+"""
+import hashlib
+from io import BytesIO
+
+HASH_CHUNK = 64 * 1024
+
+
+def hamming(a, b):
+    return (a ^ b).bit_count()
+
+
+def dhash(image, size=8):
+    from PIL import Image, ImageOps
+
+    gray = ImageOps.exif_transpose(image).convert("L").resize((size + 1, size), Image.LANCZOS)
+    pixels = gray.tobytes()
+    value = 0
+    for row in range(size):
+        offset = row * (size + 1)
+        for col in range(size):
+            value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return f"{value:0{size * size // 4}x}"
+
+
+def hash_file(f):
+    """
+    (content_hash, phash) de un archivo abierto; lo deja rebobinado.
+    phash queda "" si Pillow no puede leerlo.
+    """
+    from PIL import Image
+
+    f.seek(0)
+    digest = hashlib.sha256()
+    data = BytesIO()
+    for chunk in iter(lambda: f.read(HASH_CHUNK), b""):
+        digest.update(chunk)
+        data.write(chunk)
+    f.seek(0)
+
+    try:
+        data.seek(0)
+        phash = dhash(Image.open(data))
+    except (OSError, ValueError):
+        phash = ""
+    return digest.hexdigest(), phash
+
+
+class BKTree:
+    """
+    Árbol BK sobre enteros con distancia de Hamming: la búsqueda por radio
+    solo baja por las ramas cuya distancia al nodo cae en [d - r, d + r].
+    """
+
+    def __init__(self, items=()):
+        self.root = None
+        for item in items:
+            self.add(item)
+
+    def add(self, item):
+        if self.root is None:
+            self.root = (item, {})
+            return
+        node = self.root
+        while True:
+            value, children = node
+            distance = hamming(item, value)
+            if distance == 0:
+                return
+            child = children.get(distance)
+            if child is None:
+                children[distance] = (item, {})
+                return
+            node = child
+
+    def search(self, item, radius):
+        found = []
+        stack = [self.root] if self.root is not None else []
+        while stack:
+            value, children = stack.pop()
+            distance = hamming(item, value)
+            if distance <= radius:
+                found.append(value)
+            for d in range(max(distance - radius, 1), distance + radius + 1):
+                child = children.get(d)
+                if child is not None:
+                    stack.append(child)
+        return found
+
+
+def group_similar(hashes, radius):
+    """
+    Agrupa los hashes (hex) a distancia <= radius, transitivamente.
+    Devuelve todas las componentes, incluidas las de un solo hash.
+    """
+    values = {int(h, 16): h for h in hashes if h}
+    tree = BKTree(values)
+    parent = {v: v for v in values}
+
+    def find(v):
+        while parent[v] != v:
+            parent[v] = parent[parent[v]]
+            v = parent[v]
+        return v
+
+    for value in values:
+        for other in tree.search(value, radius):
+            ra, rb = find(value), find(other)
+            if ra != rb:
+                parent[rb] = ra
+
+    groups = {}
+    for value, hex_value in values.items():
+        groups.setdefault(find(value), []).append(hex_value)
+    return list(groups.values())
+
+
+def color_distance(a, b):
+    """Distancia euclídea RGB entre dos "#rrggbb" (0 si falta alguno)."""
+    if not a or not b:
+        return 0
+    pa = [int(a[i:i + 2], 16) for i in (1, 3, 5)]
+    pb = [int(b[i:i + 2], 16) for i in (1, 3, 5)]
+    return sum((x - y) ** 2 for x, y in zip(pa, pb)) ** 0.5
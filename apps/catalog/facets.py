@@ -0,0 +1,197 @@
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Count, Min
+
+from .models import AttributeFacet, Variant, VariantAttribute
+
+# Clave de faceta para el color de la variante (no es un VariantAttribute)
+COLOR_KEY = "__color__"
+COLOR_PARAM = "color"
+
+
+def normalize(text) -> str:
+    return str(text or "").strip().lower()
+
+
+def normalize_selection(filters):
+    """
+    {nombre: valor o [valores]} -> {clave: frozenset(claves_valor)}.
+    Varios valores del mismo atributo se combinan con OR.
+    """
+    selected = {}
+    for name, values in (filters or {}).items():
+        if isinstance(values, str):
+            values = [values]
+        keys = frozenset(normalize(v) for v in values if normalize(v))
+        if keys:
+            selected[normalize(name)] = keys
+    return selected
+
+
+def _facet_rows(attrs):
+    return [
+        AttributeFacet(
+            product_id=product_id,
+            variant_id=variant_id,
+            name=name.strip(),
+            value=value.strip(),
+            key=normalize(name),
+            value_key=normalize(value),
+        )
+        for variant_id, product_id, name, value in attrs
+    ]
+
+
+@transaction.atomic
+def rebuild_product_facets(product_id):
+    """
+    Reconstruye las facetas de un solo producto (las señales llaman a esto
+    en cada cambio de Product / Variant / VariantAttribute).
+    """
+    AttributeFacet.objects.filter(product_id=product_id).delete()
+
+    attrs = (
+        VariantAttribute.objects
+        .filter(
+            variant__product_id=product_id,
+            variant__is_active=True,
+            variant__product__is_active=True,
+        )
+        .values_list("variant_id", "variant__product_id", "name", "value")
+    )
+    AttributeFacet.objects.bulk_create(_facet_rows(attrs))
+
+
+@transaction.atomic
+def rebuild_all_facets(batch_size=1000):
+    AttributeFacet.objects.all().delete()
+
+    attrs = (
+        VariantAttribute.objects
+        .filter(variant__is_active=True, variant__product__is_active=True)
+        .values_list("variant_id", "variant__product_id", "name", "value")
+    )
+    AttributeFacet.objects.bulk_create(_facet_rows(attrs), batch_size=batch_size)
+
+
+def count_facets(variants, selected):
+    """
+    Conteos por (atributo, valor) para la selección actual.
+
+    `variants` es un iterable de (product_id, {clave: {valores}}) con las
+    variantes que ya cumplen los filtros que no son de atributo (una variante
+    puede tener varios valores para la misma clave); `selected` viene de
+    normalize_selection. Para el atributo A se cuentan los productos con alguna
+    variante que cumple todos los filtros seleccionados excepto A (así el
+    select de A sigue mostrando cuántos productos tendría cada alternativa).
+    """
+    counts = defaultdict(set)
+    for product_id, attrs in variants:
+        misses = [k for k, v in selected.items() if attrs.get(k, set()).isdisjoint(v)]
+        if not misses:
+            for key, value_keys in attrs.items():
+                for value_key in value_keys:
+                    counts[(key, value_key)].add(product_id)
+        elif len(misses) == 1 and misses[0] in attrs:
+            key = misses[0]
+            for value_key in attrs[key]:
+                counts[(key, value_key)].add(product_id)
+
+    return {k: len(v) for k, v in counts.items()}
+
+
+def _live_counts(variant_qs, selected):
+    # Una sola lectura del índice para las variantes que cumplen los filtros
+    rows = (
+        AttributeFacet.objects
+        .filter(variant__in=variant_qs)
+        .values_list("product_id", "variant_id", "key", "value_key")
+    )
+
+    variants = {}
+    for product_id, variant_id, key, value_key in rows:
+        variants.setdefault(variant_id, (product_id, defaultdict(set)))[1][key].add(value_key)
+
+    colors = (
+        Variant.objects
+        .filter(pk__in=variant_qs, color__isnull=False)
+        .values_list("product_id", "pk", "color__name")
+    )
+    for product_id, variant_id, color_name in colors:
+        variants.setdefault(variant_id, (product_id, defaultdict(set)))[1][COLOR_KEY].add(normalize(color_name))
+
+    return count_facets(variants.values(), selected)
+
+
+def _color_options():
+    # Color no es único por nombre: se agrupa por nombre normalizado en Python
+    rows = (
+        Variant.objects
+        .filter(is_active=True, product__is_active=True, color__isnull=False)
+        .values_list("color__name", "product_id")
+        .distinct()
+    )
+    displays = {}
+    products = defaultdict(set)
+    for name, product_id in rows:
+        value_key = normalize(name)
+        displays.setdefault(value_key, name.strip())
+        products[value_key].add(product_id)
+    return [
+        (COLOR_KEY, "Color", value_key, displays[value_key], len(products[value_key]))
+        for value_key in sorted(products)
+    ]
+
+
+def build_attr_ui(params, options, live=None):
+    """
+    `options`: (clave, etiqueta, clave_valor, valor, conteo_global) ordenadas por
+    clave y valor. Con `live` (de count_facets) se muestran los conteos en vivo.
+    """
+    attr_ui = []
+    by_key = {}
+    for key, label, value_key, display, count in options:
+        if key not in by_key:
+            param = COLOR_PARAM if key == COLOR_KEY else f"attr_{key}"
+            by_key[key] = {
+                "label": label,
+                "key": param,
+                "values": [],
+                "selected": params.get(param, ""),
+            }
+            attr_ui.append(by_key[key])
+
+        if live is not None:
+            count = live.get((key, value_key), 0)
+        by_key[key]["values"].append({"value": display, "count": count})
+
+    return attr_ui
+
+
+def facet_sidebar(params, variant_qs=None, selected=None):
+    """
+    Arma el `attr_ui` del catálogo desde el índice en BD.
+
+    - Sin filtros (variant_qs=None): una sola consulta agrupada sobre el índice.
+    - Con filtros: una consulta más para los conteos en vivo.
+    Los colores van como una faceta más (COLOR_KEY) con su propia consulta.
+    """
+    selected = normalize_selection(selected)
+
+    options = list(
+        AttributeFacet.objects
+        .values("key", "value_key")
+        .annotate(
+            label=Min("name"),
+            display=Min("value"),
+            count=Count("product", distinct=True),
+        )
+        .order_by("key", "value_key")
+        .values_list("key", "label", "value_key", "display", "count")
+    )
+
+    options = _color_options() + options
+
+    live = _live_counts(variant_qs, selected) if variant_qs is not None else None
+    return build_attr_ui(params, options, live)
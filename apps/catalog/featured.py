@@ -0,0 +1,118 @@
+"""
+Productos destacados de la portada.
+
+- Pool: filas FeaturedProduct con posiciones densas 0..n-1. Los fijos (admin)
+  se conservan; el resto se renueva con `refresh_featured` (p. ej. en un cron).
+- Selección: se sortean posiciones en Python y se leen solo esas tarjetas
+  (ProductCard), así el costo no depende del tamaño del catálogo.
+- La selección se cachea settings.CATALOG_FEATURED_TTL segundos.
+"""
+import random
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+
+from .models import FeaturedProduct, ProductCard
+
+FEATURED_CACHE_KEY = "catalog:featured"
+
+
+def _pool_size():
+    return getattr(settings, "CATALOG_FEATURED_POOL_SIZE", 24)
+
+
+def invalidate_featured():
+    cache.delete(FEATURED_CACHE_KEY)
+
+
+def _renumber(entries):
+    for position, entry in enumerate(entries):
+        entry.position = position
+    FeaturedProduct.objects.bulk_update(entries, ["position"])
+
+
+@transaction.atomic
+def refresh_featured_pool(size=None):
+    """
+    Conserva los fijos listables y completa hasta `size` con productos
+    listables en stock elegidos al azar (distintos a los del pool anterior
+    cuando alcanza). Devuelve (fijos, rotativos).
+    """
+    size = size or _pool_size()
+
+    # Los que ya no son listables (sin tarjeta) salen del pool
+    FeaturedProduct.objects.filter(product__card__isnull=True).delete()
+
+    pinned = list(FeaturedProduct.objects.filter(pinned=True).order_by("position", "pk"))
+    previous = set(
+        FeaturedProduct.objects.filter(pinned=False).values_list("product_id", flat=True)
+    )
+    FeaturedProduct.objects.filter(pinned=False).delete()
+
+    slots = max(size - len(pinned), 0)
+    candidates = (
+        ProductCard.objects
+        .filter(in_stock=True)
+        .exclude(product__featured__isnull=False)
+        .values_list("product_id", flat=True)
+    )
+    fresh = list(candidates.exclude(product_id__in=previous).order_by("?")[:slots])
+    if len(fresh) < slots:
+        fresh += list(candidates.filter(product_id__in=previous).order_by("?")[: slots - len(fresh)])
+
+    rotating = FeaturedProduct.objects.bulk_create(
+        [FeaturedProduct(product_id=pid) for pid in fresh]
+    )
+    _renumber(pinned + rotating)
+    transaction.on_commit(invalidate_featured)
+    return len(pinned), len(rotating)
+
+
+@transaction.atomic
+def pin_products(product_ids):
+    existing = set(
+        FeaturedProduct.objects.filter(product_id__in=product_ids).values_list("product_id", flat=True)
+    )
+    FeaturedProduct.objects.filter(product_id__in=existing).update(pinned=True)
+    FeaturedProduct.objects.bulk_create(
+        [FeaturedProduct(product_id=pid, pinned=True) for pid in product_ids if pid not in existing]
+    )
+    _renumber(list(FeaturedProduct.objects.order_by("-pinned", "position", "pk")))
+    transaction.on_commit(invalidate_featured)
+
+
+@transaction.atomic
+def unpin_products(product_ids):
+    FeaturedProduct.objects.filter(product_id__in=product_ids).delete()
+    _renumber(list(FeaturedProduct.objects.order_by("position", "pk")))
+    transaction.on_commit(invalidate_featured)
+
+
+def _pick(count):
+    size = FeaturedProduct.objects.count()
+    if not size:
+        # Pool vacío (aún no se corrió refresh_featured): cualquier tarjeta
+        return list(ProductCard.objects.filter(in_stock=True)[:count])
+
+    # Sobremuestreo: si una posición quedó sin tarjeta igual alcanzan
+    positions = random.sample(range(size), min(size, count * 2))
+    cards = list(
+        ProductCard.objects
+        .filter(product__featured__position__in=positions)
+        .annotate(featured_position=F("product__featured__position"))
+    )
+    cards.sort(key=lambda c: positions.index(c.featured_position))
+    return cards[:count]
+
+
+def get_featured_products(count=4):
+    """
+    `count` tarjetas al azar del pool: 2 consultas, o 0 mientras dure la caché.
+    """
+    cards = cache.get(FEATURED_CACHE_KEY)
+    if cards is None:
+        cards = _pick(count)
+        cache.set(FEATURED_CACHE_KEY, cards, getattr(settings, "CATALOG_FEATURED_TTL", 60))
+    return cards[:count]
@@ -0,0 +1,21 @@
+from django import forms
+
+from .importer import DEFAULT_BATCH_SIZE
+
+
+class CatalogImportForm(forms.Form):
+    file = forms.FileField(
+        label="Archivo",
+        help_text="CSV, JSON o JSON Lines; una fila por variante.",
+    )
+    batch_size = forms.IntegerField(
+        label="Filas por lote",
+        min_value=1,
+        max_value=20000,
+        initial=DEFAULT_BATCH_SIZE,
+    )
+    dry_run = forms.BooleanField(
+        label="Solo validar (no guarda cambios)",
+        required=False,
+        initial=True,
+    )
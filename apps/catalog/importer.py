@@ -0,0 +1,497 @@
+"""
+Importación masiva del catálogo desde CSV, JSON o JSON Lines.
+
+Una fila = una variante. Las filas de un mismo producto se agrupan por `slug`
+(si viene) o por `name`. Columnas:
+
+    name*, slug, description, category, is_active,
+    color, color_hex, price*, stock, sku,
+    attributes  ("Talla=M;Material=Jean" o un objeto en JSON),
+    images      ("products/a.jpg|products/b.jpg" o una lista en JSON)
+
+- Con `slug` de un producto existente se actualiza ese producto (solo las
+  columnas que traen valor: una descripción o categoría vacía no borra la
+  actual); sus variantes se emparejan por `sku` (sin sku siempre se crea una
+  variante nueva).
+- Categorías, colores y slugs se precargan una vez; los slugs nuevos se
+  asignan en memoria contra ese conjunto (sin una consulta por candidato).
+- Se escribe con bulk_create / bulk_update en lotes de `batch_size` filas,
+  cada lote en su transacción. `dry_run` valida y escribe todo dentro de una
+  transacción que al final se revierte.
+- bulk_create no dispara señales: al terminar se refrescan facetas y
+  tarjetas (por producto o completas, según cuántos se tocaron) y se suben
+  las versiones del catálogo.
+"""
+import codecs
+import csv
+import io
+import json
+import time
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+
+from .cards import rebuild_all_cards, refresh_product_card
+from .facets import rebuild_all_facets, rebuild_product_facets
+from .models import Category, Color, Product, ProductImage, Variant, VariantAttribute
+from .slugs import allocate_slug
+from .versioning import bump_catalog_version, bump_product_versions
+
+DEFAULT_BATCH_SIZE = 1000
+# Hasta cuántos productos tocados conviene refrescar uno a uno en vez de reconstruir todo
+INCREMENTAL_REFRESH_LIMIT = 200
+DEFAULT_COLOR_HEX = "#cccccc"
+MAX_REPORTED_ERRORS = 50
+# Excel en Windows guarda los CSV en cp1252 (Latin-1 ampliado), no en UTF-8
+FALLBACK_ENCODING = "cp1252"
+
+_TRUE = {"1", "true", "si", "sí", "yes", "x"}
+_FALSE = {"0", "false", "no"}
+
+
+class CatalogImportError(Exception):
+    """Archivo ilegible o formato no soportado (errores de fila no la lanzan)."""
+
+
+# -------------------------------------------------------------------
+# Lectura
+# -------------------------------------------------------------------
+def detect_format(filename):
+    name = (filename or "").lower()
+    if name.endswith(".csv"):
+        return "csv"
+    if name.endswith((".json", ".jsonl", ".ndjson")):
+        return "json"
+    raise CatalogImportError("Formato no soportado: use .csv, .json o .jsonl.")
+
+
+def open_text(binary):
+    """
+    Envuelve un archivo binario (con seek) como texto: UTF-8, con o sin BOM,
+    si todo el archivo lo es; si no, FALLBACK_ENCODING. Se revisa antes de
+    importar para no fallar a mitad de camino con lotes ya confirmados.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    encoding = "utf-8-sig"
+    try:
+        for chunk in iter(lambda: binary.read(64 * 1024), b""):
+            decoder.decode(chunk)
+        decoder.decode(b"", final=True)
+    except UnicodeDecodeError:
+        encoding = FALLBACK_ENCODING
+    binary.seek(0)
+    # cp1252 deja cinco bytes sin definir: se reemplazan en vez de abortar
+    return io.TextIOWrapper(binary, encoding=encoding, errors="replace", newline="")
+
+
+def read_rows(stream, fmt):
+    """
+    Itera (número_de_línea, dict) desde un stream de texto.
+    CSV y JSON Lines se leen fila a fila; un arreglo JSON se carga entero.
+    """
+    if fmt == "csv":
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row
+        return
+
+    first = stream.read(1)
+    while first and first.isspace():
+        first = stream.read(1)
+    if first == "[":
+        try:
+            data = json.loads(first + stream.read())
+        except ValueError as e:
+            raise CatalogImportError(f"JSON inválido: {e}")
+        for i, row in enumerate(data, start=1):
+            yield i, row
+        return
+
+    for i, line in enumerate(_prepend(first, stream), start=1):
+        if not line.strip():
+            continue
+        try:
+            yield i, json.loads(line)
+        except ValueError as e:
+            raise CatalogImportError(f"Línea {i}: JSON inválido ({e}).")
+
+
+def _prepend(first, stream):
+    lines = iter(stream)
+    yield first + next(lines, "")
+    yield from lines
+
+
+# -------------------------------------------------------------------
+# Normalización de filas
+# -------------------------------------------------------------------
+def _text(row, key):
+    value = row.get(key)
+    return "" if value is None else str(value).strip()
+
+
+def _bool(value, default=True):
+    value = str(value).strip().lower() if value is not None else ""
+    if value in _TRUE:
+        return True
+    if value in _FALSE:
+        return False
+    return default
+
+
+def _attributes(value):
+    if isinstance(value, dict):
+        pairs = value.items()
+    else:
+        pairs = []
+        for chunk in str(value or "").split(";"):
+            if "=" in chunk:
+                pairs.append(chunk.split("=", 1))
+            elif chunk.strip():
+                raise ValueError(f"Atributo sin valor: '{chunk.strip()}' (use Nombre=Valor).")
+    return [(str(n).strip(), str(v).strip()) for n, v in pairs if str(n).strip() and str(v).strip()]
+
+
+def _images(value):
+    if isinstance(value, (list, tuple)):
+        refs = value
+    else:
+        refs = str(value or "").split("|")
+    return [str(r).strip() for r in refs if str(r).strip()]
+
+
+def parse_row(row):
+    if not isinstance(row, dict):
+        raise ValueError("La fila no es un objeto.")
+
+    name = _text(row, "name")
+    if not name:
+        raise ValueError("Falta 'name'.")
+
+    try:
+        price = Decimal(_text(row, "price").replace(",", "."))
+    except InvalidOperation:
+        raise ValueError(f"Precio inválido: '{_text(row, 'price')}'.")
+    if not price.is_finite():
+        raise ValueError(f"Precio inválido: '{_text(row, 'price')}'.")
+    price = price.quantize(Decimal("0.01"))
+    if price < 0:
+        raise ValueError("El precio no puede ser negativo.")
+
+    stock_raw = _text(row, "stock") or "0"
+    try:
+        stock = int(stock_raw)
+    except ValueError:
+        raise ValueError(f"Stock inválido: '{stock_raw}'.")
+    if stock < 0:
+        raise ValueError("El stock no puede ser negativo.")
+
+    slug = _text(row, "slug")
+    return {
+        "key": slug or f"name:{name}",
+        "name": name,
+        "slug": slug,
+        "description": _text(row, "description"),
+        "category": _text(row, "category"),
+        # None = la columna no vino: al actualizar no se toca, al crear es True
+        "is_active": _bool(row.get("is_active"), default=None),
+        "color": _text(row, "color"),
+        "color_hex": _text(row, "color_hex") or DEFAULT_COLOR_HEX,
+        "price": price,
+        "stock": stock,
+        "sku": _text(row, "sku"),
+        "attributes": _attributes(row.get("attributes")),
+        "images": _images(row.get("images")),
+    }
+
+
+# -------------------------------------------------------------------
+# Resultado
+# -------------------------------------------------------------------
+class ImportStats:
+    def __init__(self):
+        self.rows = 0
+        self.products_created = 0
+        self.products_updated = 0
+        self.variants_created = 0
+        self.variants_updated = 0
+        self.attributes = 0
+        self.images = 0
+        self.categories = 0
+        self.colors = 0
+        self.errors = []
+        self.elapsed = 0.0
+        self.dry_run = False
+
+    @property
+    def rows_per_second(self):
+        return self.rows / self.elapsed if self.elapsed else 0.0
+
+    def add_error(self, line, message):
+        self.errors.append((line, message))
+
+    def summary(self):
+        prefix = "[DRY-RUN] " if self.dry_run else ""
+        return (
+            f"{prefix}{self.rows} filas en {self.elapsed:.2f}s ({self.rows_per_second:,.0f} filas/s) · "
+            f"productos +{self.products_created} ~{self.products_updated} · "
+            f"variantes +{self.variants_created} ~{self.variants_updated} · "
+            f"atributos {self.attributes} · imágenes {self.images} · "
+            f"categorías +{self.categories} · colores +{self.colors} · "
+            f"errores {len(self.errors)}"
+        )
+
+
+# -------------------------------------------------------------------
+# Importador
+# -------------------------------------------------------------------
+class CatalogImporter:
+    def __init__(self, batch_size=DEFAULT_BATCH_SIZE, dry_run=False):
+        self.batch_size = max(int(batch_size), 1)
+        self.dry_run = dry_run
+        self.stats = ImportStats()
+        self.stats.dry_run = dry_run
+
+        # Clave de fila -> pk del producto (los productos pueden cruzar lotes)
+        self.product_ids = {}
+        self.touched = set()
+
+    def _preload(self):
+        self.slugs = {}
+        for pk, slug in Product.objects.values_list("pk", "slug"):
+            self.slugs[slug] = pk
+        self.taken_slugs = set(self.slugs)
+
+        self.categories = {}
+        self.category_slugs = set()
+        for pk, name, slug in Category.objects.values_list("pk", "name", "slug"):
+            self.categories.setdefault(name.strip().lower(), pk)
+            self.category_slugs.add(slug)
+
+        self.colors = {}
+        for pk, name in Color.objects.values_list("pk", "name"):
+            self.colors.setdefault(name.strip().lower(), pk)
+
+    def run(self, rows):
+        """
+        `rows`: iterable de (número_de_línea, dict), p. ej. read_rows(...).
+        """
+        started = time.perf_counter()
+        if self.dry_run:
+            with transaction.atomic():
+                self._run(rows)
+                transaction.set_rollback(True)
+        else:
+            self._run(rows)
+            if self.touched:
+                self._refresh_derived()
+        self.stats.elapsed = time.perf_counter() - started
+        return self.stats
+
+    def _run(self, rows):
+        self._preload()
+        batch = []
+        for line, raw in rows:
+            self.stats.rows += 1
+            try:
+                row = parse_row(raw)
+            except ValueError as e:
+                self.stats.add_error(line, str(e))
+                continue
+            row["line"] = line
+            batch.append(row)
+            if len(batch) >= self.batch_size:
+                self._write_batch(batch)
+                batch = []
+        if batch:
+            self._write_batch(batch)
+
+    @transaction.atomic
+    def _write_batch(self, batch):
+        category_ids = self._ensure_categories(batch)
+        color_ids = self._ensure_colors(batch)
+        product_ids = self._write_products(batch, category_ids)
+        self._write_variants(batch, product_ids, color_ids)
+        self._write_images(batch, product_ids)
+
+    # ----- catálogos auxiliares -----
+    def _ensure_categories(self, batch):
+        new = {}
+        for row in batch:
+            name = row["category"]
+            if name and name.lower() not in self.categories and name.lower() not in new:
+                new[name.lower()] = Category(
+                    name=name, slug=allocate_slug(name, self.category_slugs, max_length=120)
+                )
+        for key, category in zip(new, Category.objects.bulk_create(new.values())):
+            self.categories[key] = category.pk
+        self.stats.categories += len(new)
+        return self.categories
+
+    def _ensure_colors(self, batch):
+        new = {}
+        for row in batch:
+            name = row["color"]
+            if name and name.lower() not in self.colors and name.lower() not in new:
+                new[name.lower()] = Color(name=name, hex_code=row["color_hex"][:7])
+        for key, color in zip(new, Color.objects.bulk_create(new.values())):
+            self.colors[key] = color.pk
+        self.stats.colors += len(new)
+        return self.colors
+
+    # ----- productos -----
+    def _write_products(self, batch, category_ids):
+        to_create = {}
+        to_update = {}
+        update_fields = {}
+        for row in batch:
+            key = row["key"]
+            if key in self.product_ids or key in to_create or key in to_update:
+                continue
+            fields = {"name": row["name"]}
+            if row["description"]:
+                fields["description"] = row["description"]
+            if row["category"]:
+                fields["category_id"] = category_ids.get(row["category"].lower())
+            if row["is_active"] is not None:
+                fields["is_active"] = row["is_active"]
+            if row["slug"] and row["slug"] in self.slugs:
+                to_update[key] = Product(pk=self.slugs[row["slug"]], slug=row["slug"], **fields)
+                # Se agrupan por columnas presentes: un bulk_update por combinación
+                update_fields.setdefault(tuple(fields), []).append(to_update[key])
+            else:
+                slug = row["slug"] if row["slug"] and row["slug"] not in self.taken_slugs else None
+                if slug:
+                    self.taken_slugs.add(slug)
+                else:
+                    slug = allocate_slug(row["slug"] or row["name"], self.taken_slugs)
+                to_create[key] = Product(slug=slug, **fields)
+
+        created = Product.objects.bulk_create(to_create.values(), batch_size=self.batch_size)
+        for key, product in zip(to_create, created):
+            self.product_ids[key] = product.pk
+            self.slugs[product.slug] = product.pk
+
+        for fields, products in update_fields.items():
+            Product.objects.bulk_update(products, fields, batch_size=self.batch_size)
+        for key, product in to_update.items():
+            self.product_ids[key] = product.pk
+
+        self.stats.products_created += len(to_create)
+        self.stats.products_updated += len(to_update)
+        self.touched.update(self.product_ids[k] for k in list(to_create) + list(to_update))
+        return self.product_ids
+
+    # ----- variantes y atributos -----
+    def _write_variants(self, batch, product_ids, color_ids):
+        pids = {product_ids[row["key"]] for row in batch}
+        by_sku = {
+            (pid, sku): pk
+            for pid, sku, pk in Variant.objects
+            .filter(product_id__in=pids)
+            .exclude(sku="")
+            .values_list("product_id", "sku", "pk")
+        }
+
+        to_create = []
+        to_update = []
+        attrs_for = []
+        seen = set()
+        for row in batch:
+            pid = product_ids[row["key"]]
+            if row["sku"]:
+                if (pid, row["sku"]) in seen:
+                    self.stats.add_error(row["line"], f"SKU repetido en el producto: '{row['sku']}'.")
+                    continue
+                seen.add((pid, row["sku"]))
+            variant = Variant(
+                product_id=pid,
+                color_id=color_ids.get(row["color"].lower()) if row["color"] else None,
+                price=row["price"],
+                stock=row["stock"],
+                sku=row["sku"],
+                is_active=True,
+            )
+            existing = by_sku.get((pid, row["sku"])) if row["sku"] else None
+            if existing:
+                variant.pk = existing
+                to_update.append(variant)
+            else:
+                to_create.append(variant)
+            attrs_for.append((variant, row["attributes"]))
+
+        Variant.objects.bulk_create(to_create, batch_size=self.batch_size)
+        Variant.objects.bulk_update(
+            to_update, ["color", "price", "stock", "sku", "is_active"], batch_size=self.batch_size
+        )
+
+        # Variantes actualizadas: sus atributos pasan a ser los de la fila. Se
+        # actualizan en sitio; borrar en masa dispararía las señales por fila.
+        updated = {v.pk for v in to_update}
+        current = {}
+        for attr in VariantAttribute.objects.filter(
+            variant_id__in=[v.pk for v, attrs in attrs_for if attrs and v.pk in updated]
+        ):
+            current[(attr.variant_id, attr.name.strip().lower())] = attr
+
+        new_attrs = []
+        changed = []
+        kept = set()
+        for v, attrs in attrs_for:
+            for name, value in attrs:
+                attr = current.get((v.pk, name.lower())) if v.pk in updated else None
+                if attr is None:
+                    new_attrs.append(VariantAttribute(variant_id=v.pk, name=name, value=value))
+                    continue
+                kept.add(attr.pk)
+                if attr.value != value or attr.name != name:
+                    attr.name, attr.value = name, value
+                    changed.append(attr)
+
+        VariantAttribute.objects.bulk_create(new_attrs, batch_size=self.batch_size)
+        VariantAttribute.objects.bulk_update(changed, ["name", "value"], batch_size=self.batch_size)
+        stale = [attr.pk for attr in current.values() if attr.pk not in kept]
+        if stale:
+            VariantAttribute.objects.filter(pk__in=stale).delete()
+
+        self.stats.variants_created += len(to_create)
+        self.stats.variants_updated += len(to_update)
+        self.stats.attributes += len(new_attrs) + len(changed)
+
+    # ----- imágenes -----
+    def _write_images(self, batch, product_ids):
+        wanted = {}
+        for row in batch:
+            for ref in row["images"]:
+                wanted.setdefault(product_ids[row["key"]], []).append(ref)
+        if not wanted:
+            return
+
+        existing = set(
+            ProductImage.objects
+            .filter(product_id__in=wanted)
+            .values_list("product_id", "image")
+        )
+        names = {pid: name for pid, name in Product.objects.filter(pk__in=wanted).values_list("pk", "name")}
+        images = []
+        for pid, refs in wanted.items():
+            for ref in refs:
+                if (pid, ref) in existing:
+                    continue
+                existing.add((pid, ref))
+                images.append(ProductImage(product_id=pid, image=ref, alt_text=names.get(pid, "")[:150]))
+
+        ProductImage.objects.bulk_create(images, batch_size=self.batch_size)
+        self.stats.images += len(images)
+
+    # ----- índices derivados -----
+    def _refresh_derived(self):
+        if len(self.touched) <= INCREMENTAL_REFRESH_LIMIT:
+            for product_id in self.touched:
+                rebuild_product_facets(product_id)
+                refresh_product_card(product_id)
+        else:
+            rebuild_all_facets()
+            rebuild_all_cards()
+        bump_product_versions(list(self.touched))
+        bump_catalog_version()
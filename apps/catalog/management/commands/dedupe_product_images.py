@@ -0,0 +1,111 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from apps.catalog.cards import refresh_product_card
+from apps.catalog.dedup import color_distance, group_similar, hamming, hash_file
+from apps.catalog.models import ProductImage
+from apps.catalog.versioning import bump_catalog_version, bump_product_versions
+
+# Fotos de la misma prenda en otro color dan un dHash (gris) casi igual:
+# solo se fusionan si además el color dominante se parece
+MAX_COLOR_DISTANCE = 40
+
+
+class Command(BaseCommand):
+    help = (
+        "Busca imágenes de producto repetidas o casi iguales (hash perceptual + BK-tree) "
+        "y las reporta; con --merge hace que compartan un único archivo."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--threshold", type=int, default=5,
+            help="Distancia de Hamming máxima entre dHash de 64 bits (0 = idénticas).",
+        )
+        parser.add_argument(
+            "--merge", action="store_true",
+            help="Apunta los duplicados al archivo de mayor resolución y borra los sobrantes.",
+        )
+
+    def handle(self, *args, **options):
+        hashed = self.fill_missing_hashes()
+        if hashed:
+            self.stdout.write(f"Huellas calculadas: {hashed}")
+
+        images = list(ProductImage.objects.exclude(image="").exclude(phash="").order_by("pk"))
+        by_hash = {}
+        for image in images:
+            by_hash.setdefault(image.phash, []).append(image)
+
+        groups = []
+        for hashes in group_similar(by_hash, options["threshold"]):
+            members = [image for h in hashes for image in by_hash[h]]
+            if len({image.image.name for image in members}) > 1:
+                groups.append(members)
+
+        reclaimable = merged = 0
+        touched = set()
+        for members in groups:
+            keeper = max(members, key=lambda im: ((im.width or 0) * (im.height or 0), im.file_size or 0, -im.pk))
+            self.stdout.write(f"\n{keeper.image.name} ({keeper.width}×{keeper.height}) · #{keeper.pk}")
+
+            duplicates = []
+            seen_files = {keeper.image.name}
+            for image in members:
+                if image.image.name == keeper.image.name:
+                    continue
+                distance = hamming(int(image.phash, 16), int(keeper.phash, 16))
+                same_color = color_distance(image.dominant_color, keeper.dominant_color) <= MAX_COLOR_DISTANCE
+                note = "" if same_color else " · otro color, se conserva"
+                self.stdout.write(f"  #{image.pk} {image.image.name} · distancia {distance}{note}")
+                if same_color:
+                    duplicates.append(image)
+                    if image.image.name not in seen_files:
+                        seen_files.add(image.image.name)
+                        reclaimable += image.file_size or 0
+
+            if options["merge"] and duplicates:
+                self.merge(keeper, duplicates)
+                merged += len(duplicates)
+                touched.update(image.product_id for image in duplicates)
+
+        if touched:
+            with transaction.atomic():
+                for product_id in touched:
+                    refresh_product_card(product_id)
+                bump_product_versions(list(touched))
+                bump_catalog_version()
+
+        summary = f"\nGrupos: {len(groups)} · recuperable: {reclaimable / 1024:.0f} KB"
+        if options["merge"]:
+            summary += f" · imágenes fusionadas: {merged}"
+        self.stdout.write(self.style.SUCCESS(summary))
+
+    def fill_missing_hashes(self):
+        count = 0
+        for image in ProductImage.objects.exclude(image="").filter(content_hash="").iterator(chunk_size=100):
+            try:
+                with image.image.open("rb") as f:
+                    content_hash, phash = hash_file(f)
+            except OSError as exc:
+                self.stderr.write(f"  #{image.pk} {image.image.name}: {exc}")
+                continue
+            ProductImage.objects.filter(pk=image.pk).update(content_hash=content_hash, phash=phash)
+            count += 1
+        return count
+
+    def merge(self, keeper, duplicates):
+        old_names = {image.image.name for image in duplicates}
+        values = {name: getattr(keeper, name) for name in ProductImage.FILE_FIELDS}
+        values["image"] = keeper.image.name
+        ProductImage.objects.filter(pk__in=[image.pk for image in duplicates]).update(**values)
+
+        storage = keeper.image.storage
+        still_used = set(
+            ProductImage.objects.filter(image__in=old_names).values_list("image", flat=True)
+        )
+        for name in old_names - still_used:
+            try:
+                storage.delete(name)
+            except OSError as exc:
+                self.stderr.write(f"  No se pudo borrar {name}: {exc}")
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+
+from apps.catalog.models import ProductImage
+from apps.catalog.renditions import pregenerate
+
+
+class Command(BaseCommand):
+    help = (
+        "Genera los derivados WebP (renditions) que falten de las imágenes de producto. "
+        "Sirve de backfill tras desplegar o al cambiar RENDITIONS; con Cloudinary no hace nada."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--limit", type=int, default=None, help="Máximo de archivos a procesar.")
+
+    def handle(self, *args, **options):
+        names = (
+            ProductImage.objects.exclude(image="")
+            .order_by("image").values_list("image", flat=True).distinct()
+        )
+        done = failed = written = 0
+        for name in names[: options["limit"]]:
+            try:
+                written += pregenerate(name)
+            except (OSError, ValueError) as exc:
+                failed += 1
+                self.stderr.write(f"  {name}: {exc}")
+                continue
+            done += 1
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Archivos revisados: {done} · con error: {failed} · derivados generados: {written}"
+        ))
@@ -0,0 +1,50 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.catalog.importer import (
+    DEFAULT_BATCH_SIZE,
+    MAX_REPORTED_ERRORS,
+    CatalogImporter,
+    CatalogImportError,
+    detect_format,
+    open_text,
+    read_rows,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Importa productos, variantes, atributos, colores e imágenes desde un "
+        "archivo CSV, JSON o JSON Lines (una fila por variante)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Ruta del archivo .csv, .json o .jsonl")
+        parser.add_argument(
+            "--format", choices=["csv", "json"], default=None,
+            help="Formato del archivo (por defecto según la extensión).",
+        )
+        parser.add_argument(
+            "--batch-size", type=int, default=DEFAULT_BATCH_SIZE,
+            help=f"Filas por lote y transacción (por defecto {DEFAULT_BATCH_SIZE}).",
+        )
+        parser.add_argument(
+            "--dry-run", action="store_true",
+            help="Valida y simula la importación sin guardar cambios.",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            fmt = options["format"] or detect_format(options["path"])
+            with open(options["path"], "rb") as binary:
+                importer = CatalogImporter(batch_size=options["batch_size"], dry_run=options["dry_run"])
+                stats = importer.run(read_rows(open_text(binary), fmt))
+        except (OSError, CatalogImportError) as e:
+            raise CommandError(str(e))
+
+        for line, message in stats.errors[:MAX_REPORTED_ERRORS]:
+            self.stderr.write(f"  línea {line}: {message}")
+        if len(stats.errors) > MAX_REPORTED_ERRORS:
+            self.stderr.write(f"  ... y {len(stats.errors) - MAX_REPORTED_ERRORS} errores más")
+
+        style = self.style.WARNING if stats.errors else self.style.SUCCESS
+        self.stdout.write(style(stats.summary()))
@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand
+
+from apps.catalog.models import ProductImage
+from apps.catalog.optimization import is_pending, optimize_image, pending_images
+
+
+class Command(BaseCommand):
+    help = (
+        "Optimiza las imágenes de producto pendientes (EXIF, tamaño, re-codificación, "
+        "metadatos y placeholder). Sirve de backfill y de cron con CATALOG_IMAGE_OPTIMIZE=command."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--all", action="store_true",
+            help="Reprocesa también las ya optimizadas (p. ej. para recalcular metadatos).",
+        )
+        parser.add_argument("--limit", type=int, default=None, help="Máximo de imágenes a procesar.")
+
+    def handle(self, *args, **options):
+        queryset = ProductImage.objects.exclude(image="") if options["all"] else pending_images()
+        ids = list(queryset.order_by("pk").values_list("pk", flat=True)[: options["limit"]])
+
+        done = failed = before = after = 0
+        processed = set()
+        for pk in ids:
+            # Se relee cada una: optimizar un archivo compartido actualiza a todas
+            image = ProductImage.objects.filter(pk=pk).first()
+            if image is None or image.image.name in processed:
+                continue
+            if not options["all"] and not is_pending(image):
+                continue
+            try:
+                size_before, size_after = optimize_image(image)
+            except (OSError, ValueError) as exc:
+                failed += 1
+                self.stderr.write(f"  #{image.pk} {image.image.name}: {exc}")
+                continue
+            image.refresh_from_db(fields=["image"])
+            processed.add(image.image.name)
+            done += 1
+            before += size_before
+            after += size_after
+
+        saved = (before - after) / 1024
+        self.stdout.write(self.style.SUCCESS(
+            f"Imágenes optimizadas: {done} · con error: {failed} · ahorro: {saved:.0f} KB"
+        ))
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from apps.catalog.cards import rebuild_all_cards
+from apps.catalog.facets import rebuild_all_facets
+from apps.catalog.models import AttributeFacet, ProductCard
+
+
+class Command(BaseCommand):
+    help = "Reconstruye desde cero los índices derivados del catálogo (facetas y tarjetas)."
+
+    def handle(self, *args, **options):
+        rebuild_all_facets()
+        rebuild_all_cards()
+        self.stdout.write(self.style.SUCCESS(
+            f"Facetas: {AttributeFacet.objects.count()} · Tarjetas: {ProductCard.objects.count()}"
+        ))
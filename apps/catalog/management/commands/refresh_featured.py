@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from apps.catalog.featured import refresh_featured_pool
+
+
+class Command(BaseCommand):
+    help = "Renueva el pool de productos destacados de la portada (conserva los fijos)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--size", type=int, default=None,
+            help="Tamaño del pool (por defecto settings.CATALOG_FEATURED_POOL_SIZE).",
+        )
+
+    def handle(self, *args, **options):
+        pinned, rotating = refresh_featured_pool(options["size"])
+        self.stdout.write(self.style.SUCCESS(
+            f"Destacados: {pinned} fijos · {rotating} rotativos"
+        ))
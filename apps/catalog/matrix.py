@@ -0,0 +1,72 @@
+"""
+Payload del selector de variantes ("matriz" color × atributos -> variante).
+
+Se arma en una sola pasada sobre un SnapProduct y se cachea bajo
+(producto, Product.version). Las señales suben la versión cuando cambian
+sus variantes, atributos o imágenes, así una clave vieja nunca se vuelve a leer.
+Lo usan product_detail (opciones del select) y el endpoint JSON que consume
+static/js/product-detail.js.
+"""
+from django.conf import settings
+from django.core.cache import cache
+
+from .facets import normalize
+from .renditions import rendition_url
+
+
+def matrix_cache_key(product):
+    return f"catalog:variant-matrix:{product.id}:{product.version}"
+
+
+def combination_key(color_name, attributes):
+    """
+    "rojo|material=jean|talla=m": color y pares atributo=valor normalizados.
+    """
+    parts = [normalize(color_name)]
+    parts += sorted(f"{normalize(n)}={normalize(v)}" for n, v in attributes)
+    return "|".join(parts)
+
+
+def build_variant_matrix(product):
+    attributes = {}
+    colors = {}
+    variants = []
+    matrix = {}
+
+    for v in product.variants:
+        for name, value in v.attributes:
+            values = attributes.setdefault(name.strip(), [])
+            if value.strip() not in values:
+                values.append(value.strip())
+        if v.color_name and v.color_name not in colors:
+            colors[v.color_name] = v.color_hex
+
+        variants.append({
+            "id": v.id,
+            "label": v.label,
+            "price": str(v.price),
+            "stock": v.stock,
+            "sku": v.sku,
+            "image_url": v.image_url,
+            "image_detail_url": rendition_url(v.image_url, "detail"),
+            "color": v.color,
+            "attributes": {name.strip(): value.strip() for name, value in v.attributes},
+        })
+        matrix.setdefault(combination_key(v.color_name, v.attributes), v.id)
+
+    return {
+        "product": {"id": product.id, "slug": product.slug, "version": product.version},
+        "attributes": [{"name": n, "values": vals} for n, vals in attributes.items()],
+        "colors": [{"name": n, "hex_code": h} for n, h in colors.items()],
+        "variants": variants,
+        "matrix": matrix,
+    }
+
+
+def get_variant_matrix(product):
+    key = matrix_cache_key(product)
+    payload = cache.get(key)
+    if payload is None:
+        payload = build_variant_matrix(product)
+        cache.set(key, payload, getattr(settings, "CATALOG_VARIANT_MATRIX_TTL", 60 * 60 * 24))
+    return payload
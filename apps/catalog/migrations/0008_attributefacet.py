@@ -0,0 +1,57 @@
+# Generated by Django 6.0 on 2026-10-16 23:07
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def populate_facets(apps, schema_editor):
+    VariantAttribute = apps.get_model("catalog", "VariantAttribute")
+    AttributeFacet = apps.get_model("catalog", "AttributeFacet")
+
+    attrs = (
+        VariantAttribute.objects
+        .filter(variant__is_active=True, variant__product__is_active=True)
+        .values_list("variant_id", "variant__product_id", "name", "value")
+    )
+    AttributeFacet.objects.bulk_create(
+        [
+            AttributeFacet(
+                product_id=product_id,
+                variant_id=variant_id,
+                name=name.strip(),
+                value=value.strip(),
+                key=name.strip().lower(),
+                value_key=value.strip().lower(),
+            )
+            for variant_id, product_id, name, value in attrs
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0007_alter_product_options'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AttributeFacet',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=60, verbose_name='Atributo')),
+                ('value', models.CharField(max_length=80, verbose_name='Valor')),
+                ('key', models.CharField(max_length=60, verbose_name='Clave')),
+                ('value_key', models.CharField(max_length=80, verbose_name='Clave de valor')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='facets', to='catalog.product', verbose_name='Producto')),
+                ('variant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='facets', to='catalog.variant', verbose_name='Variante')),
+            ],
+            options={
+                'verbose_name': 'Faceta de Atributo',
+                'verbose_name_plural': 'Facetas de Atributos',
+                'indexes': [models.Index(fields=['key', 'value_key'], name='catalog_facet_key_idx')],
+            },
+        ),
+        migrations.RunPython(populate_facets, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,78 @@
+# Generated by Django 6.0 on 2026-10-16 23:09
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Max, Min, Q
+
+
+def populate_cards(apps, schema_editor):
+    Product = apps.get_model("catalog", "Product")
+    ProductImage = apps.get_model("catalog", "ProductImage")
+    ProductCard = apps.get_model("catalog", "ProductCard")
+
+    active = Q(variants__is_active=True)
+    products = (
+        Product.objects
+        .filter(is_active=True)
+        .select_related("category")
+        .annotate(
+            card_min=Min("variants__price", filter=active),
+            card_max=Max("variants__price", filter=active),
+            card_stock=Max("variants__stock", filter=active),
+        )
+        .filter(card_min__isnull=False)
+    )
+
+    first_images = {}
+    for image in ProductImage.objects.order_by("product_id", "pk"):
+        first_images.setdefault(image.product_id, image)
+
+    cards = []
+    for p in products:
+        image = first_images.get(p.pk)
+        cards.append(ProductCard(
+            product_id=p.pk,
+            name=p.name,
+            slug=p.slug,
+            description=p.description,
+            category_name=p.category.name if p.category else "",
+            category_slug=p.category.slug if p.category else "",
+            min_price=p.card_min,
+            max_price=p.card_max,
+            in_stock=bool(p.card_stock and p.card_stock > 0),
+            image_url=image.image.url if image and image.image else "",
+            created_at=p.created_at,
+        ))
+    ProductCard.objects.bulk_create(cards, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0008_attributefacet'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductCard',
+            fields=[
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='card', serialize=False, to='catalog.product', verbose_name='Producto')),
+                ('name', models.CharField(max_length=160, verbose_name='Nombre')),
+                ('slug', models.SlugField(max_length=180, verbose_name='Etiqueta')),
+                ('description', models.TextField(blank=True, verbose_name='Descripción')),
+                ('category_name', models.CharField(blank=True, max_length=100, verbose_name='Categoría')),
+                ('category_slug', models.SlugField(blank=True, max_length=120, verbose_name='Slug de categoría')),
+                ('min_price', models.DecimalField(decimal_places=2, max_digits=10, verbose_name='Precio mínimo')),
+                ('max_price', models.DecimalField(decimal_places=2, max_digits=10, verbose_name='Precio máximo')),
+                ('in_stock', models.BooleanField(default=False, verbose_name='Con stock')),
+                ('image_url', models.CharField(blank=True, max_length=500, verbose_name='Imagen principal')),
+                ('created_at', models.DateTimeField(verbose_name='Fecha de creación')),
+            ],
+            options={
+                'verbose_name': 'Tarjeta de Producto',
+                'verbose_name_plural': 'Tarjetas de Producto',
+                'indexes': [models.Index(fields=['category_name', '-created_at'], name='catalog_card_newest_idx'), models.Index(fields=['category_name', 'min_price'], name='catalog_card_price_idx'), models.Index(fields=['category_name', 'name'], name='catalog_card_name_idx')],
+            },
+        ),
+        migrations.RunPython(populate_cards, migrations.RunPython.noop),
+    ]
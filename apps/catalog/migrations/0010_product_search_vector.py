@@ -0,0 +1,57 @@
+# Generated by Django 6.0 on 2026-10-16 23:10
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+# Solo PostgreSQL: trigger que mantiene el tsvector, índice GIN y carga inicial.
+FORWARD_SQL = [
+    """
+    CREATE OR REPLACE FUNCTION catalog_product_search_update() RETURNS trigger AS $$
+    BEGIN
+        NEW.search_vector :=
+            setweight(to_tsvector('spanish', coalesce(NEW.name, '')), 'A') ||
+            setweight(to_tsvector('spanish', coalesce(NEW.description, '')), 'B');
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql;
+    """,
+    """
+    CREATE TRIGGER catalog_product_search_trg
+    BEFORE INSERT OR UPDATE OF name, description, search_vector ON catalog_product
+    FOR EACH ROW EXECUTE FUNCTION catalog_product_search_update();
+    """,
+    "CREATE INDEX catalog_product_search_gin ON catalog_product USING gin (search_vector);",
+    "UPDATE catalog_product SET name = name;",
+]
+
+BACKWARD_SQL = [
+    "DROP INDEX IF EXISTS catalog_product_search_gin;",
+    "DROP TRIGGER IF EXISTS catalog_product_search_trg ON catalog_product;",
+    "DROP FUNCTION IF EXISTS catalog_product_search_update();",
+]
+
+
+def _run(statements):
+    def operation(apps, schema_editor):
+        if schema_editor.connection.vendor != "postgresql":
+            return
+        for sql in statements:
+            schema_editor.execute(sql)
+    return operation
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0009_productcard'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True, verbose_name='Índice de búsqueda'),
+        ),
+        migrations.RunPython(_run(FORWARD_SQL), _run(BACKWARD_SQL)),
+    ]
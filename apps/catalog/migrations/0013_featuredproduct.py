@@ -0,0 +1,29 @@
+# Generated by Django 6.0 on 2026-10-16 23:58
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0012_product_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FeaturedProduct',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('position', models.PositiveIntegerField(db_index=True, default=0, verbose_name='Posición')),
+                ('pinned', models.BooleanField(default=False, help_text='Los fijos se mantienen al rotar el pool; el resto se renueva.', verbose_name='Fijo')),
+                ('added_at', models.DateTimeField(auto_now_add=True, verbose_name='Agregado')),
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='featured', to='catalog.product', verbose_name='Producto')),
+            ],
+            options={
+                'verbose_name': 'Producto Destacado',
+                'verbose_name_plural': 'Productos Destacados',
+                'ordering': ['position'],
+            },
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 6.0 on 2026-10-17 00:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0013_featuredproduct'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='productcard',
+            name='image_placeholder',
+            field=models.TextField(blank=True, verbose_name='Placeholder de imagen'),
+        ),
+        migrations.AddField(
+            model_name='productimage',
+            name='dominant_color',
+            field=models.CharField(blank=True, editable=False, max_length=7, verbose_name='Color dominante'),
+        ),
+        migrations.AddField(
+            model_name='productimage',
+            name='file_size',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True, verbose_name='Peso (bytes)'),
+        ),
+        migrations.AddField(
+            model_name='productimage',
+            name='height',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True, verbose_name='Alto (px)'),
+        ),
+        migrations.AddField(
+            model_name='productimage',
+            name='optimized_name',
+            field=models.CharField(blank=True, editable=False, max_length=255, verbose_name='Archivo optimizado'),
+        ),
+        migrations.AddField(
+            model_name='productimage',
+            name='placeholder',
+            field=models.TextField(blank=True, editable=False, verbose_name='Placeholder (LQIP)'),
+        ),
+        migrations.AddField(
+            model_name='productimage',
+            name='width',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True, verbose_name='Ancho (px)'),
+        ),
+    ]
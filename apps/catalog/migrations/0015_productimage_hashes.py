@@ -0,0 +1,23 @@
+# Generated by Django 6.0 on 2026-10-17 00:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0014_productimage_metadata'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='productimage',
+            name='content_hash',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=64, verbose_name='Hash de contenido'),
+        ),
+        migrations.AddField(
+            model_name='productimage',
+            name='phash',
+            field=models.CharField(blank=True, editable=False, max_length=16, verbose_name='Hash perceptual'),
+        ),
+    ]
@@ -1,7 +1,11 @@
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
 from django.utils.text import slugify
 from django.core.exceptions import ValidationError
 
+from .dedup import hash_file
+from .slugs import allocate_slug, slug_base
+
 # ==========================================
 # 1. MODELO CATEGORÍA (Sin Imagen)
 # ==========================================
@@ -58,6 +62,14 @@ class Product(models.Model):
     is_active = models.BooleanField("Activo", default=True)
     created_at = models.DateTimeField("Fecha de creación", auto_now_add=True)
 
+    # tsvector (configuración 'spanish') mantenido por un trigger en PostgreSQL.
+    # En SQLite queda NULL y apps.catalog.search usa el backend simple.
+    search_vector = SearchVectorField("Índice de búsqueda", null=True, editable=False)
+
+    # Sube con cada cambio del producto, sus variantes, atributos o imágenes
+    # (apps.catalog.signals); es parte de la clave de caché de sus payloads.
+    version = models.PositiveIntegerField("Versión", default=1, editable=False)
+
     class Meta:
         verbose_name = "Producto"
         verbose_name_plural = "Productos"
@@ -68,13 +80,14 @@ class Product(models.Model):
 
     def save(self, *args, **kwargs):
         if not self.slug:
-            base = slugify(self.name)
-            slug = base
-            i = 2
-            while Product.objects.filter(slug=slug).exclude(pk=self.pk).exists():
-                slug = f"{base}-{i}"
-                i += 1
-            self.slug = slug
+            # Una sola consulta con los slugs que comparten la base
+            taken = set(
+                Product.objects
+                .filter(slug__startswith=slug_base(self.name))
+                .exclude(pk=self.pk)
+                .values_list("slug", flat=True)
+            )
+            self.slug = allocate_slug(self.name, taken)
         super().save(*args, **kwargs)
 
 
@@ -88,10 +101,48 @@ class ProductImage(models.Model):
     image = models.ImageField("Imagen", upload_to="products/")
     alt_text = models.CharField("Texto Alternativo", max_length=150, blank=True)
 
+    # Metadatos que completa apps.catalog.optimization tras la subida
+    width = models.PositiveIntegerField("Ancho (px)", null=True, blank=True, editable=False)
+    height = models.PositiveIntegerField("Alto (px)", null=True, blank=True, editable=False)
+    file_size = models.PositiveIntegerField("Peso (bytes)", null=True, blank=True, editable=False)
+    dominant_color = models.CharField("Color dominante", max_length=7, blank=True, editable=False)
+    placeholder = models.TextField("Placeholder (LQIP)", blank=True, editable=False)
+    # Nombre del archivo ya optimizado; si difiere de `image`, está pendiente
+    optimized_name = models.CharField("Archivo optimizado", max_length=255, blank=True, editable=False)
+    # Huellas de apps.catalog.dedup: SHA-256 de lo subido y dHash perceptual
+    content_hash = models.CharField("Hash de contenido", max_length=64, blank=True, db_index=True, editable=False)
+    phash = models.CharField("Hash perceptual", max_length=16, blank=True, editable=False)
+
+    # Campos que describen el archivo: se copian juntos al compartirlo
+    FILE_FIELDS = (
+        "image", "optimized_name", "width", "height", "file_size",
+        "dominant_color", "placeholder", "content_hash", "phash",
+    )
+
     class Meta:
         verbose_name = "Imagen de Producto"
         verbose_name_plural = "Imágenes de Producto"
 
+    def save(self, *args, **kwargs):
+        if self.image and not self.image._committed:
+            self.content_hash, self.phash = hash_file(self.image.file)
+            # Subida idéntica a una ya guardada: se reutiliza ese archivo
+            twin = (
+                ProductImage.objects
+                .filter(content_hash=self.content_hash)
+                .exclude(pk=self.pk)
+                .exclude(image="")
+                .first()
+            )
+            if twin is not None and twin.image.storage.exists(twin.image.name):
+                self.share_file(twin)
+        super().save(*args, **kwargs)
+
+    def share_file(self, other):
+        self.image = other.image.name
+        for name in self.FILE_FIELDS[1:]:
+            setattr(self, name, getattr(other, name))
+
 
 # ==========================================
 # 4. MODELO VARIANTE
@@ -158,4 +209,133 @@ class VariantAttribute(models.Model):
         verbose_name_plural = "Atributos de Variante"
 
     def __str__(self) -> str:
-        return f"{self.name}: {self.value}"
\ No newline at end of file
+        return f"{self.name}: {self.value}"
+
+# ==========================================
+# 6. ÍNDICE DE FACETAS (derivado)
+# ==========================================
+class AttributeFacet(models.Model):
+    """
+    Índice derivado para el sidebar de filtros del catálogo.
+    Una fila por atributo de cada variante activa de un producto activo,
+    con nombre y valor ya normalizados. Lo mantiene apps.catalog.signals.
+    """
+    product = models.ForeignKey(
+        Product,
+        verbose_name="Producto",
+        on_delete=models.CASCADE,
+        related_name="facets"
+    )
+    variant = models.ForeignKey(
+        Variant,
+        verbose_name="Variante",
+        on_delete=models.CASCADE,
+        related_name="facets"
+    )
+    name = models.CharField("Atributo", max_length=60)
+    value = models.CharField("Valor", max_length=80)
+    key = models.CharField("Clave", max_length=60)
+    value_key = models.CharField("Clave de valor", max_length=80)
+
+    class Meta:
+        verbose_name = "Faceta de Atributo"
+        verbose_name_plural = "Facetas de Atributos"
+        indexes = [
+            models.Index(fields=["key", "value_key"], name="catalog_facet_key_idx"),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.name}: {self.value}"
+
+
+# ==========================================
+# 7. TARJETA DE PRODUCTO (proyección de lectura)
+# ==========================================
+class ProductCard(models.Model):
+    """
+    Proyección desnormalizada para listados (catálogo, home, feeds).
+    Solo existe para productos activos con al menos una variante activa.
+    La mantiene apps.catalog.signals; no editar a mano.
+    """
+    product = models.OneToOneField(
+        Product,
+        verbose_name="Producto",
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="card"
+    )
+    name = models.CharField("Nombre", max_length=160)
+    slug = models.SlugField("Etiqueta", max_length=180)
+    description = models.TextField("Descripción", blank=True)
+    category_name = models.CharField("Categoría", max_length=100, blank=True)
+    category_slug = models.SlugField("Slug de categoría", max_length=120, blank=True)
+    min_price = models.DecimalField("Precio mínimo", max_digits=10, decimal_places=2)
+    max_price = models.DecimalField("Precio máximo", max_digits=10, decimal_places=2)
+    in_stock = models.BooleanField("Con stock", default=False)
+    image_url = models.CharField("Imagen principal", max_length=500, blank=True)
+    image_placeholder = models.TextField("Placeholder de imagen", blank=True)
+    created_at = models.DateTimeField("Fecha de creación")
+
+    class Meta:
+        verbose_name = "Tarjeta de Producto"
+        verbose_name_plural = "Tarjetas de Producto"
+        indexes = [
+            models.Index(fields=["category_name", "-created_at"], name="catalog_card_newest_idx"),
+            models.Index(fields=["category_name", "min_price"], name="catalog_card_price_idx"),
+            models.Index(fields=["category_name", "name"], name="catalog_card_name_idx"),
+        ]
+
+    def __str__(self) -> str:
+        return self.name
+
+
+# ==========================================
+# 8. VERSIÓN DEL CATÁLOGO
+# ==========================================
+class CatalogVersion(models.Model):
+    """
+    Contador global (fila única, pk=1). Las señales del catálogo lo incrementan
+    en cada cambio; los workers lo comparan para saber si su snapshot caducó.
+    """
+    version = models.PositiveBigIntegerField("Versión", default=1)
+    updated_at = models.DateTimeField("Actualizado", auto_now=True)
+
+    class Meta:
+        verbose_name = "Versión del Catálogo"
+        verbose_name_plural = "Versión del Catálogo"
+
+    def __str__(self) -> str:
+        return f"Catálogo v{self.version}"
+
+
+# ==========================================
+# 9. DESTACADOS DE LA PORTADA
+# ==========================================
+class FeaturedProduct(models.Model):
+    """
+    Pool de productos destacados para la portada. Las posiciones son densas
+    (0..n-1) para elegir al azar por posición sin recorrer la tabla.
+    Lo mantienen apps.catalog.featured, el comando refresh_featured y las
+    acciones del admin de productos.
+    """
+    product = models.OneToOneField(
+        Product,
+        verbose_name="Producto",
+        on_delete=models.CASCADE,
+        related_name="featured"
+    )
+    position = models.PositiveIntegerField("Posición", default=0, db_index=True)
+    pinned = models.BooleanField(
+        "Fijo",
+        default=False,
+        help_text="Los fijos se mantienen al rotar el pool; el resto se renueva."
+    )
+    added_at = models.DateTimeField("Agregado", auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Producto Destacado"
+        verbose_name_plural = "Productos Destacados"
+        ordering = ["position"]
+
+    def __str__(self) -> str:
+        return f"#{self.position} {self.product}"
@@ -0,0 +1,266 @@
+"""
+Optimización de las imágenes de producto después de subirlas.
+
+Por cada ProductImage pendiente (`image` distinto de `optimized_name`):
+- aplica la orientación EXIF y descarta los metadatos (EXIF, GPS, perfiles),
+- reduce el lado mayor a CATALOG_IMAGE_MAX_EDGE,
+- re-codifica como JPEG progresivo (WebP si tiene transparencia) con
+  CATALOG_IMAGE_QUALITY,
+- guarda ancho, alto, peso, color dominante y un placeholder LQIP (data URI
+  de ~16 px) que las plantillas usan de fondo mientras carga la imagen.
+
+No corre dentro del request del admin (settings.CATALOG_IMAGE_OPTIMIZE):
+- "thread": un hilo de fondo procesa la cola tras el commit (por defecto),
+- "command": queda pendiente para `manage.py optimize_product_images` (cron),
+- "off": no se optimiza.
+El mismo comando sirve de backfill para las imágenes existentes.
+"""
+import base64
+import logging
+import os
+import queue
+import threading
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import close_old_connections, transaction
+from django.db.models import F
+
+from .cards import refresh_product_card
+from .dedup import hash_file
+from .models import ProductImage
+from .renditions import pregenerate
+from .versioning import bump_catalog_version, bump_product_versions
+
+logger = logging.getLogger(__name__)
+
+PLACEHOLDER_EDGE = 16
+PLACEHOLDER_QUALITY = 40
+
+
+class OptimizedImage:
+    __slots__ = ("data", "extension", "width", "height", "dominant_color", "placeholder", "changed")
+
+    def __init__(self, data, extension, width, height, dominant_color, placeholder, changed):
+        self.data = data
+        self.extension = extension
+        self.width = width
+        self.height = height
+        self.dominant_color = dominant_color
+        self.placeholder = placeholder
+        # False si el original ya estaba bien (sin EXIF, tamaño y peso correctos)
+        self.changed = changed
+
+
+def pending_images():
+    return ProductImage.objects.exclude(image="").exclude(optimized_name=F("image"))
+
+
+def is_pending(image):
+    return bool(image.image) and image.image.name != image.optimized_name
+
+
+# -------------------------------------------------------------------
+# Procesamiento (solo Pillow, sin base de datos)
+# -------------------------------------------------------------------
+def _has_alpha(image):
+    return image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info)
+
+
+def _flatten(image):
+    # Para color y placeholder la transparencia se ve sobre blanco (fondo de la tienda)
+    from PIL import Image
+
+    if not _has_alpha(image):
+        return image.convert("RGB")
+    rgba = image.convert("RGBA")
+    canvas = Image.new("RGB", rgba.size, "white")
+    canvas.paste(rgba, mask=rgba.getchannel("A"))
+    return canvas
+
+
+def dominant_color(image):
+    """
+    Color más frecuente tras reducir la paleta a 5 colores, como "#rrggbb".
+    Las fotos de catálogo suelen tener fondo blanco: se prefiere el primer
+    color no blanco que cubra al menos el 5% de la imagen.
+    """
+    from PIL import Image
+
+    small = _flatten(image)
+    small.thumbnail((64, 64))
+    quantized = small.quantize(colors=5, method=Image.Quantize.MEDIANCUT)
+    palette = quantized.getpalette()
+    colors = sorted(quantized.getcolors(), reverse=True)
+    total = small.width * small.height
+
+    def rgb(index):
+        return palette[index * 3: index * 3 + 3]
+
+    chosen = colors[0][1]
+    for count, index in colors:
+        if count < total * 0.05:
+            break
+        if min(rgb(index)) < 235:
+            chosen = index
+            break
+    r, g, b = rgb(chosen)
+    return f"#{r:02x}{g:02x}{b:02x}"
+
+
+def placeholder(image):
+    tiny = _flatten(image)
+    tiny.thumbnail((PLACEHOLDER_EDGE, PLACEHOLDER_EDGE))
+    out = BytesIO()
+    tiny.save(out, "JPEG", quality=PLACEHOLDER_QUALITY)
+    return "data:image/jpeg;base64," + base64.b64encode(out.getvalue()).decode("ascii")
+
+
+def optimize_bytes(data, max_edge=None, quality=None):
+    from PIL import Image, ImageOps
+
+    max_edge = max_edge or getattr(settings, "CATALOG_IMAGE_MAX_EDGE", 2000)
+    quality = quality or getattr(settings, "CATALOG_IMAGE_QUALITY", 82)
+
+    image = Image.open(BytesIO(data))
+    had_metadata = bool(image.getexif()) or "icc_profile" in image.info
+    original_format = image.format
+    image = ImageOps.exif_transpose(image)
+    image.load()
+
+    resized = max(image.size) > max_edge
+    if resized:
+        image.thumbnail((max_edge, max_edge), Image.LANCZOS)
+
+    out = BytesIO()
+    if _has_alpha(image):
+        image = image.convert("RGBA")
+        image.save(out, "WEBP", quality=quality, method=6)
+        extension, target_format = ".webp", "WEBP"
+    else:
+        image = image.convert("RGB")
+        image.save(out, "JPEG", quality=quality, optimize=True, progressive=True)
+        extension, target_format = ".jpg", "JPEG"
+    encoded = out.getvalue()
+
+    # Re-codificar un archivo ya liviano y limpio solo le resta calidad
+    changed = (
+        resized or had_metadata or original_format != target_format or len(encoded) < len(data)
+    )
+    if not changed:
+        encoded = data
+
+    return OptimizedImage(
+        encoded, extension, image.width, image.height,
+        dominant_color(image), placeholder(image), changed,
+    )
+
+
+# -------------------------------------------------------------------
+# Persistencia
+# -------------------------------------------------------------------
+def optimize_image(image):
+    """
+    Optimiza el archivo de un ProductImage (y de las que lo comparten) y
+    devuelve (bytes antes, bytes después). Escribe con UPDATE (sin señales)
+    y refresca a mano tarjetas y versiones.
+    """
+    field = image.image
+    source_name = field.name
+    storage = field.storage
+
+    with storage.open(source_name, "rb") as f:
+        data = f.read()
+        # Sin huellas (p. ej. FieldFile.save guarda antes de ProductImage.save)
+        hashes = (image.content_hash, image.phash) if image.content_hash else hash_file(f)
+    result = optimize_bytes(data)
+
+    name = source_name
+    if result.changed:
+        stem = os.path.splitext(os.path.basename(source_name))[0]
+        target = field.field.generate_filename(image, f"{stem}{result.extension}")
+        name = storage.save(target, ContentFile(result.data))
+
+    # Se actualizan todas las imágenes que comparten el archivo (ver dedup);
+    # si mientras tanto se reemplazó el archivo, este resultado ya no vale
+    sharing = ProductImage.objects.filter(image=source_name)
+    product_ids = list(sharing.values_list("product_id", flat=True).distinct())
+    updated = sharing.update(
+        image=name,
+        optimized_name=name,
+        width=result.width,
+        height=result.height,
+        file_size=len(result.data),
+        dominant_color=result.dominant_color,
+        placeholder=result.placeholder,
+        content_hash=hashes[0],
+        phash=hashes[1],
+    )
+    # Se borra el archivo que quedó sin referencia: el original o el descartado
+    orphan = source_name if updated else name
+    if name != source_name and not ProductImage.objects.filter(image=orphan).exists():
+        try:
+            storage.delete(orphan)
+        except OSError:
+            logger.warning("No se pudo borrar %s", orphan)
+    if not updated:
+        return len(data), len(data)
+
+    # Los derivados WebP quedan listos antes de que las tarjetas apunten a ellos
+    try:
+        pregenerate(name)
+    except (OSError, ValueError):
+        logger.warning("No se pudieron generar las renditions de %s", name, exc_info=True)
+
+    with transaction.atomic():
+        for product_id in product_ids:
+            refresh_product_card(product_id)
+        bump_product_versions(product_ids)
+        bump_catalog_version()
+    return len(data), len(result.data)
+
+
+# -------------------------------------------------------------------
+# Hilo de fondo
+# -------------------------------------------------------------------
+_queue = queue.Queue()
+_worker = None
+_worker_lock = threading.Lock()
+
+
+def _process(image_id):
+    image = ProductImage.objects.filter(pk=image_id).first()
+    if image is not None and is_pending(image):
+        optimize_image(image)
+
+
+def _run():
+    while True:
+        image_id = _queue.get()
+        try:
+            _process(image_id)
+        except Exception:
+            # Queda pendiente: el comando lo reintenta
+            logger.exception("Falló la optimización de la imagen %s", image_id)
+        finally:
+            close_old_connections()
+            _queue.task_done()
+
+
+def _ensure_worker():
+    global _worker
+    with _worker_lock:
+        if _worker is None or not _worker.is_alive():
+            _worker = threading.Thread(target=_run, name="catalog-image-optimizer", daemon=True)
+            _worker.start()
+
+
+def schedule_optimization(image_id):
+    """
+    Encola la optimización según CATALOG_IMAGE_OPTIMIZE. Llamar tras el commit.
+    """
+    if getattr(settings, "CATALOG_IMAGE_OPTIMIZE", "thread") != "thread":
+        return
+    _ensure_worker()
+    _queue.put(image_id)
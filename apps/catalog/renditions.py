@@ -0,0 +1,273 @@
+"""
+Renditions (tamaños derivados) de las imágenes de producto, en WebP.
+
+Tamaños con nombre (RENDITIONS): cada uno es una caja ancho×alto exacta,
+recortada ("fill") o con relleno blanco ("pad"), así el <img> siempre puede
+declarar width/height. El srcset ofrece la misma caja a 1x, 1.5x y 2x.
+
+Backends (settings.CATALOG_IMAGE_BACKEND, vacío = según STORAGES):
+- "cloudinary": arma URLs de transformación a partir de la URL de entrega,
+  sin llamadas a la API.
+- "local": genera los derivados con Pillow y los guarda en
+  CATALOG_RENDITIONS_ROOT (servidos desde CATALOG_RENDITIONS_URL). Se generan
+  al optimizar la imagen subida o con `manage.py generate_renditions`; uno
+  que falte al pintar se encola en un hilo de fondo y mientras tanto se
+  sirve el original.
+
+Una fuente puede ser una URL, un FieldFile o un ProductImage. Lo que un
+backend no sabe transformar (URLs externas, archivos faltantes) se devuelve
+tal cual.
+"""
+import hashlib
+import logging
+import os
+import queue
+import threading
+from io import BytesIO
+from urllib.parse import unquote
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage, default_storage
+
+logger = logging.getLogger(__name__)
+
+# nombre: (ancho, alto, modo, sizes por defecto)
+RENDITIONS = {
+    "thumb": (120, 120, "fill", "60px"),
+    "card": (480, 480, "fill", "(max-width: 576px) 50vw, (max-width: 992px) 33vw, 300px"),
+    "detail": (900, 900, "pad", "(max-width: 992px) 100vw, 50vw"),
+    "zoom": (1800, 1800, "pad", "100vw"),
+}
+DENSITIES = (1, 1.5, 2)
+WEBP_QUALITY = 80
+
+
+class Rendition:
+    __slots__ = ("url", "width", "height")
+
+    def __init__(self, url, width, height):
+        self.url = url
+        self.width = width
+        self.height = height
+
+
+def _source_url(source):
+    if source is None:
+        return ""
+    if isinstance(source, str):
+        return source
+    image = getattr(source, "image", source)
+    try:
+        return image.url if image else ""
+    except ValueError:
+        return ""
+
+
+def _scaled(name, density):
+    width, height, mode, _ = RENDITIONS[name]
+    return int(width * density), int(height * density), mode
+
+
+# -------------------------------------------------------------------
+# Cloudinary: transformación en la URL
+# -------------------------------------------------------------------
+class CloudinaryBackend:
+    marker = "/image/upload/"
+
+    def url(self, source_url, width, height, mode):
+        if self.marker not in source_url:
+            return source_url
+        crop = "c_fill,g_auto" if mode == "fill" else "c_pad,b_white"
+        transform = f"{crop},w_{width},h_{height},f_webp,q_auto"
+        head, tail = source_url.split(self.marker, 1)
+        return f"{head}{self.marker}{transform}/{tail}"
+
+
+# -------------------------------------------------------------------
+# Local: derivados con Pillow en disco
+# -------------------------------------------------------------------
+class LocalBackend:
+    def __init__(self):
+        self.storage = FileSystemStorage(
+            location=getattr(settings, "CATALOG_RENDITIONS_ROOT", None)
+            or os.path.join(settings.MEDIA_ROOT or "media", "renditions"),
+            base_url=getattr(settings, "CATALOG_RENDITIONS_URL", None)
+            or f"{settings.MEDIA_URL}renditions/",
+        )
+        # Derivados ya confirmados en disco (evita un stat por imagen y render)
+        self._known = set()
+        # Fuentes encoladas para el hilo de fondo (una vez cada una)
+        self._scheduled = set()
+        # Fuentes que no se pudieron abrir: se sirven tal cual sin reintentar
+        self._failed = set()
+        self._queue = queue.Queue()
+        self._worker = None
+        self._lock = threading.Lock()
+
+    def _source_name(self, source_url):
+        media_url = settings.MEDIA_URL or "/media/"
+        if not source_url.startswith(media_url):
+            return None
+        return unquote(source_url[len(media_url):])
+
+    def _target_name(self, name, width, height, mode):
+        digest = hashlib.md5(name.encode(), usedforsecurity=False).hexdigest()
+        stem = os.path.splitext(os.path.basename(name))[0]
+        return f"{digest[:2]}/{digest[2:10]}-{stem}-{width}x{height}-{mode}.webp"
+
+    def _load(self, name):
+        from PIL import Image, ImageOps
+
+        with default_storage.open(name, "rb") as f:
+            image = Image.open(f)
+            image = ImageOps.exif_transpose(image)
+            image.load()
+        return image.convert("RGBA" if image.mode in ("RGBA", "LA", "P") else "RGB")
+
+    def render(self, image, width, height, mode):
+        from PIL import Image, ImageOps
+
+        if mode == "fill":
+            image = ImageOps.fit(image, (width, height), Image.LANCZOS)
+        else:
+            image = ImageOps.contain(image, (width, height), Image.LANCZOS)
+            canvas = Image.new("RGB", (width, height), "white")
+            offset = ((width - image.width) // 2, (height - image.height) // 2)
+            canvas.paste(image, offset, image if image.mode == "RGBA" else None)
+            image = canvas
+
+        out = BytesIO()
+        image.save(out, "WEBP", quality=WEBP_QUALITY, method=4)
+        return out.getvalue()
+
+    def generate(self, name):
+        """
+        Genera los derivados que falten de un archivo de media (todas las
+        renditions y densidades), decodificando el original una sola vez.
+        Retorna cuántos escribió.
+        """
+        missing = []
+        for rendition in RENDITIONS:
+            for density in DENSITIES:
+                width, height, mode = _scaled(rendition, density)
+                target = self._target_name(name, width, height, mode)
+                if target in self._known:
+                    continue
+                if self.storage.exists(target):
+                    self._known.add(target)
+                else:
+                    missing.append((target, width, height, mode))
+        if not missing:
+            return 0
+
+        image = self._load(name)
+        for target, width, height, mode in missing:
+            # save() no pisa: si otro proceso lo escribió, queda con otro nombre
+            if not self.storage.exists(target):
+                self.storage.save(target, ContentFile(self.render(image, width, height, mode)))
+            self._known.add(target)
+        return len(missing)
+
+    def _run(self):
+        while True:
+            name = self._queue.get()
+            try:
+                self.generate(name)
+            except (OSError, ValueError):
+                self._failed.add(name)
+                logger.warning("No se pudieron generar las renditions de %s", name, exc_info=True)
+            finally:
+                with self._lock:
+                    self._scheduled.discard(name)
+                self._queue.task_done()
+
+    def schedule(self, name):
+        with self._lock:
+            if name in self._scheduled or name in self._failed:
+                return
+            self._scheduled.add(name)
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name="catalog-renditions", daemon=True)
+                self._worker.start()
+        self._queue.put(name)
+
+    def url(self, source_url, width, height, mode):
+        """
+        URL del derivado si ya existe. Si no, se encola para el hilo de fondo
+        y mientras tanto se sirve el original: el request nunca espera a Pillow.
+        """
+        name = self._source_name(source_url)
+        if not name:
+            return source_url
+
+        target = self._target_name(name, width, height, mode)
+        if target not in self._known:
+            if not self.storage.exists(target):
+                self.schedule(name)
+                return source_url
+            self._known.add(target)
+        return self.storage.url(target)
+
+
+# -------------------------------------------------------------------
+# API
+# -------------------------------------------------------------------
+_backend = None
+
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        choice = getattr(settings, "CATALOG_IMAGE_BACKEND", "")
+        if not choice:
+            storage = settings.STORAGES.get("default", {}).get("BACKEND", "")
+            choice = "cloudinary" if "cloudinary" in storage.lower() else "local"
+        _backend = CloudinaryBackend() if choice == "cloudinary" else LocalBackend()
+    return _backend
+
+
+def rendition_url(source, name="card", density=1):
+    url = _source_url(source)
+    if not url or name not in RENDITIONS:
+        return url
+    width, height, mode = _scaled(name, density)
+    return get_backend().url(url, width, height, mode)
+
+
+def renditions(source, name="card"):
+    """
+    (src: Rendition 1x, srcset: str, sizes por defecto) o None si no hay imagen.
+    """
+    url = _source_url(source)
+    if not url:
+        return None
+    if name not in RENDITIONS:
+        raise ValueError(f"Rendition desconocida: '{name}'.")
+
+    backend = get_backend()
+    candidates = []
+    for density in DENSITIES:
+        width, height, mode = _scaled(name, density)
+        candidates.append(Rendition(backend.url(url, width, height, mode), width, height))
+
+    # Si el backend no pudo transformar (o aún no generó todos los derivados),
+    # no tiene sentido un srcset que mezcle el original con tamaños declarados
+    if any(c.url == url for c in candidates):
+        width, height, _, sizes = RENDITIONS[name]
+        return Rendition(url, width, height), "", sizes
+
+    srcset = ", ".join(f"{c.url} {c.width}w" for c in candidates)
+    return candidates[0], srcset, RENDITIONS[name][3]
+
+
+def pregenerate(name):
+    """
+    Genera ya los derivados locales del archivo `name` (nombre en el storage
+    de media). Lo llaman la optimización tras subir y el comando
+    `generate_renditions`; con Cloudinary no hace nada. Retorna cuántos escribió.
+    """
+    backend = get_backend()
+    if not name or not isinstance(backend, LocalBackend):
+        return 0
+    return backend.generate(name)
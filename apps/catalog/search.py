@@ -0,0 +1,102 @@
+"""
+Búsqueda de productos para el parámetro `q` del catálogo.
+
+- PostgresSearchBackend: tsvector en Product.search_vector (config 'spanish',
+  índice GIN, mantenido por trigger), consultas estilo websearch y orden por ts_rank.
+- SimpleSearchBackend: respaldo para SQLite (tests / desarrollo) con icontains
+  por término y un recorte básico de plurales.
+
+Ambos reciben un queryset y el prefijo del campo hacia Product
+("" sobre Product, "product__" sobre ProductCard) y devuelven el queryset
+filtrado y anotado con `search_rank`.
+"""
+import re
+
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db import connection
+from django.db.models import Case, F, FloatField, Q, Value, When
+
+SEARCH_CONFIG = "spanish"
+
+_TOKEN_RE = re.compile(r'-?"[^"]+"|\S+')
+
+
+class PostgresSearchBackend:
+    name = "postgres"
+
+    def filter(self, queryset, q, prefix=""):
+        query = SearchQuery(q, search_type="websearch", config=SEARCH_CONFIG)
+        vector = f"{prefix}search_vector"
+        return (
+            queryset
+            .filter(**{vector: query})
+            .annotate(search_rank=SearchRank(F(vector), query))
+        )
+
+
+class SimpleSearchBackend:
+    name = "simple"
+
+    @staticmethod
+    def stem(word):
+        word = word.lower()
+        if len(word) > 4 and word.endswith("es"):
+            return word[:-2]
+        if len(word) > 3 and word.endswith("s"):
+            return word[:-1]
+        return word
+
+    def terms(self, q):
+        include, exclude = [], []
+        for token in _TOKEN_RE.findall(q):
+            negated = token.startswith("-")
+            token = token.lstrip("-").strip('"')
+            if not token or token.lower() == "or":
+                continue
+            (exclude if negated else include).append(self.stem(token))
+        return include, exclude
+
+    def filter(self, queryset, q, prefix=""):
+        include, exclude = self.terms(q)
+        name, description, slug = f"{prefix}name", f"{prefix}description", f"{prefix}slug"
+
+        rank = Value(0.0, output_field=FloatField())
+        for term in include:
+            queryset = queryset.filter(
+                Q(**{f"{name}__icontains": term}) |
+                Q(**{f"{description}__icontains": term}) |
+                Q(**{f"{slug}__icontains": term})
+            )
+            rank = rank + Case(
+                When(**{f"{name}__icontains": term}, then=Value(1.0)),
+                default=Value(0.4),
+                output_field=FloatField(),
+            )
+        for term in exclude:
+            queryset = queryset.exclude(
+                Q(**{f"{name}__icontains": term}) |
+                Q(**{f"{description}__icontains": term})
+            )
+        return queryset.annotate(search_rank=rank)
+
+
+_BACKENDS = {
+    PostgresSearchBackend.name: PostgresSearchBackend,
+    SimpleSearchBackend.name: SimpleSearchBackend,
+}
+
+
+def get_search_backend():
+    """
+    settings.CATALOG_SEARCH_BACKEND fuerza "postgres" o "simple";
+    si no está definido se elige según el motor de la base de datos.
+    """
+    name = getattr(settings, "CATALOG_SEARCH_BACKEND", None)
+    if not name:
+        name = "postgres" if connection.vendor == "postgresql" else "simple"
+    return _BACKENDS[name]()
+
+
+def search_products(queryset, q, prefix=""):
+    return get_search_backend().filter(queryset, q, prefix=prefix)
@@ -0,0 +1,148 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from .cards import refresh_category_cards, refresh_product_card
+from .facets import rebuild_product_facets
+from .models import Category, Color, Product, ProductImage, Variant, VariantAttribute
+from .optimization import is_pending, schedule_optimization
+from .versioning import bump_catalog_version, bump_product_versions
+
+
+def _product_id_for_attribute(attr):
+    # En borrados en cascada la variante puede no existir ya
+    return (
+        Variant.objects
+        .filter(pk=attr.variant_id)
+        .values_list("product_id", flat=True)
+        .first()
+    )
+
+
+class _PendingRefresh:
+    """
+    Cambios del catálogo en la transacción en curso, uno por conexión:
+    productos a refrescar ({product_id: facetas?}) y productos a los que solo
+    hay que subir la versión (categoría o color renombrados). Se aplican una
+    sola vez al confirmar (on_commit), así borrar un producto con N variantes
+    y atributos no reconstruye sus índices N veces ni deja las filas de
+    versión bloqueadas durante la transacción.
+    """
+
+    def __init__(self):
+        self.products = {}
+        self.versions = set()
+        self.catalog = False
+
+    def __call__(self):
+        products, versions, catalog = self.products, self.versions, self.catalog
+        self.products, self.versions, self.catalog = {}, set(), False
+        if not catalog:
+            return
+        with transaction.atomic():
+            for product_id, facets in products.items():
+                if facets:
+                    rebuild_product_facets(product_id)
+                refresh_product_card(product_id)
+            bump_product_versions(list(versions.union(products)))
+            bump_catalog_version()
+
+
+def _pending():
+    connection = transaction.get_connection()
+    pending = getattr(connection, "catalog_pending_refresh", None)
+    if pending is None:
+        pending = connection.catalog_pending_refresh = _PendingRefresh()
+    return pending
+
+
+def _schedule(pending):
+    # Un callback por cambio: el primero que corre aplica el lote y el resto no
+    # hace nada. Si la transacción (o un savepoint) se revierte, los cambios
+    # anotados quedan para el próximo lote: refrescar de más es inocuo.
+    pending.catalog = True
+    transaction.on_commit(pending)
+
+
+def refresh_product(product_id, facets=True):
+    """
+    Punto único para refrescar los índices derivados de un producto (facetas,
+    tarjeta y versiones). Dentro de una transacción se agrupa por producto y
+    corre al confirmar; fuera de ella, en el acto. `facets=False` cuando el
+    cambio no afecta los atributos (imágenes).
+    """
+    if product_id is None:
+        return
+    pending = _pending()
+    pending.products[product_id] = pending.products.get(product_id, False) or facets
+    _schedule(pending)
+
+
+def refresh_versions(product_ids):
+    """
+    Sube la versión de `product_ids` (y la del catálogo) en el mismo lote que
+    refresh_product. Los ids se leen ya: al borrar, la relación desaparece.
+    """
+    pending = _pending()
+    pending.versions.update(product_ids)
+    _schedule(pending)
+
+
+@receiver([post_save, post_delete], sender=Product)
+def product_changed(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    refresh_product(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=Variant)
+def variant_changed(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    refresh_product(instance.product_id)
+
+
+@receiver([post_save, post_delete], sender=VariantAttribute)
+def variant_attribute_changed(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    refresh_product(_product_id_for_attribute(instance))
+
+
+@receiver([post_save, post_delete], sender=ProductImage)
+def product_image_changed(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    refresh_product(instance.product_id, facets=False)
+
+
+@receiver(post_save, sender=ProductImage)
+def product_image_uploaded(sender, instance, raw=False, **kwargs):
+    if raw or not is_pending(instance):
+        return
+    image_id = instance.pk
+    transaction.on_commit(lambda: schedule_optimization(image_id))
+
+
+# El detalle muestra la categoría: sus productos cambian de versión.
+# pre_delete: al borrar, los productos aún apuntan a la categoría (luego SET_NULL)
+@receiver([post_save, pre_delete], sender=Category)
+def category_changed(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    refresh_versions(Product.objects.filter(category_id=instance.pk).values_list("pk", flat=True))
+
+
+@receiver([post_save, post_delete], sender=Category)
+def category_cards_changed(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    refresh_category_cards(instance.pk)
+
+
+# pre_delete: al borrar, las variantes aún apuntan al color (luego SET_NULL)
+@receiver([post_save, pre_delete], sender=Color)
+def color_changed(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    refresh_versions(Variant.objects.filter(color=instance).values_list("product_id", flat=True))
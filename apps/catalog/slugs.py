@@ -0,0 +1,21 @@
+from django.utils.text import slugify
+
+
+def slug_base(text, max_length=180):
+    # Deja lugar para el sufijo "-N"
+    return slugify(text)[: max_length - 6].strip("-") or "item"
+
+
+def allocate_slug(text, taken, max_length=180):
+    """
+    Primer slug libre ("camisa", "camisa-2", ...) contra el conjunto `taken`,
+    que se precarga una vez; el slug elegido se agrega a `taken`.
+    """
+    base = slug_base(text, max_length)
+    slug = base
+    i = 2
+    while slug in taken:
+        slug = f"{base}-{i}"
+        i += 1
+    taken.add(slug)
+    return slug
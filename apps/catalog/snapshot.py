@@ -0,0 +1,316 @@
+"""
+Snapshot inmutable del catálogo vendible, uno por worker.
+
+Todo el catálogo de la tienda cabe en memoria: se carga en 4 consultas a
+estructuras compactas (__slots__ / tuplas) con índices por slug, id, categoría
+y (atributo, valor), y un FilterEngine (bitsets) para filtros y facetas. Los
+workers lo reemplazan de forma atómica cuando cambia CatalogVersion, que las
+señales incrementan en cada cambio del catálogo.
+
+Entre comprobaciones de versión (settings.CATALOG_SNAPSHOT_MAX_AGE segundos)
+listar y ver productos no toca la base de datos. Las recargas corren en un
+hilo de fondo (ver get_snapshot), fuera del request.
+"""
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.db import connection
+
+from .bitsets import FilterEngine
+from .facets import COLOR_KEY, normalize, normalize_selection
+from .models import Product, ProductImage, Variant, VariantAttribute
+from .versioning import get_catalog_state, get_catalog_version
+
+logger = logging.getLogger(__name__)
+
+
+class SnapImage:
+    __slots__ = ("id", "url", "alt_text", "placeholder")
+
+    def __init__(self, id, url, alt_text, placeholder=""):
+        self.id = id
+        self.url = url
+        self.alt_text = alt_text
+        self.placeholder = placeholder
+
+
+class SnapVariant:
+    __slots__ = (
+        "id", "product_id", "price", "stock", "sku",
+        "color_name", "color_hex", "image_url", "attributes", "attr_keys",
+    )
+
+    def __init__(self, id, product_id, price, stock, sku, color_name, color_hex,
+                 image_url, attributes):
+        self.id = id
+        self.product_id = product_id
+        self.price = price
+        self.stock = stock
+        self.sku = sku
+        self.color_name = color_name
+        self.color_hex = color_hex
+        self.image_url = image_url
+        # ((nombre, valor), ...) tal como se muestran
+        self.attributes = attributes
+        # {(clave, clave_valor)} normalizados para filtrar: una variante puede
+        # tener varios valores del mismo atributo (Talla S y Talla XL)
+        self.attr_keys = frozenset((normalize(n), normalize(v)) for n, v in attributes)
+
+    @property
+    def label(self):
+        if not self.attributes:
+            return "Variante"
+        return ", ".join(f"{n}: {v}" for n, v in self.attributes)
+
+    @property
+    def color(self):
+        if not self.color_name:
+            return None
+        return {"name": self.color_name, "hex_code": self.color_hex}
+
+
+class SnapProduct:
+    """
+    Mismos nombres de atributo que ProductCard, para que las plantillas
+    de listado sirvan con cualquiera de los dos.
+    """
+    __slots__ = (
+        "id", "name", "slug", "description", "category_name", "category_slug",
+        "created_at", "version", "images", "variants", "min_price", "max_price", "in_stock",
+    )
+
+    def __init__(self, id, name, slug, description, category_name, category_slug,
+                 created_at, version, images, variants):
+        self.id = id
+        self.name = name
+        self.slug = slug
+        self.description = description
+        self.category_name = category_name
+        self.category_slug = category_slug
+        self.created_at = created_at
+        self.version = version
+        self.images = images
+        self.variants = variants
+        prices = [v.price for v in variants]
+        self.min_price = min(prices) if prices else None
+        self.max_price = max(prices) if prices else None
+        self.in_stock = any(v.stock > 0 for v in variants)
+
+    @property
+    def pk(self):
+        return self.id
+
+    @property
+    def image_url(self):
+        return self.images[0].url if self.images else ""
+
+    @property
+    def image_placeholder(self):
+        return self.images[0].placeholder if self.images else ""
+
+    @property
+    def is_listable(self):
+        return bool(self.variants)
+
+
+def _image_url(image):
+    return image.image.url if image and image.image else ""
+
+
+def load_products(queryset):
+    """
+    Construye SnapProducts para `queryset` (productos activos) en 4 consultas.
+    Sirve tanto para el snapshot completo como para un solo producto.
+    """
+    products = list(queryset.select_related("category").order_by("pk"))
+    ids = [p.pk for p in products]
+
+    images = {}
+    for im in ProductImage.objects.filter(product_id__in=ids).order_by("product_id", "pk"):
+        images.setdefault(im.product_id, []).append(SnapImage(im.pk, _image_url(im), im.alt_text, im.placeholder))
+
+    attributes = {}
+    attr_rows = (
+        VariantAttribute.objects
+        .filter(variant__product_id__in=ids, variant__is_active=True)
+        .order_by("pk")
+        .values_list("variant_id", "name", "value")
+    )
+    for variant_id, name, value in attr_rows:
+        attributes.setdefault(variant_id, []).append((name, value))
+
+    variants = {}
+    variant_qs = (
+        Variant.objects
+        .filter(product_id__in=ids, is_active=True)
+        .select_related("color", "variant_image")
+        .order_by("price", "pk")
+    )
+    for v in variant_qs:
+        product_images = images.get(v.product_id, ())
+        image_url = _image_url(v.variant_image) if v.variant_image_id else ""
+        if not image_url and product_images:
+            image_url = product_images[0].url
+        variants.setdefault(v.product_id, []).append(SnapVariant(
+            v.pk, v.product_id, v.price, v.stock, v.sku,
+            v.color.name if v.color else "",
+            v.color.hex_code if v.color else "",
+            image_url,
+            tuple(attributes.get(v.pk, ())),
+        ))
+
+    return [
+        SnapProduct(
+            p.pk, p.name, p.slug, p.description,
+            p.category.name if p.category else "",
+            p.category.slug if p.category else "",
+            p.created_at,
+            p.version,
+            tuple(images.get(p.pk, ())),
+            tuple(variants.get(p.pk, ())),
+        )
+        for p in products
+    ]
+
+
+class CatalogSnapshot:
+    def __init__(self, version, products, updated_at=None):
+        self.version = version
+        self.updated_at = updated_at
+        self.loaded_at = time.monotonic()
+
+        self.by_id = {p.id: p for p in products}
+        self.by_slug = {p.slug: p for p in products}
+
+        # Listables, en el orden por defecto del catálogo
+        listable = [p for p in products if p.is_listable]
+        listable.sort(key=lambda p: p.created_at, reverse=True)
+        listable.sort(key=lambda p: p.category_name)
+        self.products = tuple(listable)
+
+        by_category = {}
+        by_attr = {}
+        labels = {}
+        displays = {}
+        for p in self.products:
+            by_category.setdefault(p.category_slug, []).append(p)
+            for v in p.variants:
+                for name, value in v.attributes:
+                    key, value_key = normalize(name), normalize(value)
+                    by_attr.setdefault((key, value_key), set()).add(p.id)
+                    labels.setdefault(key, name.strip())
+                    displays.setdefault((key, value_key), value.strip())
+                if v.color_name:
+                    value_key = normalize(v.color_name)
+                    by_attr.setdefault((COLOR_KEY, value_key), set()).add(p.id)
+                    labels.setdefault(COLOR_KEY, "Color")
+                    displays.setdefault((COLOR_KEY, value_key), v.color_name.strip())
+
+        self.by_category = {k: tuple(v) for k, v in by_category.items()}
+        self.by_attr = {k: frozenset(v) for k, v in by_attr.items()}
+        self.engine = FilterEngine(self.products)
+
+        # Opciones del sidebar: (clave, etiqueta, clave_valor, valor, conteo_global)
+        self.facet_options = tuple(
+            (key, labels[key], value_key, displays[(key, value_key)], len(self.by_attr[(key, value_key)]))
+            for key, value_key in sorted(self.by_attr)
+        )
+
+        prices = [p.min_price for p in self.products] + [p.max_price for p in self.products]
+        self.price_stats = {
+            "minp": min(prices) if prices else None,
+            "maxp": max(prices) if prices else None,
+        }
+
+    @classmethod
+    def load(cls):
+        # Leer la versión ANTES que los datos: nunca etiquetar datos viejos como nuevos
+        version, updated_at = get_catalog_state()
+        return cls(version, load_products(Product.objects.filter(is_active=True)), updated_at)
+
+    def filter(self, product_ids=None, min_price=None, max_price=None, in_stock=False, attrs=None):
+        """
+        Filtra con el motor de bitsets, con la misma semántica que la consulta
+        SQL: un producto entra si alguna de sus variantes cumple todos los
+        filtros a la vez (OR entre valores de un mismo atributo o color).
+
+        Devuelve (productos, conteos_de_facetas o None si no hay filtros).
+        """
+        selected = normalize_selection(attrs)
+        has_filters = (
+            product_ids is not None or min_price is not None or max_price is not None
+            or in_stock or selected
+        )
+        if not has_filters:
+            return list(self.products), None
+
+        return self.engine.query(
+            product_ids=product_ids,
+            min_price=min_price,
+            max_price=max_price,
+            in_stock=in_stock,
+            selected=selected,
+        )
+
+
+# -------------------------------------------------------------------
+# Snapshot por worker
+# -------------------------------------------------------------------
+_current = None
+_checked_at = 0.0
+_rebuilding = False
+_lock = threading.Lock()
+
+
+def _rebuild():
+    # Hilo de fondo: arma el snapshot nuevo y lo publica de una vez
+    global _current, _rebuilding
+    try:
+        _current = CatalogSnapshot.load()
+    except Exception:
+        logger.exception("No se pudo recargar el snapshot del catálogo")
+    finally:
+        _rebuilding = False
+        # El hilo abrió su propia conexión: cerrarla al terminar
+        connection.close()
+
+
+def get_snapshot():
+    """
+    Devuelve el snapshot vigente. Como mucho cada CATALOG_SNAPSHOT_MAX_AGE
+    segundos consulta CatalogVersion (una fila) y, si cambió, lanza una sola
+    recarga en un hilo de fondo: mientras tanto se sigue sirviendo el snapshot
+    anterior. Solo la primera carga del proceso se hace dentro del request.
+
+    Una recarga lee todo el catálogo (unos 3-4 s con ~8.000 productos); con
+    catálogos mucho más grandes conviene desactivarlo (CATALOG_SNAPSHOT_ENABLED)
+    y usar la ruta en BD.
+    """
+    global _current, _checked_at, _rebuilding
+
+    snapshot = _current
+    max_age = getattr(settings, "CATALOG_SNAPSHOT_MAX_AGE", 5)
+    if snapshot is not None and time.monotonic() - _checked_at < max_age:
+        return snapshot
+
+    if not _lock.acquire(blocking=snapshot is None):
+        return snapshot
+    try:
+        snapshot = _current
+        if snapshot is None:
+            snapshot = _current = CatalogSnapshot.load()
+        elif time.monotonic() - _checked_at < max_age or _rebuilding:
+            return snapshot
+        elif snapshot.version != get_catalog_version():
+            _rebuilding = True
+            threading.Thread(target=_rebuild, name="catalog-snapshot", daemon=True).start()
+        _checked_at = time.monotonic()
+        return snapshot
+    finally:
+        _lock.release()
+
+
+def snapshot_enabled():
+    return getattr(settings, "CATALOG_SNAPSHOT_ENABLED", True)
@@ -0,0 +1,44 @@
+from django import template
+from django.utils.html import format_html, format_html_join
+
+from apps.catalog.renditions import rendition_url as _rendition_url
+from apps.catalog.renditions import renditions
+
+register = template.Library()
+
+
+@register.simple_tag
+def product_image(source, name="card", alt="", css_class="", sizes=None, loading="lazy",
+                  placeholder="", **attrs):
+    """
+    {% product_image product.image_url "card" alt=product.name css_class="product-img" %}
+
+    <img> con srcset/sizes, width/height de la rendition y loading="lazy"
+    (usar loading="eager" para la imagen principal visible al cargar).
+    `placeholder` (LQIP de ProductImage) se pinta de fondo hasta que carga.
+    Sin imagen devuelve "".
+    """
+    result = renditions(source, name)
+    if result is None:
+        return ""
+    src, srcset, default_sizes = result
+
+    if placeholder:
+        attrs["style"] = f"background:url({placeholder}) center/cover no-repeat"
+    extra = format_html_join("", ' {}="{}"', ((k.replace("_", "-"), v) for k, v in attrs.items()))
+    if srcset:
+        return format_html(
+            '<img src="{}" srcset="{}" sizes="{}" width="{}" height="{}" alt="{}" class="{}" '
+            'loading="{}" decoding="async"{}>',
+            src.url, srcset, sizes or default_sizes, src.width, src.height, alt, css_class, loading, extra,
+        )
+    return format_html(
+        '<img src="{}" width="{}" height="{}" alt="{}" class="{}" loading="{}" decoding="async"{}>',
+        src.url, src.width, src.height, alt, css_class, loading, extra,
+    )
+
+
+@register.simple_tag
+def rendition_url(source, name="card"):
+    """URL de una sola rendition (p. ej. para data-src que cambia por JS)."""
+    return _rendition_url(source, name)
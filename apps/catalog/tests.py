@@ -1,3 +1,59 @@
+from decimal import Decimal
+
 from django.test import TestCase
 
-# Create your tests here.
+from apps.catalog import snapshot
+from apps.catalog.models import Product, Variant, VariantAttribute
+from apps.catalog.views import _list_from_db, _list_from_snapshot
+
+
+class MultiValuedAttributeTests(TestCase):
+    """
+    Una variante con dos valores del mismo atributo (Talla S y Talla XL) debe
+    aparecer en ambos filtros, igual en el snapshot que en la ruta en BD.
+    """
+
+    def setUp(self):
+        snapshot._current = None
+        with self.captureOnCommitCallbacks(execute=True):
+            both = Product.objects.create(name="Camisa S y XL")
+            variant = Variant.objects.create(product=both, price=Decimal("10.00"), stock=3, sku="MV-1")
+            VariantAttribute.objects.create(variant=variant, name="Talla", value="S")
+            VariantAttribute.objects.create(variant=variant, name="Talla", value="XL")
+
+            only_m = Product.objects.create(name="Camisa M")
+            variant = Variant.objects.create(product=only_m, price=Decimal("12.00"), stock=0, sku="MV-2")
+            VariantAttribute.objects.create(variant=variant, name="Talla", value="M")
+        self.both = both
+
+    def tearDown(self):
+        snapshot._current = None
+
+    def _both_paths(self, in_stock, attr_filters):
+        from_snapshot = _list_from_snapshot("", None, None, in_stock, attr_filters, {})
+        from_db = _list_from_db("", None, None, in_stock, attr_filters, {})
+        return from_snapshot, from_db
+
+    def _counts(self, attr_ui):
+        return {
+            (group["key"], value["value"]): value["count"]
+            for group in attr_ui
+            for value in group["values"]
+        }
+
+    def test_filter_matches_every_value(self):
+        for value in ("S", "XL"):
+            for in_stock in (False, True):
+                (snap_products, snap_ui, _), (db_products, db_ui, _) = self._both_paths(
+                    in_stock, {"talla": [value]}
+                )
+                self.assertEqual([p.id for p in snap_products], [self.both.pk])
+                self.assertEqual([p.product_id for p in db_products], [self.both.pk])
+                self.assertEqual(self._counts(snap_ui), self._counts(db_ui))
+                self.assertEqual(self._counts(snap_ui)[("attr_talla", "S")], 1)
+
+    def test_counts_without_attribute_filter(self):
+        (_, snap_ui, _), (_, db_ui, _) = self._both_paths(True, {})
+        self.assertEqual(self._counts(snap_ui), self._counts(db_ui))
+        self.assertEqual(self._counts(snap_ui)[("attr_talla", "XL")], 1)
+        self.assertEqual(self._counts(snap_ui)[("attr_talla", "M")], 0)
@@ -6,4 +6,5 @@ app_name = "catalog"
 urlpatterns = [
     path("catalogo/", views.product_list, name="list"),
     path("catalogo/<slug:slug>/", views.product_detail, name="detail"),
+    path("api/catalogo/<slug:slug>/variantes/", views.variant_matrix_api, name="variant_matrix_api"),
 ]
@@ -0,0 +1,50 @@
+from django.db.models import F
+from django.utils import timezone
+
+from .models import CatalogVersion, Product
+
+CATALOG_VERSION_PK = 1
+
+
+def get_catalog_state():
+    """
+    (versión, updated_at) en una sola lectura; (0, None) si aún no hay fila.
+    """
+    state = (
+        CatalogVersion.objects
+        .filter(pk=CATALOG_VERSION_PK)
+        .values_list("version", "updated_at")
+        .first()
+    )
+    return state or (0, None)
+
+
+def get_catalog_version() -> int:
+    version = (
+        CatalogVersion.objects
+        .filter(pk=CATALOG_VERSION_PK)
+        .values_list("version", flat=True)
+        .first()
+    )
+    return version or 0
+
+
+def bump_catalog_version():
+    """
+    Un UPDATE atómico (sin leer antes); crea la fila si aún no existe.
+    Llamar también tras escrituras masivas que no disparan señales
+    (p. ej. descuentos de stock con queryset.update()).
+    """
+    updated = CatalogVersion.objects.filter(pk=CATALOG_VERSION_PK).update(
+        version=F("version") + 1, updated_at=timezone.now()
+    )
+    if not updated:
+        CatalogVersion.objects.get_or_create(pk=CATALOG_VERSION_PK)
+
+
+def bump_product_versions(product_ids):
+    """
+    Sube Product.version (invalida los payloads cacheados por producto).
+    `product_ids` puede ser una lista o un subquery de ids.
+    """
+    Product.objects.filter(pk__in=product_ids).update(version=F("version") + 1)
@@ -1,19 +1,61 @@
 from decimal import Decimal, InvalidOperation
+from functools import reduce
+from operator import or_
 
 from django.contrib import messages
-from django.core.paginator import Paginator
 from django.db.models import Min, Max, Q
+from django.http import Http404, JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
+from django.views.decorators.http import require_http_methods
 
 from apps.cart.services import get_or_create_cart, add_to_cart
-from .models import Product, Variant, VariantAttribute
-
-SORT_MAP = {
-    "newest": "-created_at",
-    "name_asc": "name",
-    "name_desc": "-name",
+from apps.core.conditional import conditional_view
+from apps.core.pagination import COUNT_APPROX, KeysetPaginator
+from .facets import COLOR_KEY, COLOR_PARAM, build_attr_ui, facet_sidebar
+from .matrix import get_variant_matrix
+from .models import Product, ProductCard, Variant
+from .search import search_products
+from .snapshot import get_snapshot, load_products, snapshot_enabled
+from .versioning import get_catalog_state
+
+# Orden de cada opción del catálogo (también es la clave del cursor keyset)
+SORT_ORDERING = {
+    "relevance": ["-search_rank", "-created_at"],
+    "newest": ["category_name", "-created_at"],
+    "name_asc": ["category_name", "name"],
+    "name_desc": ["category_name", "-name"],
+    "price_asc": ["category_name", "min_price"],
+    "price_desc": ["category_name", "-min_price"],
 }
 
+CATALOG_PAGE_SIZE = 12
+
+
+# -------------------------
+# Validadores HTTP (ETag / Last-Modified)
+# -------------------------
+def catalog_state(request, *args, **kwargs):
+    """
+    Versión global del catálogo: la del snapshot que se va a pintar (sin
+    consultas) o la de CatalogVersion si el snapshot está desactivado.
+    """
+    if snapshot_enabled():
+        snapshot = get_snapshot()
+        return [snapshot.version], snapshot.updated_at
+    version, updated_at = get_catalog_state()
+    return [version], updated_at
+
+
+def product_state(request, slug):
+    if snapshot_enabled():
+        product = get_snapshot().by_slug.get(slug)
+        version = product.version if product else None
+    else:
+        version = Product.objects.filter(slug=slug, is_active=True).values_list("version", flat=True).first()
+    if version is None:
+        return None
+    return [version], None
+
 
 def _safe_decimal(v, default=None):
     if v is None or v == "":
@@ -24,30 +66,20 @@ def _safe_decimal(v, default=None):
         return default
 
 
-def product_list(request):
-    q = (request.GET.get("q") or "").strip()
-    min_price = _safe_decimal(request.GET.get("min"))
-    max_price = _safe_decimal(request.GET.get("max"))
-    in_stock = request.GET.get("in_stock") == "1"
-    sort = (request.GET.get("sort") or "newest").strip()
-
-    # attr_color, attr_talla, attr_material...
-    attr_filters = {}
-    for key, value in request.GET.items():
-        if key.startswith("attr_") and value:
-            attr_name = key.replace("attr_", "").strip().lower()
-            attr_filters[attr_name] = value.strip()
-
-    products = Product.objects.filter(is_active=True)
+def _list_from_db(q, min_price, max_price, in_stock, attr_filters, params):
+    """
+    Ruta en BD: ProductCard + índice de facetas (si el snapshot está desactivado).
+    """
+    # Listado desde la proyección ProductCard (sin joins ni imágenes por card)
+    products = ProductCard.objects.all()
 
+    # Búsqueda full-text (PostgreSQL) o respaldo simple (SQLite), con search_rank
     if q:
-        products = products.filter(
-            Q(name__icontains=q) |
-            Q(description__icontains=q) |
-            Q(slug__icontains=q)
-        )
+        products = search_products(products, q, prefix="product__")
 
-    variant_qs = Variant.objects.filter(is_active=True, product__in=products)
+    variant_qs = Variant.objects.filter(is_active=True, product__is_active=True)
+    if q:
+        variant_qs = variant_qs.filter(product__in=products.values("product_id"))
 
     if min_price is not None:
         variant_qs = variant_qs.filter(price__gte=min_price)
@@ -56,77 +88,124 @@ def product_list(request):
     if in_stock:
         variant_qs = variant_qs.filter(stock__gt=0)
 
-    # AND de atributos
-    for aname, aval in attr_filters.items():
+    # Variantes que cumplen todo menos los atributos (para conteos del sidebar)
+    has_filters = bool(q or min_price is not None or max_price is not None or in_stock or attr_filters)
+    facet_variant_qs = variant_qs if has_filters else None
+
+    # AND entre atributos, OR entre valores del mismo atributo
+    for aname, values in attr_filters.items():
+        if aname == COLOR_KEY:
+            variant_qs = variant_qs.filter(reduce(or_, (Q(color__name__iexact=v) for v in values)))
+            continue
         variant_qs = variant_qs.filter(
-            attributes__name__iexact=aname,
-            attributes__value__iexact=aval
+            Q(attributes__name__iexact=aname)
+            & reduce(or_, (Q(attributes__value__iexact=v) for v in values))
         )
 
-    products = products.filter(variants__in=variant_qs).distinct()
+    # Filtros a nivel de variante: un solo subquery sobre product_id
+    if min_price is not None or max_price is not None or in_stock or attr_filters:
+        products = products.filter(product_id__in=variant_qs.values("product_id"))
 
-    # Precio mínimo para cards
-    products = products.annotate(min_price=Min("variants__price"))
+    # Stats precio
+    price_stats = ProductCard.objects.aggregate(minp=Min("min_price"), maxp=Max("max_price"))
 
-    # =========================================================
-    # LÓGICA DE ORDENAMIENTO (CORREGIDA)
-    # =========================================================
-    if sort == "newest":
-        products = products.order_by("category__name", "-created_at")
-    elif sort == "name_asc":
-        products = products.order_by("category__name", "name")
-    elif sort == "name_desc":
-        products = products.order_by("category__name", "-name")
-    elif sort == "price_asc":
-        products = products.order_by("category__name", "min_price")
-    elif sort == "price_desc":
-        products = products.order_by("category__name", "-min_price")
-    else:
-        # Default fallback
-        products = products.order_by("category__name", "-created_at")
+    # UI de atributos desde el índice de facetas (con conteos en vivo)
+    attr_ui = facet_sidebar(params, facet_variant_qs, attr_filters)
+
+    return products, attr_ui, price_stats
+
+
+class _Ranked:
+    """
+    Envuelve un SnapProduct (compartido e inmutable) con el ranking de esta búsqueda.
+    """
+    __slots__ = ("product", "search_rank")
+
+    def __init__(self, product, search_rank):
+        self.product = product
+        self.search_rank = search_rank
+
+    def __getattr__(self, name):
+        return getattr(self.product, name)
 
-    # Stats precio
-    price_stats = Variant.objects.filter(is_active=True, product__is_active=True).aggregate(
-        minp=Min("price"), maxp=Max("price")
-    )
 
-    # UI de atributos (con selected listo para template)
-    attr_names = (
-        VariantAttribute.objects
-        .filter(variant__is_active=True, variant__product__is_active=True)
-        .values_list("name", flat=True)
-        .distinct()
-        .order_by("name")
+def _list_from_snapshot(q, min_price, max_price, in_stock, attr_filters, params):
+    """
+    Ruta en memoria: sin consultas salvo la búsqueda de texto (ranking en BD).
+    """
+    snapshot = get_snapshot()
+
+    ranks = None
+    if q:
+        ranks = dict(
+            search_products(Product.objects.filter(is_active=True), q)
+            .values_list("pk", "search_rank")
+        )
+
+    products, live = snapshot.filter(
+        product_ids=ranks,
+        min_price=min_price,
+        max_price=max_price,
+        in_stock=in_stock,
+        attrs=attr_filters,
     )
+    if ranks is not None:
+        products = [_Ranked(p, ranks[p.id]) for p in products]
+
+    attr_ui = build_attr_ui(params, snapshot.facet_options, live)
+    return products, attr_ui, snapshot.price_stats
+
+
+@conditional_view(catalog_state)
+def product_list(request):
+    q = (request.GET.get("q") or "").strip()
+    min_price = _safe_decimal(request.GET.get("min"))
+    max_price = _safe_decimal(request.GET.get("max"))
+    in_stock = request.GET.get("in_stock") == "1"
+    sort = (request.GET.get("sort") or ("relevance" if q else "newest")).strip()
 
-    attr_ui = []
-    for name in attr_names:
-        slug = str(name).strip().lower()
-        key = f"attr_{slug}"
-        values = (
-            VariantAttribute.objects
-            .filter(
-                name__iexact=name,
-                variant__is_active=True,
-                variant__product__is_active=True
-            )
-            .values_list("value", flat=True)
-            .distinct()
-            .order_by("value")
+    # attr_talla, attr_material... y color; repetir el parámetro combina con OR
+    attr_filters = {}
+    for key, values in request.GET.lists():
+        values = [v.strip() for v in values if v.strip()]
+        if not values:
+            continue
+        if key == COLOR_PARAM:
+            attr_filters[COLOR_KEY] = values
+        elif key.startswith("attr_"):
+            attr_name = key.replace("attr_", "").strip().lower()
+            attr_filters[attr_name] = values
+
+    if snapshot_enabled():
+        products, attr_ui, price_stats = _list_from_snapshot(
+            q, min_price, max_price, in_stock, attr_filters, request.GET
+        )
+    else:
+        products, attr_ui, price_stats = _list_from_db(
+            q, min_price, max_price, in_stock, attr_filters, request.GET
         )
-        attr_ui.append({
-            "label": name,
-            "key": key,
-            "values": list(values),
-            "selected": request.GET.get(key, ""),
-        })
 
-    paginator = Paginator(products, 12)
-    page_obj = paginator.get_page(request.GET.get("page"))
+    # =========================================================
+    # LÓGICA DE ORDENAMIENTO (CORREGIDA)
+    # =========================================================
+    if sort not in SORT_ORDERING or (sort == "relevance" and not q):
+        # Default fallback
+        sort = "newest"
+
+    # Keyset: sin COUNT(*) exacto ni OFFSET creciente (sirve para queryset o lista)
+    paginator = KeysetPaginator(
+        products,
+        SORT_ORDERING[sort],
+        per_page=CATALOG_PAGE_SIZE,
+        salt=f"catalog:{sort}",
+        count=COUNT_APPROX,
+    )
+    page_obj = paginator.get_page(request.GET.get("cursor"))
 
     params = request.GET.copy()
-    if 'page' in params:
-        del params['page']
+    for key in ("page", "cursor"):
+        if key in params:
+            del params[key]
     extra_params = params.urlencode()
 
     return render(request, "catalog/list.html", {
@@ -143,52 +222,32 @@ def product_list(request):
     })
 
 
-def product_detail(request, slug):
-    product = get_object_or_404(
-        Product.objects.prefetch_related("images"),
-        slug=slug,
-        is_active=True
-    )
+def _get_product(slug):
+    if snapshot_enabled():
+        product = get_snapshot().by_slug.get(slug)
+    else:
+        found = load_products(Product.objects.filter(slug=slug, is_active=True))
+        product = found[0] if found else None
+    if product is None:
+        raise Http404("Producto no encontrado.")
+    return product
 
-    variants = (
-        Variant.objects
-        .filter(product=product, is_active=True)
-        .select_related("variant_image")  
-        .prefetch_related("attributes")
-        .order_by("price")
-    )
 
-    if not variants.exists():
+@conditional_view(product_state)
+def product_detail(request, slug):
+    # SnapProduct: imágenes, variantes, colores y atributos ya resueltos
+    product = _get_product(slug)
+    variants = product.variants
+
+    if not variants:
         return render(request, "catalog/detail.html", {
             "product": product,
             "variants": variants,
             "variant_choices": [],
         })
 
-    variant_choices = []
-    for v in variants:
-        attrs = list(v.attributes.all())
-        desc = ", ".join([f"{a.name}: {a.value}" for a in attrs]) if attrs else "Variante"
-
-        image_url = ""
-        if v.variant_image:
-            image_url = v.variant_image.image.url
-        else:
-            first = product.images.first()
-            if first:
-                image_url = first.image.url
-
-        variant_choices.append({
-            "id": v.id,
-            "label": desc,
-            "price": str(v.price),
-            "stock": v.stock,
-            "image_url": image_url,
-            "color": {
-                    "name": v.color.name,
-                    "hex_code": v.color.hex_code
-                } if v.color else None,
-        })
+    # Payload precalculado y cacheado por versión del producto
+    variant_choices = get_variant_matrix(product)["variants"]
 
     if request.method == "POST":
         variant_id = request.POST.get("variant_id")
@@ -201,7 +260,7 @@ def product_detail(request, slug):
 
         qty = max(qty, 1)
 
-        v = get_object_or_404(Variant, pk=variant_id, product=product, is_active=True)
+        v = get_object_or_404(Variant, pk=variant_id, product_id=product.id, is_active=True)
 
         if v.stock <= 0:
             messages.error(request, "Esta variante no tiene stock.")
@@ -212,7 +271,7 @@ def product_detail(request, slug):
             return redirect("catalog:detail", slug=slug)
 
         cart = get_or_create_cart(request)
-        added = add_to_cart(cart, v, qty)
+        added = add_to_cart(cart, v, qty, session=request.session)
 
         if not added:
             messages.error(request, "Esta variante no tiene stock.")
@@ -225,4 +284,13 @@ def product_detail(request, slug):
         "product": product,
         "variants": variants,
         "variant_choices": variant_choices,
-    })
\ No newline at end of file
+    })
+
+# -------------------------
+# API para el selector de variantes
+# -------------------------
+@require_http_methods(["GET"])
+@conditional_view(product_state, per_viewer=False)
+def variant_matrix_api(request, slug):
+    product = _get_product(slug)
+    return JsonResponse({"ok": True, **get_variant_matrix(product)})
@@ -1,3 +1,24 @@
 from django.contrib import admin
+from django.utils import timezone
 
-# Register your models here.
+from .models import Job
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ("id", "name", "status", "attempts", "max_attempts", "run_at", "duration", "finished_at")
+    list_filter = ("status", "name")
+    search_fields = ("name",)
+    ordering = ("-id",)
+    readonly_fields = (
+        "name", "args", "kwargs", "status", "attempts", "run_at", "locked_by",
+        "locked_at", "last_error", "duration", "created_at", "finished_at",
+    )
+    actions = ["requeue"]
+
+    @admin.action(description="Reencolar los trabajos seleccionados")
+    def requeue(self, request, queryset):
+        updated = queryset.exclude(status=Job.STATUS_RUNNING).update(
+            status=Job.STATUS_QUEUED, attempts=0, run_at=timezone.now(), locked_by="",
+        )
+        self.message_user(request, f"Trabajos reencolados: {updated}")
@@ -0,0 +1,90 @@
+"""
+GET condicional (ETag / Last-Modified) a partir de contadores de versión.
+
+    @conditional_view(catalog_state)
+    def product_list(request): ...
+
+`state_func(request, *args, **kwargs)` devuelve `(partes, last_modified)`:
+las versiones de los datos que pinta la vista (sin consultas pesadas), o
+None para servir la vista sin validadores. El ETag combina esas partes con
+los parámetros GET ordenados y, si `per_viewer`, con el usuario, el estado
+de su carrito (el navbar muestra el contador) y el secreto CSRF (las
+páginas tienen formularios: tras un login/logout el token rota y una copia
+vieja haría fallar el POST con 403). Si el cliente ya tiene esa versión se
+responde 304 sin ejecutar la vista.
+
+Los ETag son débiles: el HTML puede variar en detalles sin importancia
+(p. ej. el enmascarado del token CSRF) con el mismo contenido.
+"""
+import hashlib
+from functools import wraps
+
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+
+from apps.cart.services import get_cart_state
+
+
+def _has_pending_messages(request):
+    # Un mensaje flash pendiente debe mostrarse: no responder 304
+    if request.COOKIES.get("messages"):
+        return True
+    session = getattr(request, "session", None)
+    return bool(session is not None and session.session_key and session.get("_messages"))
+
+
+def viewer_state(request):
+    user = getattr(request, "user", None)
+    user_id = user.pk if user is not None and user.is_authenticated else None
+    # Secreto sin enmascarar que CsrfViewMiddleware leyó de la cookie (o de la
+    # sesión); get_token() no sirve: enmascara distinto en cada llamada
+    csrf_secret = request.META.get("CSRF_COOKIE")
+    cart = get_cart_state(request)
+    if cart is None:
+        return [user_id, csrf_secret, None, None], None
+    cart_id, updated_at = cart
+    return [user_id, csrf_secret, cart_id, updated_at.isoformat()], updated_at
+
+
+def make_etag(parts):
+    digest = hashlib.md5(repr(parts).encode(), usedforsecurity=False).hexdigest()
+    return f'W/"{digest}"'
+
+
+def conditional_view(state_func, per_viewer=True):
+    def decorator(view):
+        @wraps(view)
+        def inner(request, *args, **kwargs):
+            if request.method not in ("GET", "HEAD") or _has_pending_messages(request):
+                return view(request, *args, **kwargs)
+
+            state = state_func(request, *args, **kwargs)
+            if state is None:
+                return view(request, *args, **kwargs)
+
+            parts, last_modified = state
+            parts = [request.path, sorted(request.GET.lists()), *parts]
+            if per_viewer:
+                viewer_parts, viewer_modified = viewer_state(request)
+                parts += viewer_parts
+                if viewer_modified and (last_modified is None or viewer_modified > last_modified):
+                    last_modified = viewer_modified
+
+            etag = make_etag(parts)
+            timestamp = int(last_modified.timestamp()) if last_modified else None
+
+            response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+            if response is None:
+                response = view(request, *args, **kwargs)
+
+            if request.method in ("GET", "HEAD") and response.status_code in (200, 304):
+                response.headers.setdefault("ETag", etag)
+                if timestamp is not None:
+                    response.headers.setdefault("Last-Modified", http_date(timestamp))
+                # Contenido por usuario: que el navegador revalide siempre
+                patch_cache_control(response, private=True, no_cache=True)
+            return response
+
+        return inner
+
+    return decorator
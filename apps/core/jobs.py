@@ -0,0 +1,172 @@
+"""
+Cola de trabajos en segundo plano sobre la propia base (sin broker).
+
+- `@job` registra una función; `func.delay(*args, **kwargs)` la encola.
+  Los argumentos deben ser serializables a JSON (ids, no instancias).
+- Encolar inserta una fila Job en la transacción en curso: si esta se
+  revierte, el trabajo desaparece con ella, y el worker no lo ve hasta el
+  commit. Fuera de una transacción se encola al instante.
+- `manage.py run_worker` reclama lotes con SELECT ... FOR UPDATE SKIP LOCKED
+  (varios workers no se pisan), los corre en un pool de hilos y reintenta los
+  fallidos con espera exponencial hasta Job.max_attempts.
+- Las funciones se registran al importar el módulo `tasks` de cada app
+  (load_tasks), como admin.py.
+- Sin settings.JOB_QUEUE_ENABLED (no hay worker desplegado), `delay` llama a
+  la función en el acto: nada queda esperando un proceso que no existe.
+  `delay_at` siempre encola.
+"""
+import random
+import time
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import autodiscover_modules
+
+from .models import Job
+
+_registry = {}
+
+
+class JobFunction:
+    def __init__(self, func, name, max_attempts):
+        self.func = func
+        self.name = name
+        self.max_attempts = max_attempts
+        self.__doc__ = func.__doc__
+
+    def __call__(self, *args, **kwargs):
+        # Llamada directa: corre en el acto, sin cola
+        return self.func(*args, **kwargs)
+
+    def delay(self, *args, **kwargs):
+        if not getattr(settings, "JOB_QUEUE_ENABLED", False):
+            return self.func(*args, **kwargs)
+        return enqueue(self.name, args, kwargs, max_attempts=self.max_attempts)
+
+    def delay_at(self, run_at, *args, **kwargs):
+        return enqueue(self.name, args, kwargs, run_at=run_at, max_attempts=self.max_attempts)
+
+
+def job(func=None, *, name=None, max_attempts=None):
+    """
+    Registra `func` como trabajo. Uso: `@job` o `@job(max_attempts=5)`.
+    """
+    def register(func):
+        job_name = name or f"{func.__module__}.{func.__qualname__}"
+        attempts = max_attempts or getattr(settings, "JOB_MAX_ATTEMPTS", 3)
+        wrapped = JobFunction(func, job_name, attempts)
+        _registry[job_name] = wrapped
+        return wrapped
+
+    return register(func) if func is not None else register
+
+
+def enqueue(name, args=(), kwargs=None, run_at=None, max_attempts=None):
+    return Job.objects.create(
+        name=name,
+        args=list(args),
+        kwargs=kwargs or {},
+        run_at=run_at or timezone.now(),
+        max_attempts=max_attempts or getattr(settings, "JOB_MAX_ATTEMPTS", 3),
+    )
+
+
+def load_tasks():
+    autodiscover_modules("tasks")
+
+
+def get_job_function(name):
+    return _registry.get(name)
+
+
+# -------------------------
+# Worker
+# -------------------------
+def claim_jobs(worker_id, limit):
+    """
+    Reclama hasta `limit` trabajos vencidos (los más viejos primero) y los
+    marca en ejecución. SKIP LOCKED: lo que otro worker está reclamando se
+    saltea en vez de esperar.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        ids = list(
+            Job.objects
+            .select_for_update(skip_locked=True)
+            .filter(status=Job.STATUS_QUEUED, run_at__lte=now)
+            .order_by("run_at", "pk")
+            .values_list("pk", flat=True)[:limit]
+        )
+        if not ids:
+            return []
+        Job.objects.filter(pk__in=ids).update(
+            status=Job.STATUS_RUNNING,
+            locked_by=worker_id,
+            locked_at=now,
+            attempts=F("attempts") + 1,
+        )
+    return list(Job.objects.filter(pk__in=ids).order_by("run_at", "pk"))
+
+
+def retry_delay(attempt):
+    # Exponencial con jitter: base·2^(intento-1), ±50 %
+    base = getattr(settings, "JOB_RETRY_BASE_DELAY", 10)
+    return base * 2 ** (attempt - 1) * random.uniform(0.5, 1.5)
+
+
+def run_job(job):
+    """
+    Corre un Job ya reclamado y guarda el resultado. Retorna (ok, segundos).
+    """
+    func = get_job_function(job.name)
+    started = time.perf_counter()
+    try:
+        if func is None:
+            raise LookupError(f"Tarea no registrada: {job.name}")
+        func.func(*job.args, **job.kwargs)
+    except Exception:
+        duration = time.perf_counter() - started
+        values = {"last_error": traceback.format_exc(), "duration": duration, "locked_by": ""}
+        if job.attempts >= job.max_attempts or func is None:
+            values.update(status=Job.STATUS_FAILED, finished_at=timezone.now())
+        else:
+            values.update(
+                status=Job.STATUS_QUEUED,
+                run_at=timezone.now() + timedelta(seconds=retry_delay(job.attempts)),
+            )
+        Job.objects.filter(pk=job.pk).update(**values)
+        return False, duration
+    else:
+        duration = time.perf_counter() - started
+        Job.objects.filter(pk=job.pk).update(
+            status=Job.STATUS_DONE,
+            duration=duration,
+            finished_at=timezone.now(),
+            locked_by="",
+            last_error="",
+        )
+        return True, duration
+    finally:
+        # Cada hilo del pool tiene su conexión: se recicla como tras un request
+        close_old_connections()
+
+
+def requeue_stale(older_than):
+    """
+    Trabajos en ejecución hace más de `older_than` segundos (el worker que los
+    tomó murió): vuelven a la cola, o fallan si ya agotaron sus intentos.
+    Retorna cuántos se reencolaron.
+    """
+    now = timezone.now()
+    stale = Job.objects.filter(status=Job.STATUS_RUNNING, locked_at__lt=now - timedelta(seconds=older_than))
+    stale.filter(attempts__gte=F("max_attempts")).update(
+        status=Job.STATUS_FAILED,
+        last_error="El worker se detuvo durante la ejecución.",
+        finished_at=now,
+        locked_by="",
+    )
+    return stale.update(status=Job.STATUS_QUEUED, locked_by="", run_at=now)
@@ -0,0 +1,101 @@
+import os
+import signal
+import socket
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError
+
+from apps.core.jobs import claim_jobs, load_tasks, requeue_stale, run_job
+
+
+class Command(BaseCommand):
+    help = (
+        "Worker de la cola de trabajos (apps.core.jobs): reclama lotes con "
+        "SELECT ... FOR UPDATE SKIP LOCKED y los corre en un pool de hilos."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--concurrency", type=int, default=None,
+            help="Hilos del pool (por defecto settings.JOB_WORKER_CONCURRENCY).",
+        )
+        parser.add_argument(
+            "--poll", type=float, default=None,
+            help="Segundos de espera cuando la cola está vacía (por defecto settings.JOB_WORKER_POLL).",
+        )
+        parser.add_argument(
+            "--stale-after", type=int, default=600,
+            help="Reencola trabajos en ejecución hace más de estos segundos (worker caído).",
+        )
+        parser.add_argument(
+            "--once", action="store_true",
+            help="Procesa lo que haya en la cola y termina (p. ej. desde un cron).",
+        )
+
+    def handle(self, *args, **options):
+        load_tasks()
+        concurrency = options["concurrency"] or getattr(settings, "JOB_WORKER_CONCURRENCY", 4)
+        poll = options["poll"] or getattr(settings, "JOB_WORKER_POLL", 1.0)
+        worker_id = f"{socket.gethostname()}:{os.getpid()}"
+
+        stop = threading.Event()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(sig, lambda *_: stop.set())
+
+        requeued = requeue_stale(options["stale_after"])
+        self.stdout.write(f"Worker {worker_id} · {concurrency} hilos · reencolados: {requeued}")
+
+        metrics = {}
+        running = {}
+        with ThreadPoolExecutor(concurrency) as pool:
+            while not stop.is_set():
+                free = concurrency - len(running)
+                try:
+                    jobs = claim_jobs(worker_id, free) if free else []
+                except DatabaseError as exc:
+                    # Base ocupada o caída: se reintenta en la próxima vuelta
+                    self.stderr.write(f"No se pudieron reclamar trabajos: {exc}")
+                    jobs = []
+                for job in jobs:
+                    running[pool.submit(run_job, job)] = job
+
+                if not running:
+                    if options["once"]:
+                        break
+                    stop.wait(poll)
+                    continue
+
+                done, _ = wait(running, timeout=poll, return_when=FIRST_COMPLETED)
+                for future in done:
+                    self.record(running.pop(future), future, metrics)
+
+            # Al detenerse se terminan los trabajos ya tomados
+            for future in list(running):
+                self.record(running.pop(future), future, metrics)
+
+        self.summary(metrics)
+
+    def record(self, job, future, metrics):
+        try:
+            ok, seconds = future.result()
+        except DatabaseError as exc:
+            # No se pudo guardar el resultado: queda en ejecución y requeue_stale lo recupera
+            self.stderr.write(f"{job.name} #{job.pk}: {exc}")
+            return
+        stats = metrics.setdefault(job.name, {"ok": 0, "failed": 0, "times": []})
+        stats["ok" if ok else "failed"] += 1
+        stats["times"].append(seconds)
+        mark = self.style.SUCCESS("✓") if ok else self.style.ERROR("✗")
+        self.stdout.write(f"{mark} {job.name} #{job.pk} · intento {job.attempts} · {seconds * 1000:.0f} ms")
+
+    def summary(self, metrics):
+        for name, stats in sorted(metrics.items()):
+            times = sorted(stats["times"])
+            p95 = times[min(len(times) - 1, int(round(0.95 * (len(times) - 1))))]
+            self.stdout.write(
+                f"{name}: {stats['ok']} ok · {stats['failed']} con error · "
+                f"media {sum(times) / len(times) * 1000:.0f} ms · p95 {p95 * 1000:.0f} ms"
+            )
@@ -1,3 +1,47 @@
 from django.db import models
+from django.utils import timezone
 
-# Create your models here.
+
+class Job(models.Model):
+    """
+    Trabajo en segundo plano (ver apps.core.jobs y `manage.py run_worker`).
+    """
+    STATUS_QUEUED = "queued"
+    STATUS_RUNNING = "running"
+    STATUS_DONE = "done"
+    STATUS_FAILED = "failed"
+
+    STATUS_CHOICES = [
+        (STATUS_QUEUED, "En cola"),
+        (STATUS_RUNNING, "En ejecución"),
+        (STATUS_DONE, "Terminado"),
+        (STATUS_FAILED, "Fallido"),
+    ]
+
+    name = models.CharField("Tarea", max_length=200)
+    args = models.JSONField("Argumentos", default=list, blank=True)
+    kwargs = models.JSONField("Argumentos con nombre", default=dict, blank=True)
+
+    status = models.CharField("Estado", max_length=10, choices=STATUS_CHOICES, default=STATUS_QUEUED)
+    attempts = models.PositiveIntegerField("Intentos", default=0)
+    max_attempts = models.PositiveIntegerField("Intentos máximos", default=3)
+    run_at = models.DateTimeField("Ejecutar desde", default=timezone.now)
+
+    locked_by = models.CharField("Worker", max_length=100, blank=True)
+    locked_at = models.DateTimeField("Tomado", null=True, blank=True)
+    last_error = models.TextField("Último error", blank=True)
+    duration = models.FloatField("Duración (s)", null=True, blank=True)
+
+    created_at = models.DateTimeField("Creado", auto_now_add=True)
+    finished_at = models.DateTimeField("Terminado", null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Trabajo"
+        verbose_name_plural = "Trabajos"
+        indexes = [
+            # Lo que lee el worker al reclamar: en cola y vencidos, por antigüedad
+            models.Index(fields=["status", "run_at"], name="job_claim_idx"),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.name} #{self.pk} ({self.get_status_display()})"
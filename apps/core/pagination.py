@@ -0,0 +1,225 @@
+"""
+Paginación por cursor (keyset) reutilizable.
+
+En vez de OFFSET + COUNT(*), cada página se pide "después de" (o "antes de")
+la clave de orden del último (primer) elemento visto. El cursor es opaco y va
+firmado con django.core.signing, atado a un `salt` por vista y orden, así un
+cursor manipulado o de otro orden simplemente vuelve a la primera página.
+
+Acepta un QuerySet (filtra en SQL) o una secuencia en memoria, p. ej. el
+snapshot del catálogo (ordena y filtra en Python con la misma semántica).
+
+Los campos de orden no deben ser NULL; siempre se agrega "pk" como desempate.
+"""
+import datetime
+import json
+from decimal import Decimal
+from functools import cmp_to_key
+
+from django.core import signing
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections
+from django.db.models import Q, QuerySet
+
+_encoder = DjangoJSONEncoder()
+
+COUNT_EXACT = "exact"
+COUNT_APPROX = "approx"
+
+
+def approximate_count(queryset):
+    """
+    Estimación del planificador de PostgreSQL (EXPLAIN); en otros motores, COUNT exacto.
+    """
+    queryset = queryset.order_by()
+    connection = connections[queryset.db]
+    if connection.vendor != "postgresql":
+        return queryset.count()
+
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+def _parse_ordering(ordering):
+    fields = []
+    for item in ordering:
+        desc = item.startswith("-")
+        fields.append((item.lstrip("-"), desc))
+    if not any(name in ("pk", "id") for name, _ in fields):
+        fields.append(("pk", fields[-1][1] if fields else False))
+    return fields
+
+
+def _value(obj, name):
+    for part in name.split("__"):
+        obj = getattr(obj, part)
+    return obj
+
+
+def _decode(raw, sample):
+    # En memoria hay que volver al tipo original para comparar
+    if raw is None or sample is None:
+        return raw
+    if isinstance(sample, datetime.datetime):
+        return datetime.datetime.fromisoformat(raw)
+    if isinstance(sample, Decimal):
+        return Decimal(raw)
+    return raw
+
+
+def _encode(value):
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    if isinstance(value, datetime.datetime):
+        # DjangoJSONEncoder recorta a milisegundos: el cursor necesita el valor exacto
+        return value.isoformat()
+    return _encoder.default(value)
+
+
+class KeysetPage:
+    def __init__(self, object_list, has_next, has_previous, next_cursor, previous_cursor,
+                 total=None, total_is_approximate=False):
+        self.object_list = object_list
+        self.has_next = has_next
+        self.has_previous = has_previous
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+        self.total = total
+        self.total_is_approximate = total_is_approximate
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __bool__(self):
+        return bool(self.object_list)
+
+    @property
+    def has_other_pages(self):
+        return self.has_next or self.has_previous
+
+
+class KeysetPaginator:
+    """
+    paginator = KeysetPaginator(qs, ["category_name", "-created_at"], per_page=12, salt="catalog:newest")
+    page = paginator.get_page(request.GET.get("cursor"))
+    """
+
+    def __init__(self, queryset, ordering, per_page, salt, count=None):
+        self.queryset = queryset
+        self.fields = _parse_ordering(ordering)
+        self.per_page = per_page
+        self.salt = f"keyset:{salt}"
+        self.count = count
+
+    # ----- cursores -----
+    def _make_cursor(self, obj, direction):
+        key = [_encode(_value(obj, name)) for name, _ in self.fields]
+        return signing.dumps({"k": key, "d": direction}, salt=self.salt, compress=True)
+
+    def _read_cursor(self, cursor):
+        if not cursor:
+            return None, "n"
+        try:
+            data = signing.loads(cursor, salt=self.salt)
+            key, direction = data["k"], data["d"]
+        except (signing.BadSignature, KeyError, TypeError, ValueError):
+            return None, "n"
+        if len(key) != len(self.fields) or direction not in ("n", "p"):
+            return None, "n"
+        return key, direction
+
+    # ----- consultas -----
+    def _order_by(self, reverse=False):
+        return [
+            f"{'-' if desc != reverse else ''}{name}"
+            for name, desc in self.fields
+        ]
+
+    def _after(self, key, reverse=False):
+        """
+        (a, b, c) > (x, y, z) respetando la dirección de cada campo:
+        a>x OR (a=x AND b>y) OR (a=x AND b=y AND c>z)
+        """
+        condition = Q()
+        equal = Q()
+        for (name, desc), value in zip(self.fields, key):
+            op = "lt" if desc != reverse else "gt"
+            condition |= equal & Q(**{f"{name}__{op}": value})
+            equal &= Q(**{name: value})
+        return condition
+
+    # ----- secuencias en memoria -----
+    def _key(self, obj):
+        return [_value(obj, name) for name, _ in self.fields]
+
+    def _compare(self, a, b):
+        for (_, desc), x, y in zip(self.fields, a, b):
+            if x == y:
+                continue
+            result = -1 if x < y else 1
+            return -result if desc else result
+        return 0
+
+    def _sequence_rows(self, key, backwards):
+        items = sorted(
+            self.queryset,
+            key=cmp_to_key(lambda a, b: self._compare(self._key(a), self._key(b))),
+            reverse=backwards,
+        )
+        if key is not None and items:
+            sample = self._key(items[0])
+            key = [_decode(raw, value) for raw, value in zip(key, sample)]
+            sign = -1 if backwards else 1
+            items = [obj for obj in items if self._compare(self._key(obj), key) * sign > 0]
+        return items[: self.per_page + 1]
+
+    def get_page(self, cursor=None):
+        key, direction = self._read_cursor(cursor)
+        backwards = direction == "p"
+        is_queryset = isinstance(self.queryset, QuerySet)
+
+        if is_queryset:
+            qs = self.queryset.order_by(*self._order_by(reverse=backwards))
+            if key is not None:
+                qs = qs.filter(self._after(key, reverse=backwards))
+            rows = list(qs[: self.per_page + 1])
+        else:
+            rows = self._sequence_rows(key, backwards)
+
+        more = len(rows) > self.per_page
+        rows = rows[: self.per_page]
+        if backwards:
+            rows.reverse()
+
+        if backwards:
+            has_next, has_previous = True, more
+        else:
+            has_next, has_previous = more, key is not None
+
+        total = None
+        approximate = False
+        if self.count and not is_queryset:
+            total = len(self.queryset)
+        elif self.count == COUNT_EXACT:
+            total = self.queryset.order_by().count()
+        elif self.count == COUNT_APPROX:
+            total = approximate_count(self.queryset)
+            approximate = connections[self.queryset.db].vendor == "postgresql"
+
+        return KeysetPage(
+            rows,
+            has_next=has_next and bool(rows),
+            has_previous=has_previous and bool(rows),
+            next_cursor=self._make_cursor(rows[-1], "n") if has_next and rows else None,
+            previous_cursor=self._make_cursor(rows[0], "p") if has_previous and rows else None,
+            total=total,
+            total_is_approximate=approximate,
+        )
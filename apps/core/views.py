@@ -1,16 +1,12 @@
 from django.shortcuts import render
-from apps.catalog.models import Product
-import random
+from apps.catalog.featured import get_featured_products
+
+HOME_FEATURED_COUNT = 4
+
 
 def home(request):
-    products = list(
-        Product.objects.filter(is_active=True)
-    )
-
-    featured_products = random.sample(
-        products,
-        min(len(products), 4)
-    )
+    # Pool de destacados: sorteo por posición + tarjetas ya listas, cacheado
+    featured_products = get_featured_products(HOME_FEATURED_COUNT)
 
     return render(request, "core/home.html", {
         "featured_products": featured_products
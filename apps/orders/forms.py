@@ -1,4 +1,6 @@
 import re
+import uuid
+
 from django import forms
 from apps.shipping.models import ShippingZone
 
@@ -134,6 +136,14 @@ class CheckoutForm(forms.Form):
         }),
     )
 
+    # ---------- Envío único ----------
+    # Una clave nueva por formulario renderizado; reenviarlo devuelve el mismo pedido
+    idempotency_key = forms.UUIDField(
+        required=False,
+        initial=uuid.uuid4,
+        widget=forms.HiddenInput,
+    )
+
     # ---------- Validaciones ----------
     def clean_customer_name(self):
         v = (self.cleaned_data.get("customer_name") or "").strip()
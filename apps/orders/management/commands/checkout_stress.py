@@ -0,0 +1,194 @@
+import multiprocessing
+import random
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection, connections
+from django.db.models import Sum
+
+from apps.cart.snapshot import CartLine
+from apps.catalog.models import Product, Variant
+from apps.catalog.versioning import get_catalog_version
+from apps.orders.models import Order, OrderItem
+from apps.orders.services import place_order, retry_on_conflict
+
+PRICE = Decimal("10.00")
+
+
+def _percentile(values, fraction):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(fraction * (len(values) - 1))))]
+
+
+def _worker(task):
+    """
+    Corre en un hilo o proceso con su propia conexión. Retorna
+    ([(resultado, segundos, reintentos, variantes)], [esperas de FOR UPDATE]).
+    """
+    index, orders, variants, lines_per_order, qty, tag = task
+    rng = random.Random(index)
+    results, lock_waits = [], []
+
+    def timed(execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            if "FOR UPDATE" in sql:
+                lock_waits.append(time.perf_counter() - start)
+
+    try:
+        with connection.execute_wrapper(timed):
+            for _ in range(orders):
+                chosen = rng.sample(variants, k=lines_per_order)
+                lines = [
+                    CartLine(pk, pk, product_id, tag, "", "", PRICE, 0, qty, PRICE * qty, None)
+                    for pk, product_id in chosen
+                ]
+                subtotal = PRICE * qty * len(lines)
+                retries = []
+                start = time.perf_counter()
+                try:
+                    retry_on_conflict(
+                        lambda: place_order(lines, customer_name=tag, subtotal=subtotal, total=subtotal),
+                        on_retry=lambda attempt, exc: retries.append(attempt),
+                    )
+                    outcome = "ok"
+                except ValueError:
+                    outcome = "stock"
+                except OperationalError:
+                    outcome = "error"
+                results.append((outcome, time.perf_counter() - start, len(retries), [pk for pk, _ in chosen]))
+    finally:
+        connection.close()
+    return results, lock_waits
+
+
+class Command(BaseCommand):
+    help = (
+        "Prueba de carga del checkout: N hilos (o procesos) compran a la vez las mismas "
+        "variantes de un producto temporal. Reporta throughput, latencia p95, esperas de "
+        "bloqueo y sobreventas/subventas. Usar contra una base local (PostgreSQL; SQLite "
+        "solo como prueba de humo), nunca en producción."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=8, help="Compradores simultáneos.")
+        parser.add_argument("--orders", type=int, default=25, help="Pedidos por comprador.")
+        parser.add_argument("--variants", type=int, default=3, help="Variantes disputadas.")
+        parser.add_argument("--lines", type=int, default=2, help="Variantes por pedido.")
+        parser.add_argument("--qty", type=int, default=1, help="Unidades por línea.")
+        parser.add_argument(
+            "--stock", type=int, default=None,
+            help="Stock inicial por variante (por defecto, la mitad de lo que se intentará "
+                 "comprar: fuerza a que se agote).",
+        )
+        parser.add_argument("--processes", action="store_true", help="Procesos en lugar de hilos.")
+        parser.add_argument("--keep", action="store_true", help="No borra el producto ni los pedidos de prueba.")
+
+    def handle(self, *args, **options):
+        workers, orders = options["workers"], options["orders"]
+        lines_per_order, qty = options["lines"], options["qty"]
+        if not 0 < lines_per_order <= options["variants"]:
+            raise CommandError("--lines debe estar entre 1 y --variants.")
+
+        stock = options["stock"]
+        if stock is None:
+            demand = workers * orders * lines_per_order * qty / options["variants"]
+            stock = max(1, int(demand // 2))
+
+        tag = f"checkout_stress {uuid.uuid4().hex[:8]}"
+        product = Product.objects.create(name=tag, is_active=False)
+        Variant.objects.bulk_create([
+            Variant(product=product, price=PRICE, stock=stock, sku=f"STRESS-{n}")
+            for n in range(options["variants"])
+        ])
+        variants = list(product.variants.order_by("pk").values_list("pk", "product_id"))
+        tasks = [(n, orders, variants, lines_per_order, qty, tag) for n in range(workers)]
+
+        mode = "procesos" if options["processes"] else "hilos"
+        self.stdout.write(
+            f"{connection.vendor} · {workers} {mode} × {orders} pedidos · "
+            f"{len(variants)} variantes con stock {stock}"
+        )
+
+        try:
+            catalog_version = get_catalog_version()
+            started = time.perf_counter()
+            if options["processes"]:
+                # Cada proceso abre su conexión: no se heredan las abiertas
+                connections.close_all()
+                executor = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("fork"))
+            else:
+                executor = ThreadPoolExecutor(workers)
+            with executor:
+                outputs = list(executor.map(_worker, tasks))
+            elapsed = time.perf_counter() - started
+
+            results = [row for rows, _ in outputs for row in rows]
+            lock_waits = [wait for _, waits in outputs for wait in waits]
+            self.report(results, lock_waits, elapsed)
+            # Cada suba es una escritura en la única fila de CatalogVersion:
+            # una por pedido, siempre tras el commit (fuera de los bloqueos)
+            self.stdout.write(f"Versión del catálogo: +{get_catalog_version() - catalog_version}")
+            self.verify(results, variants, stock, qty, tag)
+        finally:
+            if not options["keep"]:
+                Order.objects.filter(customer_name=tag).delete()
+                product.delete()
+
+    def report(self, results, lock_waits, elapsed):
+        counts = {outcome: 0 for outcome in ("ok", "stock", "error")}
+        for outcome, *_ in results:
+            counts[outcome] += 1
+        latencies = [seconds for _, seconds, _, _ in results]
+        retries = sum(n for _, _, n, _ in results)
+
+        self.stdout.write(
+            f"Pedidos: {counts['ok']} creados · {counts['stock']} sin stock · "
+            f"{counts['error']} con error tras reintentar · reintentos: {retries}"
+        )
+        self.stdout.write(
+            f"Throughput: {counts['ok'] / elapsed:.1f} pedidos/s en {elapsed:.2f} s · "
+            f"latencia p50 {_percentile(latencies, .5) * 1000:.0f} ms · "
+            f"p95 {_percentile(latencies, .95) * 1000:.0f} ms · "
+            f"máx {max(latencies, default=0) * 1000:.0f} ms"
+        )
+        if lock_waits:
+            self.stdout.write(
+                f"Esperas de bloqueo (SELECT ... FOR UPDATE): {len(lock_waits)} · "
+                f"total {sum(lock_waits) * 1000:.0f} ms · p95 {_percentile(lock_waits, .95) * 1000:.0f} ms"
+            )
+        else:
+            self.stdout.write("Esperas de bloqueo: no medidas (la base no usa SELECT ... FOR UPDATE)")
+
+    def verify(self, results, variants, stock, qty, tag):
+        final = dict(Variant.objects.filter(pk__in=[pk for pk, _ in variants]).values_list("pk", "stock"))
+        sold = dict(
+            OrderItem.objects.filter(order__customer_name=tag)
+            .values_list("variant_id")
+            .annotate(total=Sum("quantity"))
+        )
+
+        # Sobreventa: se vendió más que el stock o el stock no cuadra con lo vendido
+        oversold = [
+            pk for pk in final
+            if final[pk] < 0 or sold.get(pk, 0) > stock or stock - final[pk] != sold.get(pk, 0)
+        ]
+        # Subventa: se rechazó por stock un pedido que al final todavía alcanzaba
+        # (el stock solo baja durante la prueba)
+        undersold = [
+            chosen for outcome, _, _, chosen in results
+            if outcome == "stock" and all(final[pk] >= qty for pk in chosen)
+        ]
+
+        summary = f"Sobreventas: {len(oversold)} · subventas: {len(undersold)}"
+        if oversold or undersold:
+            self.stdout.write(self.style.ERROR(summary))
+        else:
+            self.stdout.write(self.style.SUCCESS(summary))
@@ -75,6 +75,9 @@ class Order(models.Model):
     help_text="Texto que se mostrará al cliente según el método de pago elegido"
     )
 
+    # Clave del envío del formulario de checkout: un reenvío no duplica el pedido
+    idempotency_key = models.UUIDField("Clave de envío", null=True, blank=True, unique=True, editable=False)
+
     # Auditoría
     stock_reverted = models.BooleanField(default=False)
     created_at = models.DateTimeField("Creado", auto_now_add=True)
@@ -96,6 +99,7 @@ class Order(models.Model):
             return
 
         from apps.catalog.models import Variant
+        from apps.catalog.versioning import bump_catalog_version, bump_product_versions
 
         with transaction.atomic():
             self.refresh_from_db()
@@ -108,6 +112,8 @@ class Order(models.Model):
                         stock=F("stock") + it.quantity
                     )
 
+            bump_product_versions(self.items.values("variant__product_id"))
+            bump_catalog_version()
             self.stock_reverted = True
             self.save(update_fields=["stock_reverted"])
 
@@ -0,0 +1,253 @@
+"""
+Recibo PDF de un pedido.
+
+El PDF se dibuja con ReportLab una sola vez por versión del pedido y se
+guarda en settings.ORDERS_RECEIPT_CACHE_ROOT como `<id>-<updated_at>.pdf`:
+mientras el pedido no cambie, cada descarga es solo leer un archivo. Al
+cambiar (updated_at se mueve con cualquier save) se genera el nuevo y se
+borran los anteriores de ese pedido. El directorio es una caché: borrarlo
+entero solo obliga a regenerar.
+
+El logo sale de static/branding/logo.png (staticfiles.finders) y se lee una
+vez por proceso, sin red.
+"""
+import logging
+import os
+import tempfile
+from decimal import Decimal
+from functools import lru_cache
+from io import BytesIO
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.units import cm
+from reportlab.lib.utils import ImageReader
+from reportlab.pdfgen import canvas
+from reportlab.platypus import Table, TableStyle
+
+logger = logging.getLogger(__name__)
+
+LOGO_PATH = "branding/logo.png"
+# Subir al cambiar el diseño del recibo: invalida los PDF ya guardados
+LAYOUT_VERSION = 1
+
+
+def money(amount):
+    if amount is None:
+        return "0.00"
+    return f"{amount:.2f}"
+
+
+@lru_cache(maxsize=1)
+def _logo():
+    path = finders.find(LOGO_PATH)
+    if not path:
+        logger.warning("No se encontró el logo del recibo (%s)", LOGO_PATH)
+        return None
+    with open(path, "rb") as fh:
+        return ImageReader(BytesIO(fh.read()))
+
+
+def render_receipt(order):
+    """
+    Bytes del PDF del pedido. Usa order.items y order.user.
+    """
+    width, height = A4
+    margin = 2 * cm
+    buffer = BytesIO()
+    p = canvas.Canvas(buffer, pagesize=A4)
+
+    # =====================================================
+    # 3. ENCABEZADO: DATOS EMPRESA (IZQUIERDA)
+    # =====================================================
+    y_header = height - 2 * cm
+    
+    p.setFont("Helvetica-Bold", 12)
+    p.drawString(margin, y_header, "CONFECCIONES ISMAEL")
+    p.setFont("Helvetica", 10)
+    y_header -= 0.5 * cm
+    #p.drawString(margin, y_header, "RUC: 1234567890001")
+    #y_header -= 0.5 * cm
+    p.drawString(margin, y_header, "Av. Rocafuerte y Carlos Maria")
+    y_header -= 0.5 * cm
+    p.drawString(margin, y_header, "Tel: 099 452 8554")
+    y_header -= 0.5 * cm
+    p.drawString(margin, y_header, f"Fecha: {order.created_at.strftime('%d/%m/%Y')}")
+
+    # =====================================================
+    # 4. LOGO (ARCHIVO ESTÁTICO, CARGADO UNA VEZ POR PROCESO)
+    # =====================================================
+    logo = _logo()
+
+    logo_width = 4 * cm
+    logo_x = width - margin - logo_width
+    logo_y = height - 3.5 * cm 
+
+    if logo is not None:
+        p.drawImage(logo, logo_x, logo_y, width=logo_width, preserveAspectRatio=True, mask='auto')
+    # =====================================================
+    # 5. TÍTULO Y CLIENTE
+    # =====================================================
+    y = height - 5.5 * cm
+    
+    # Línea separadora
+    p.setLineWidth(1)
+    p.line(margin, y + 0.5*cm, width - margin, y + 0.5*cm)
+
+    # Título Centrado
+    p.setFont("Helvetica-Bold", 14)
+    p.drawCentredString(width / 2, y, f"ORDEN DE PEDIDO #{order.id}")
+
+    # Datos del Cliente
+    y -= 1 * cm
+    p.setFont("Helvetica-Bold", 10)
+    p.drawString(margin, y, "Facturar a:")
+    
+    p.setFont("Helvetica", 10)
+    y -= 0.5 * cm
+    
+    # Validación de datos (para evitar errores si están vacíos)
+    c_name = order.customer_name if order.customer_name else "Cliente General"
+    c_address = order.customer_address if order.customer_address else "Dirección no registrada"
+    c_phone = order.customer_phone if order.customer_phone else "Sin teléfono"
+    c_email = order.user.email if (order.user and order.user.email) else "N/A"
+    
+    p.drawString(margin, y, f"Nombre: {c_name}")
+    p.drawString(width/2, y, f"Teléfono: {c_phone}") 
+    
+    y -= 0.5 * cm
+    p.drawString(margin, y, f"Dirección: {c_address}")
+    p.drawString(width/2, y, f"Email: {c_email}")
+
+    # =====================================================
+    # 6. TABLA DE PRODUCTOS
+    # =====================================================
+    y -= 1.0 * cm
+    
+    data = [['Producto / Descripción', 'Cant.', 'Precio', 'Total']]
+    
+    for item in order.items.all():
+        desc = item.product_name
+        if item.variant_description:
+            desc += f"\n({item.variant_description})"
+            
+        data.append([
+            desc,
+            str(item.quantity),
+            f"${money(item.unit_price)}",
+            f"${money(item.line_total)}"
+        ])
+
+    # Anchos calculados: 9.5 + 2 + 2.75 + 2.75 = 17cm (Ancho útil A4)
+    col_widths = [9.5*cm, 2*cm, 2.75*cm, 2.75*cm]
+    
+    table = Table(data, colWidths=col_widths)
+
+    estilo_tabla = [
+        ('BACKGROUND', (0, 0), (-1, 0), colors.Color(0.2, 0.2, 0.2)), # Header oscuro
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),                 # Texto blanco
+        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+        ('ALIGN', (1, 0), (-1, -1), 'CENTER'),
+        ('ALIGN', (2, 0), (-1, -1), 'RIGHT'),
+        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, 0), 9),
+        ('BOTTOMPADDING', (0, 0), (-1, 0), 8),
+        ('TOPPADDING', (0, 0), (-1, 0), 8),
+        ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+        ('FONTSIZE', (0, 1), (-1, -1), 9),
+        ('GRID', (0, 0), (-1, -1), 0.5, colors.Color(0.8, 0.8, 0.8)),
+        ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.Color(0.97, 0.97, 0.97)]),
+    ]
+    
+    table.setStyle(TableStyle(estilo_tabla))
+
+    w_table, h_table = table.wrapOn(p, width, height)
+    
+    # Salto de página si la tabla es muy larga
+    if y - h_table < 2*cm:
+        p.showPage()
+        y = height - margin
+        
+    table.drawOn(p, margin, y - h_table)
+
+    # =====================================================
+    # 7. TOTALES
+    # =====================================================
+    y_final = y - h_table - 0.8*cm
+    
+    # Uso de Decimal("0.00") para asegurar matemáticas correctas
+    shipping = order.shipping_cost if order.shipping_cost else Decimal("0.00")
+    total = order.total if order.total else Decimal("0.00")
+    subtotal = total - shipping
+
+    p.setFont("Helvetica", 10)
+    p.drawRightString(width - margin, y_final, f"Subtotal:   ${money(subtotal)}")
+    
+    y_final -= 0.6 * cm
+    p.drawRightString(width - margin, y_final, f"Envío:   ${money(shipping)}")
+    
+    y_final -= 0.3 * cm
+    p.setLineWidth(1)
+    p.line(width - margin - 5*cm, y_final, width - margin, y_final)
+    
+    y_final -= 0.6 * cm
+    p.setFont("Helvetica-Bold", 12)
+    p.drawRightString(width - margin, y_final, f"TOTAL:   ${money(total)}")
+
+    # Pie de página
+    p.setFont("Helvetica-Oblique", 8)
+    p.drawCentredString(width/2, 2*cm, "Gracias por preferir Confecciones Ismael")
+
+    p.showPage()
+    p.save()
+    return buffer.getvalue()
+
+
+def receipt_stamp(order):
+    # Versión del recibo: cambia con cada save del pedido
+    return f"{order.updated_at.strftime('%Y%m%d%H%M%S%f')}-v{LAYOUT_VERSION}"
+
+
+def _cache_dir():
+    return getattr(settings, "ORDERS_RECEIPT_CACHE_ROOT", None) or os.path.join(
+        settings.MEDIA_ROOT or "media", "receipts"
+    )
+
+
+def receipt_path(order):
+    """
+    Ruta del PDF vigente del pedido; lo genera si todavía no existe.
+    """
+    directory = _cache_dir()
+    name = f"{order.pk}-{receipt_stamp(order)}.pdf"
+    path = os.path.join(directory, name)
+    if os.path.exists(path):
+        return path
+
+    os.makedirs(directory, exist_ok=True)
+    data = render_receipt(order)
+    # Archivo temporal + rename atómico: dos requests simultáneos no dejan un
+    # PDF a medio escribir, a lo sumo lo generan dos veces
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix=f".{order.pk}-", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as fh:
+            fh.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+    # Versiones anteriores del mismo pedido
+    prefix = f"{order.pk}-"
+    for entry in os.scandir(directory):
+        if entry.name.startswith(prefix) and entry.name.endswith(".pdf") and entry.name != name:
+            try:
+                os.remove(entry.path)
+            except FileNotFoundError:
+                pass
+    return path
@@ -0,0 +1,184 @@
+"""
+Creación de pedidos.
+
+place_order cobra las líneas de un CartSnapshot con una cantidad fija de
+sentencias, sin importar cuántas líneas tenga:
+
+1. INSERT del pedido. Con idempotency_key, el índice único hace que un
+   reenvío simultáneo espere a este (y falle con IntegrityError si se
+   confirma) antes de tocar el carrito o el stock.
+2. Bloqueo del carrito (apps.cart.services.lock_cart), si se pasa, y
+   relectura de sus ítems: si cambiaron desde que se armaron las líneas (otra
+   pestaña agregó o quitó algo) se aborta en vez de cobrar líneas viejas.
+3. SELECT ... FOR UPDATE de todas las variantes, en orden de pk (dos checkouts
+   con variantes en común se bloquean en el mismo orden: sin deadlocks).
+4. Validación del stock y del precio en memoria.
+5. Un solo UPDATE con CASE por variante para descontar el stock.
+6. bulk_create de los ítems del pedido.
+
+Las versiones (el UPDATE no dispara señales) se suben al confirmar, fuera de
+los bloqueos: Product.version de los productos vendidos y la versión global
+del catálogo (de ella dependen el snapshot de cada worker y el de los
+carritos, que muestran stock). Así dos checkouts sin variantes en común no
+se esperan en ninguna fila.
+
+Orden de bloqueo del checkout: clave del pedido, carrito, variantes por pk,
+ítems del carrito. Aun así, bajo mucha concurrencia la base
+puede abortar una transacción (deadlock, serialización, lock_timeout):
+retry_on_conflict la repite entera unas pocas veces con espera aleatoria.
+"""
+import random
+import time
+
+from django.conf import settings
+from django.db import OperationalError, transaction
+from django.db.models import Case, F, IntegerField, Value, When
+
+from apps.cart.cookie import CookieCart
+from apps.cart.models import CartItem
+from apps.cart.services import lock_cart
+from apps.catalog.cards import refresh_product_card
+from apps.catalog.models import Variant
+from apps.catalog.versioning import bump_catalog_version, bump_product_versions
+
+from .models import Order, OrderItem
+
+# PostgreSQL: serialization_failure, deadlock_detected, lock_not_available
+TRANSIENT_SQLSTATES = {"40001", "40P01", "55P03"}
+
+CART_CHANGED_MESSAGE = "Tu carrito cambió mientras confirmabas el pedido. Revísalo y vuelve a confirmar."
+
+
+def _lock_stock(quantities):
+    # {variant_id: (stock, precio)}
+    rows = (
+        Variant.objects
+        .filter(pk__in=quantities)
+        .order_by("pk")
+        .select_for_update()
+        .values_list("pk", "stock", "price")
+    )
+    return {pk: (stock, price) for pk, stock, price in rows}
+
+
+def _check_cart(cart, quantities):
+    # Ítems del carrito ya bloqueado contra las líneas que se van a cobrar.
+    # Un CookieCart viaja en el propio request: no puede cambiar en el medio.
+    if cart is None or isinstance(cart, CookieCart):
+        return
+    current = dict(CartItem.objects.filter(cart_id=cart.pk).values_list("variant_id", "quantity"))
+    if current != quantities:
+        raise ValueError(CART_CHANGED_MESSAGE)
+
+
+def _after_stock_change(product_ids, sold_out):
+    bump_product_versions(product_ids)
+    # ProductCard solo guarda si hay stock: cambia al agotarse una variante
+    for product_id in sold_out:
+        refresh_product_card(product_id)
+    bump_catalog_version()
+
+
+def _decrement_stock(quantities):
+    # UPDATE ... SET stock = stock - CASE id WHEN 1 THEN 2 WHEN 5 THEN 1 ... END
+    Variant.objects.filter(pk__in=quantities).update(
+        stock=F("stock") - Case(
+            *[When(pk=pk, then=Value(qty)) for pk, qty in quantities.items()],
+            default=Value(0),
+            output_field=IntegerField(),
+        )
+    )
+
+
+@transaction.atomic
+def place_order(lines, cart=None, **order_fields):
+    """
+    Crea el pedido (`order_fields` son los campos de Order) con una línea por
+    CartLine, descontando el stock. Con `cart`, lo bloquea antes que las
+    variantes y verifica que sus ítems sigan siendo `lines` (el llamador lo
+    vacía después). Lanza ValueError si el carrito cambió, si alguna variante
+    ya no existe, cambió de precio o no alcanza el stock; en ese caso no se
+    escribe nada.
+    """
+    order = Order.objects.create(**order_fields)
+
+    quantities = {}
+    for line in lines:
+        quantities[line.variant_id] = quantities.get(line.variant_id, 0) + line.quantity
+
+    lock_cart(cart)
+    _check_cart(cart, quantities)
+
+    locked = _lock_stock(quantities)
+    stocks = {}
+    for line in lines:
+        if line.variant_id not in locked:
+            raise ValueError(f"'{line.name}' ya no está disponible.")
+        stock, price = locked[line.variant_id]
+        stocks[line.variant_id] = stock
+        if price != line.unit_price:
+            raise ValueError(CART_CHANGED_MESSAGE)
+        if quantities[line.variant_id] > stock:
+            raise ValueError(
+                f"Stock insuficiente para '{line.name}'. "
+                f"Disponible: {stock}, solicitado: {quantities[line.variant_id]}."
+            )
+
+    _decrement_stock(quantities)
+
+    OrderItem.objects.bulk_create([
+        OrderItem(
+            order=order,
+            variant_id=line.variant_id,
+            product_name=line.name,
+            variant_description=line.description,
+            unit_price=line.unit_price,
+            quantity=line.quantity,
+            line_total=line.total,
+        )
+        for line in lines
+    ])
+
+    # El stock cambió sin señales (update): invalidar payloads por producto,
+    # snapshots y, si algo se agotó, tarjetas. Tras el commit.
+    product_ids = {line.product_id for line in lines}
+    sold_out = {line.product_id for line in lines if stocks[line.variant_id] == quantities[line.variant_id]}
+    transaction.on_commit(lambda: _after_stock_change(product_ids, sold_out))
+    return order
+
+
+def is_transient_db_error(exc):
+    """
+    True si `exc` es un conflicto pasajero: repetir la transacción puede andar.
+    """
+    cause = exc.__cause__
+    # psycopg 3 expone sqlstate; psycopg2, pgcode
+    code = getattr(cause, "sqlstate", None) or getattr(cause, "pgcode", None)
+    if code:
+        return code in TRANSIENT_SQLSTATES
+    # SQLite: otra conexión tiene la base bloqueada
+    return "database is locked" in str(exc)
+
+
+def retry_on_conflict(func, attempts=None, on_retry=None):
+    """
+    Llama a `func` (que debe abrir su propia transacción, no correr dentro de
+    otra) y la repite ante conflictos pasajeros, hasta `attempts` veces en
+    total (settings.CHECKOUT_RETRY_ATTEMPTS). Entre intentos espera un tiempo
+    al azar entre 0 y base·2^intento (settings.CHECKOUT_RETRY_BASE_DELAY, en
+    segundos) para que las transacciones en conflicto no choquen de nuevo.
+    `on_retry(intento, exc)` se llama antes de cada espera.
+    """
+    if attempts is None:
+        attempts = getattr(settings, "CHECKOUT_RETRY_ATTEMPTS", 3)
+    base_delay = getattr(settings, "CHECKOUT_RETRY_BASE_DELAY", 0.05)
+
+    for attempt in range(1, attempts + 1):
+        try:
+            return func()
+        except OperationalError as exc:
+            if attempt >= attempts or not is_transient_db_error(exc):
+                raise
+            if on_retry is not None:
+                on_retry(attempt, exc)
+            time.sleep(random.uniform(0, base_delay * 2 ** attempt))
@@ -1,32 +1,29 @@
 import os
-from io import BytesIO
+import uuid
 from decimal import Decimal
 
 # Django
 from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
-from django.db import transaction
-from django.db.models import F
-from django.http import HttpResponse
+from django.db import IntegrityError, OperationalError, transaction
+from django.http import FileResponse
 from django.shortcuts import get_object_or_404, redirect, render
 from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
 from django.views.decorators.http import require_http_methods
 
 # Apps internas
-from apps.cart.services import get_or_create_cart
+from apps.accounts.tasks import save_checkout_profile
+from apps.cart.services import clear_cart, get_cart
+from apps.cart.snapshot import get_cart_snapshot
+from apps.core.conditional import make_etag
+from apps.core.pagination import KeysetPaginator
 from .forms import CheckoutForm
-from .models import Order, OrderItem
-
-# ReportLab (PDF)
-from reportlab.lib.pagesizes import A4
-from reportlab.lib.units import cm, mm
-from reportlab.lib import colors
-from reportlab.pdfgen import canvas
-from reportlab.platypus import Table, TableStyle
-from reportlab.lib.utils import ImageReader
-
-from django.contrib.staticfiles import finders
+from .models import Order
+from .receipts import receipt_path, receipt_stamp
+from .services import place_order, retry_on_conflict
 
 STATUS_BADGE = {
     "pending": "bg-warning text-dark",
@@ -38,19 +35,28 @@ STATUS_BADGE = {
 }
 
 
-
-def _variant_desc(variant):
-    attrs = list(variant.attributes.all())
-    if not attrs:
-        return ""
-    return ", ".join([f"{a.name}: {a.value}" for a in attrs])
+def _order_for_key(key):
+    # id del pedido ya creado con esa clave de envío, o None
+    try:
+        key = uuid.UUID(str(key))
+    except ValueError:
+        return None
+    return Order.objects.filter(idempotency_key=key).values_list("pk", flat=True).first()
 
 
 @require_http_methods(["GET", "POST"])
 def checkout(request):
-    cart = get_or_create_cart(request)
+    # Reenvío (doble clic, reintento del navegador): el pedido ya existe
+    if request.method == "POST":
+        order_id = _order_for_key(request.POST.get("idempotency_key"))
+        if order_id:
+            return redirect("orders:success", order_id=order_id)
+
+    cart = get_cart(request)
+    # Líneas, subtotal y stock en una consulta (sin caché: el checkout cobra)
+    snapshot = get_cart_snapshot(cart)
 
-    if cart.items.count() == 0:
+    if not snapshot.lines:
         messages.info(request, "Tu carrito está vacío.")
         return redirect("cart:detail")
 
@@ -68,7 +74,7 @@ def checkout(request):
 
     form = CheckoutForm(request.POST or None, initial=initial)
 
-    subtotal = Decimal(str(cart.subtotal))
+    subtotal = snapshot.subtotal
     shipping_cost_preview = Decimal("0.00")
 
     if request.method == "POST" and form.is_valid():
@@ -84,7 +90,7 @@ def checkout(request):
                 messages.error(request, "Selecciona una zona de envío.")
                 return render(request, "orders/checkout.html", {
                     "form": form,
-                    "cart": cart,
+                    "cart": snapshot,
                     "subtotal": subtotal,
                     "shipping_cost": shipping_cost_preview,
                     "total": subtotal + shipping_cost_preview,
@@ -107,9 +113,15 @@ def checkout(request):
         else:
             instructions_text = ""
 
-        try:
+        def submit():
             with transaction.atomic():
-                order = Order.objects.create(
+                # Se cobra lo que muestra el snapshot (Cart o CookieCart por igual);
+                # clave, carrito y stock se bloquean en ese orden en place_order,
+                # que aborta si el carrito cambió desde que se leyó
+                order = place_order(
+                    snapshot.lines,
+                    cart=cart,
+                    idempotency_key=form.cleaned_data["idempotency_key"],
                     user=request.user if request.user.is_authenticated else None,
                     status="pending",
                     customer_name=form.cleaned_data["customer_name"],
@@ -126,56 +138,34 @@ def checkout(request):
                     payment_instructions=instructions_text,
                 )
 
-                cart_items = cart.items.select_related(
-                    "variant", "variant__product"
-                ).prefetch_related(
-                    "variant__attributes"
-                )
-
-                for item in cart_items:
-                    v = item.variant
-
-                    # 1) Validar stock
-                    if item.quantity > v.stock:
-                        raise ValueError(
-                            f"Stock insuficiente para '{v.product.name}'. "
-                            f"Disponible: {v.stock}, solicitado: {item.quantity}."
-                        )
-
-                    # 2) Descontar stock con bloqueo
-                    updated = type(v).objects.filter(
-                        pk=v.pk, stock__gte=item.quantity
-                    ).update(stock=F("stock") - item.quantity)
-
-                    if updated == 0:
-                        raise ValueError(
-                            f"Stock insuficiente para '{v.product.name}' (el stock cambió mientras comprabas)."
-                        )
-
-                    # 3) Crear item del pedido
-                    OrderItem.objects.create(
-                        order=order,
-                        variant=v,
-                        product_name=v.product.name,
-                        variant_description=_variant_desc(v),
-                        unit_price=v.price,
-                        quantity=item.quantity,
-                        line_total=v.price * item.quantity,
+                # Guardar datos en perfil (se encola con el pedido si hay worker;
+                # si no, en el acto)
+                if request.user.is_authenticated:
+                    save_checkout_profile.delay(
+                        request.user.pk,
+                        form.cleaned_data["customer_phone"],
+                        form.cleaned_data["customer_address"],
                     )
 
-                # 4) Vaciar carrito
-                cart.items.all().delete()
-
-                # Guardar datos en perfil
-                if request.user.is_authenticated and hasattr(request.user, "profile"):
-                    profile = request.user.profile
-                    profile.phone = form.cleaned_data["customer_phone"]
-                    profile.address = form.cleaned_data["customer_address"]
-                    profile.save()
+                # Vaciar carrito (al final: si algo falla, la cookie queda intacta)
+                clear_cart(cart, session=request.session)
+            return order
 
+        try:
+            order = retry_on_conflict(submit)
         except ValueError as e:
             messages.error(request, str(e))
             return redirect("cart:detail")
+        except IntegrityError:
+            # Un envío simultáneo con la misma clave se confirmó primero
+            order_id = _order_for_key(form.cleaned_data["idempotency_key"])
+            if not order_id:
+                raise
+            return redirect("orders:success", order_id=order_id)
+        except OperationalError:
+            # Conflictos que persistieron tras los reintentos
+            messages.error(request, "Hay mucha demanda en este momento. Intenta confirmar tu pedido de nuevo.")
+            return redirect("cart:detail")
 
         messages.success(request, f"Pedido #{order.id} creado correctamente.")
         return redirect("orders:success", order_id=order.id)
@@ -187,7 +177,7 @@ def checkout(request):
 
     return render(request, "orders/checkout.html", {
         "form": form,
-        "cart": cart,
+        "cart": snapshot,
         "subtotal": subtotal,
         "shipping_cost": shipping_cost_preview,
         "total": subtotal + shipping_cost_preview,
@@ -214,11 +204,23 @@ def receipt(request, order_id):
     return render(request, "orders/receipt.html", {"order": order})
 
 
+MY_ORDERS_PAGE_SIZE = 10
+
+
 @login_required
 def my_orders(request):
-    qs = Order.objects.filter(user=request.user).prefetch_related("items").order_by("-created_at")
+    # La lista no muestra ítems: sin prefetch. Paginación keyset por fecha.
+    qs = Order.objects.filter(user=request.user)
+    paginator = KeysetPaginator(
+        qs,
+        ["-created_at", "-pk"],
+        per_page=MY_ORDERS_PAGE_SIZE,
+        salt=f"orders:mine:{request.user.pk}",
+    )
+    page_obj = paginator.get_page(request.GET.get("cursor"))
     return render(request, "orders/my_orders.html", {
-        "orders": qs,
+        "orders": page_obj,
+        "page_obj": page_obj,
         "STATUS_BADGE": STATUS_BADGE,
     })
 
@@ -235,173 +237,29 @@ def my_order_detail(request, order_id):
         "STATUS_BADGE": STATUS_BADGE,
     })
 
-def money(amount):
-    if amount is None:
-        return "0.00"
-    return f"{amount:.2f}"
-
-@login_required
 # ==============================================================================
 # FUNCIÓN FACTURA (receipt_pdf)
 # ==============================================================================
+def _receipt_etag(order):
+    return make_etag(["receipt", order.pk, receipt_stamp(order)])
+
+
 @login_required
 def receipt_pdf(request, order_id):
-    # 1. Obtener la orden
-    order = get_object_or_404(Order, id=order_id)
-
-    # 2. Configurar el PDF
-    response = HttpResponse(content_type='application/pdf')
-    filename = f"recibo_orden_{order.id}.pdf"
-    response['Content-Disposition'] = f'inline; filename="{filename}"'
-
-    p = canvas.Canvas(response, pagesize=A4)
-    width, height = A4
-    margin = 2 * cm
-
-    # =====================================================
-    # 3. ENCABEZADO: DATOS EMPRESA (IZQUIERDA)
-    # =====================================================
-    y_header = height - 2 * cm
-    
-    p.setFont("Helvetica-Bold", 12)
-    p.drawString(margin, y_header, "CONFECCIONES ISMAEL")
-    p.setFont("Helvetica", 10)
-    y_header -= 0.5 * cm
-    #p.drawString(margin, y_header, "RUC: 1234567890001")
-    #y_header -= 0.5 * cm
-    p.drawString(margin, y_header, "Av. Rocafuerte y Carlos Maria")
-    y_header -= 0.5 * cm
-    p.drawString(margin, y_header, "Tel: 099 452 8554")
-    y_header -= 0.5 * cm
-    p.drawString(margin, y_header, f"Fecha: {order.created_at.strftime('%d/%m/%Y')}")
-
-    # =====================================================
-    # 4. LOGO (DESDE CLOUDINARY)
-    # =====================================================
-    logo_url = "https://res.cloudinary.com/det18qekc/image/upload/v1770385547/logo_yf5upb.png"
-
-    logo_width = 4 * cm
-    logo_x = width - margin - logo_width
-    logo_y = height - 3.5 * cm 
-
-    try:
-        p.drawImage(ImageReader(logo_url), logo_x, logo_y, width=logo_width, preserveAspectRatio=True, mask='auto')
-    except Exception as e:
-        print(f"Error al cargar logo desde Cloudinary: {e}")
-    # =====================================================
-    # 5. TÍTULO Y CLIENTE
-    # =====================================================
-    y = height - 5.5 * cm
-    
-    # Línea separadora
-    p.setLineWidth(1)
-    p.line(margin, y + 0.5*cm, width - margin, y + 0.5*cm)
-
-    # Título Centrado
-    p.setFont("Helvetica-Bold", 14)
-    p.drawCentredString(width / 2, y, f"ORDEN DE PEDIDO #{order.id}")
-
-    # Datos del Cliente
-    y -= 1 * cm
-    p.setFont("Helvetica-Bold", 10)
-    p.drawString(margin, y, "Facturar a:")
-    
-    p.setFont("Helvetica", 10)
-    y -= 0.5 * cm
-    
-    # Validación de datos (para evitar errores si están vacíos)
-    c_name = order.customer_name if order.customer_name else "Cliente General"
-    c_address = order.customer_address if order.customer_address else "Dirección no registrada"
-    c_phone = order.customer_phone if order.customer_phone else "Sin teléfono"
-    c_email = order.user.email if (order.user and order.user.email) else "N/A"
-    
-    p.drawString(margin, y, f"Nombre: {c_name}")
-    p.drawString(width/2, y, f"Teléfono: {c_phone}") 
-    
-    y -= 0.5 * cm
-    p.drawString(margin, y, f"Dirección: {c_address}")
-    p.drawString(width/2, y, f"Email: {c_email}")
-
-    # =====================================================
-    # 6. TABLA DE PRODUCTOS
-    # =====================================================
-    y -= 1.0 * cm
-    
-    data = [['Producto / Descripción', 'Cant.', 'Precio', 'Total']]
-    
-    for item in order.items.all():
-        desc = item.product_name
-        if item.variant_description:
-            desc += f"\n({item.variant_description})"
-            
-        data.append([
-            desc,
-            str(item.quantity),
-            f"${money(item.unit_price)}",
-            f"${money(item.line_total)}"
-        ])
-
-    # Anchos calculados: 9.5 + 2 + 2.75 + 2.75 = 17cm (Ancho útil A4)
-    col_widths = [9.5*cm, 2*cm, 2.75*cm, 2.75*cm]
-    
-    table = Table(data, colWidths=col_widths)
-
-    estilo_tabla = [
-        ('BACKGROUND', (0, 0), (-1, 0), colors.Color(0.2, 0.2, 0.2)), # Header oscuro
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),                 # Texto blanco
-        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-        ('ALIGN', (1, 0), (-1, -1), 'CENTER'),
-        ('ALIGN', (2, 0), (-1, -1), 'RIGHT'),
-        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, 0), 9),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 8),
-        ('TOPPADDING', (0, 0), (-1, 0), 8),
-        ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-        ('FONTSIZE', (0, 1), (-1, -1), 9),
-        ('GRID', (0, 0), (-1, -1), 0.5, colors.Color(0.8, 0.8, 0.8)),
-        ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.Color(0.97, 0.97, 0.97)]),
-    ]
-    
-    table.setStyle(TableStyle(estilo_tabla))
-
-    w_table, h_table = table.wrapOn(p, width, height)
-    
-    # Salto de página si la tabla es muy larga
-    if y - h_table < 2*cm:
-        p.showPage()
-        y = height - margin
-        
-    table.drawOn(p, margin, y - h_table)
-
-    # =====================================================
-    # 7. TOTALES
-    # =====================================================
-    y_final = y - h_table - 0.8*cm
-    
-    # Uso de Decimal("0.00") para asegurar matemáticas correctas
-    shipping = order.shipping_cost if order.shipping_cost else Decimal("0.00")
-    total = order.total if order.total else Decimal("0.00")
-    subtotal = total - shipping
-
-    p.setFont("Helvetica", 10)
-    p.drawRightString(width - margin, y_final, f"Subtotal:   ${money(subtotal)}")
-    
-    y_final -= 0.6 * cm
-    p.drawRightString(width - margin, y_final, f"Envío:   ${money(shipping)}")
-    
-    y_final -= 0.3 * cm
-    p.setLineWidth(1)
-    p.line(width - margin - 5*cm, y_final, width - margin, y_final)
-    
-    y_final -= 0.6 * cm
-    p.setFont("Helvetica-Bold", 12)
-    p.drawRightString(width - margin, y_final, f"TOTAL:   ${money(total)}")
-
-    # Pie de página
-    p.setFont("Helvetica-Oblique", 8)
-    p.drawCentredString(width/2, 2*cm, "Gracias por preferir Confecciones Ismael")
-
-    p.showPage()
-    p.save()
-    return response
\ No newline at end of file
+    # Solo la fila del pedido: ítems y usuario se leen si hay que generar el PDF
+    order = get_object_or_404(Order.objects.select_related("user"), id=order_id)
+
+    # El navegador ya tiene esta versión: 304 sin tocar el disco
+    etag = _receipt_etag(order)
+    last_modified = order.updated_at.timestamp()
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        response = FileResponse(
+            open(receipt_path(order), "rb"),
+            content_type="application/pdf",
+            filename=f"recibo_orden_{order.id}.pdf",
+        )
+    response["ETag"] = etag
+    response["Last-Modified"] = http_date(last_modified)
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
@@ -68,6 +68,7 @@ MIDDLEWARE = [
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
+    "apps.cart.middleware.CookieCartMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
 
@@ -193,6 +194,61 @@ PAYMENT_INSTRUCTIONS = {
 # Logo fijo desde static
 RECEIPT_LOGO_URL = "/static/branding/logo.png"
 
+# Búsqueda del catálogo: "postgres" | "simple" (vacío = según el motor de BD)
+CATALOG_SEARCH_BACKEND = os.getenv("CATALOG_SEARCH_BACKEND", "")
+
+# Snapshot del catálogo en memoria por worker (0 = usar ProductCard / facetas en BD)
+CATALOG_SNAPSHOT_ENABLED = os.getenv("CATALOG_SNAPSHOT_ENABLED", "1") == "1"
+# Máximo de segundos que un worker sirve su snapshot sin revisar CatalogVersion
+CATALOG_SNAPSHOT_MAX_AGE = float(os.getenv("CATALOG_SNAPSHOT_MAX_AGE", "5"))
+# Segundos en caché del payload de variantes (la clave ya incluye Product.version)
+CATALOG_VARIANT_MATRIX_TTL = int(os.getenv("CATALOG_VARIANT_MATRIX_TTL", "86400"))
+
+# Renditions de imágenes de producto: "cloudinary" | "local" (vacío = según STORAGES)
+CATALOG_IMAGE_BACKEND = os.getenv("CATALOG_IMAGE_BACKEND", "")
+# Backend local: dónde se escriben y desde qué URL se sirven los derivados WebP
+CATALOG_RENDITIONS_ROOT = os.getenv("CATALOG_RENDITIONS_ROOT", str(BASE_DIR / "media" / "renditions"))
+CATALOG_RENDITIONS_URL = os.getenv("CATALOG_RENDITIONS_URL", "/media/renditions/")
+
+# Optimización al subir imágenes: "thread" (hilo de fondo), "command"
+# (cron con `optimize_product_images`) u "off"
+CATALOG_IMAGE_OPTIMIZE = os.getenv("CATALOG_IMAGE_OPTIMIZE", "thread")
+CATALOG_IMAGE_MAX_EDGE = int(os.getenv("CATALOG_IMAGE_MAX_EDGE", "2000"))
+CATALOG_IMAGE_QUALITY = int(os.getenv("CATALOG_IMAGE_QUALITY", "82"))
+
+# Destacados de la portada: tamaño del pool (refresh_featured) y caché de la selección
+CATALOG_FEATURED_POOL_SIZE = int(os.getenv("CATALOG_FEATURED_POOL_SIZE", "24"))
+CATALOG_FEATURED_TTL = int(os.getenv("CATALOG_FEATURED_TTL", "60"))
+
+# Carrito de visitantes anónimos: "db" (Cart por sesión) o "cookie" (cookie
+# firmada; pasa a la base al iniciar sesión)
+CART_STORAGE = os.getenv("CART_STORAGE", "db")
+CART_COOKIE_NAME = "cart"
+CART_COOKIE_AGE = 60 * 60 * 24 * 30
+
+# Purga de carritos viejos (purge_carts): anónimos, inactivos y tamaño de lote
+CART_ANONYMOUS_MAX_AGE_DAYS = int(os.getenv("CART_ANONYMOUS_MAX_AGE_DAYS", "14"))
+CART_INACTIVE_MAX_AGE_DAYS = int(os.getenv("CART_INACTIVE_MAX_AGE_DAYS", "30"))
+CART_PURGE_BATCH_SIZE = int(os.getenv("CART_PURGE_BATCH_SIZE", "500"))
+
+# Checkout: reintentos ante deadlocks / conflictos de la base (espera al azar
+# entre 0 y base·2^intento segundos)
+CHECKOUT_RETRY_ATTEMPTS = int(os.getenv("CHECKOUT_RETRY_ATTEMPTS", "3"))
+CHECKOUT_RETRY_BASE_DELAY = float(os.getenv("CHECKOUT_RETRY_BASE_DELAY", "0.05"))
+
+# Recibos PDF ya generados (uno por pedido y versión); se pueden borrar cuando sea
+ORDERS_RECEIPT_CACHE_ROOT = os.getenv("ORDERS_RECEIPT_CACHE_ROOT", str(BASE_DIR / "media" / "receipts"))
+
+# Cola de trabajos (apps.core.jobs). Con 0, `.delay()` corre la tarea en el
+# acto dentro del request: activarla solo con un proceso `run_worker` desplegado
+JOB_QUEUE_ENABLED = os.getenv("JOB_QUEUE_ENABLED", "0") == "1"
+# run_worker: hilos, espera con la cola vacía (s), intentos por trabajo y base
+# de la espera entre reintentos (s)
+JOB_WORKER_CONCURRENCY = int(os.getenv("JOB_WORKER_CONCURRENCY", "4"))
+JOB_WORKER_POLL = float(os.getenv("JOB_WORKER_POLL", "1"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+JOB_RETRY_BASE_DELAY = int(os.getenv("JOB_RETRY_BASE_DELAY", "10"))
+
 # -------------------------------------------------------------------
 # JAZZMIN
 # -------------------------------------------------------------------
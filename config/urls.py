@@ -30,4 +30,6 @@ urlpatterns = [
 ]
 
 if settings.DEBUG:
+    # Renditions locales antes que MEDIA_URL (pueden compartir prefijo)
+    urlpatterns += static(settings.CATALOG_RENDITIONS_URL, document_root=settings.CATALOG_RENDITIONS_ROOT)
     urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
\ No newline at end of file
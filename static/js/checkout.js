@@ -134,6 +134,13 @@ document.addEventListener("DOMContentLoaded", () => {
   zoneSelect?.addEventListener("change", updateSummary);
   paySelect?.addEventListener("change", updatePaymentUI);
 
+  // Evita el doble clic (el servidor igual ignora reenvíos con la misma clave)
+  const form = document.getElementById("checkoutForm");
+  const confirmBtn = document.getElementById("btnConfirmOrder");
+  form?.addEventListener("submit", () => {
+    if (confirmBtn) confirmBtn.disabled = true;
+  });
+
   /* =======================
      Inicialización
      ======================= */
@@ -109,9 +109,8 @@ document.addEventListener("click", (e) => {
   }
 });
 
-document.addEventListener("DOMContentLoaded", () => {
-  refreshMiniCart();
-});
+// El badge llega renderizado desde el servidor (CART_COUNT): el mini carrito
+// se pide solo al abrirlo, así una visita no crea sesión ni carrito.
 
 /* =====================================================*/
 /* =====================================================
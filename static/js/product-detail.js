@@ -20,6 +20,10 @@ document.addEventListener("DOMContentLoaded", () => {
   let currentStock = 0;
   let currentPrice = 0.0;
 
+  // Payload del selector (/api/catalogo/<slug>/variantes/), indexado por id.
+  // Mientras no llega se usan los data-* de cada <option>.
+  let variantsById = null;
+
   /* ================= FUNCIÓN PRINCIPAL ================= */
   function updateUI() {
     if (!variantSelect) return;
@@ -28,14 +32,15 @@ document.addEventListener("DOMContentLoaded", () => {
     if (!opt) return;
 
     // Datos básicos
-    const rawPrice = opt.dataset.price || "0";
+    const data = variantsById ? variantsById[opt.value] : null;
+    const rawPrice = (data ? data.price : opt.dataset.price) || "0";
     currentPrice = parseFloat(rawPrice.replace(',', '.')) || 0;
-    currentStock = parseInt(opt.dataset.stock) || 0;
-    const variantImage = opt.dataset.image;
+    currentStock = data ? data.stock : (parseInt(opt.dataset.stock) || 0);
+    const variantImage = data ? (data.image_detail_url || data.image_url) : opt.dataset.image;
 
     // --- LÓGICA DE COLOR ---
-    const colorName = opt.dataset.color;
-    const colorHex = opt.dataset.hex;
+    const colorName = data ? (data.color ? data.color.name : "") : opt.dataset.color;
+    const colorHex = data ? (data.color ? data.color.hex_code : "") : opt.dataset.hex;
 
     if (colorDisplay) {
         if (colorName && colorName.trim() !== "") {
@@ -88,6 +93,9 @@ document.addEventListener("DOMContentLoaded", () => {
 
   function setMainImage(src) {
       if (!mainImg || mainImg.src === src) return;
+      // El srcset de la rendition inicial tendría prioridad sobre src
+      mainImg.removeAttribute("srcset");
+      mainImg.removeAttribute("sizes");
       mainImg.style.opacity = '0.5';
       setTimeout(() => {
           mainImg.src = src;
@@ -101,6 +109,28 @@ document.addEventListener("DOMContentLoaded", () => {
       btnPlus.disabled = (currentStock > 0 && currentQty >= currentStock);
   }
 
+  /* ================= PAYLOAD DE VARIANTES ================= */
+  function loadVariants() {
+    const url = variantSelect ? variantSelect.dataset.variantsUrl : null;
+    if (!url) return;
+
+    fetch(url, { headers: { "Accept": "application/json" } })
+      .then((res) => (res.ok ? res.json() : null))
+      .then((payload) => {
+        if (!payload || !payload.ok) return;
+        variantsById = {};
+        payload.variants.forEach((v) => { variantsById[String(v.id)] = v; });
+
+        // Stock al día: habilitar / deshabilitar opciones
+        Array.from(variantSelect.options).forEach((opt) => {
+          const v = variantsById[opt.value];
+          if (v) opt.disabled = v.stock <= 0;
+        });
+        updateUI();
+      })
+      .catch(() => {});
+  }
+
   /* ================= LISTENERS ================= */
   if (variantSelect) variantSelect.addEventListener("change", updateUI);
 
@@ -154,4 +184,5 @@ document.addEventListener("DOMContentLoaded", () => {
 
   // INICIALIZAR
   updateUI();
+  loadVariants();
 });
\ No newline at end of file